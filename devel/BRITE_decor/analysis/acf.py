@@ -2,7 +2,7 @@
 """
 Routines to perform a 1D and nD autocorrelation of a given dataset
     
-Last update 18 March 2016
+Last update 19 October 2026
 
 @author: Bram Buysschaert
 """
@@ -11,6 +11,8 @@ Last update 18 March 2016
 # 				Packages
 #===============================================================================
 import numpy as np
+
+from BRITE_decor.clipping.fourierfilters import fastFFTlength
 #===============================================================================
 # 				Code
 #===============================================================================
@@ -18,6 +20,8 @@ def acf1D(x, **kwargs):
   """
   Determines the autocorrelation of a 1D array.
   
+  NOTE The sums of the products are determined with an FFT of the zero padded array, so the routine scales as O(N log N).
+  
   Returns: the autocorrelation of x
   
   @param x: measurements of x [???]
@@ -30,7 +34,7 @@ def acf1D(x, **kwargs):
   n = len(x)
   variance = x.var()
   x = x-x.mean()
-  r = np.correlate(x, x, mode = 'full')[-n:]
+  r = _correlationSUMS(x)
   acor = r/(variance*(np.arange(n, 0, -1)))
   
   return acor
@@ -39,7 +43,11 @@ def acfnD(x, **kwargs):
     """
     Determines the autocorrelation of a nD array.
     
-    NOTE routine was found at http://stackoverflow.com/questions/4503325/autocorrelation-of-a-multidimensional-array-in-numpy
+    For every combination of positive shifts (1 up to the length - 2 along each axis), the correlation coefficient between the unshifted array (clipped at the end) and the shifted array (clipped at the beginning) is determined, using the mean and std of both overlapping parts.
+    
+    NOTE The sums of the products for all shifts follow from one FFT of the zero padded array, and the sums over the overlapping parts from the cumulative sums along each axis. So, no copies of the array are made per shift.
+    
+    NOTE routine was originally found at http://stackoverflow.com/questions/4503325/autocorrelation-of-a-multidimensional-array-in-numpy
     
     Returns: the autocorrelation of x
     
@@ -49,47 +57,101 @@ def acfnD(x, **kwargs):
     @return acor: the autocorrelation of x
     @rtype acor: numpy NDarray of length NxM    
     """
+    # The correlation coefficient does not change by subtracting a constant, but the rounding errors do
+    x = np.asarray(x, dtype=float)
+    x = x - x.mean()
+    
+    # Sum of x[i] x[i+shift] over the overlap, for all shifts at once
+    sumsPRODUCT = _correlationSUMS(x)
+    
+    # The unshifted part is x[:n-shift], a box starting at 0. The shifted part is x[shift:], a box ending at n. So, prefix sums and suffix sums give the sums over these parts for all shifts at once.
+    sumsUNSHIFTED, sumsSHIFTED = _prefixSUMS(x), _suffixSUMS(x)
+    squaresUNSHIFTED, squaresSHIFTED = _prefixSUMS(x**2), _suffixSUMS(x**2)
+    
+    shifts = [np.arange(1, s - 1) for s in x.shape]
+    gridSHIFTS = np.ix_(*shifts)
+    gridUNSHIFTED = np.ix_(*[s - shift for s, shift in zip(x.shape, shifts)])
+    numberOVERLAP = np.ones([len(shift) for shift in shifts])
+    for s, shift in zip(x.shape, gridSHIFTS):
+      numberOVERLAP = numberOVERLAP * (s - shift)
+    
+    meanUNSHIFTED, meanSHIFTED = sumsUNSHIFTED[gridUNSHIFTED] / numberOVERLAP, sumsSHIFTED[gridSHIFTS] / numberOVERLAP
+    stdUNSHIFTED = np.sqrt(np.clip(squaresUNSHIFTED[gridUNSHIFTED] / numberOVERLAP - meanUNSHIFTED**2, 0., None))
+    stdSHIFTED = np.sqrt(np.clip(squaresSHIFTED[gridSHIFTS] / numberOVERLAP - meanSHIFTED**2, 0., None))
+    
+    acor = (sumsPRODUCT[gridSHIFTS] / numberOVERLAP - meanUNSHIFTED * meanSHIFTED) / (stdUNSHIFTED * stdSHIFTED)
+    
+    return acor
 
-    # used for transposes
-    t = np.roll(range(x.ndim), 1)
-
-    # pairs of indexes
-    # the first is for the autocorrelation array
-    # the second is the shift
-    ii = [list(enumerate(range(1, s - 1))) for s in x.shape]
-
-    # initialize the resulting autocorrelation array
-    acor = np.empty(shape=[len(s0) for s0 in ii])
-
-    # iterate over all combinations of directional shifts
-    for i in product(*ii):
-        # extract the indexes for
-        # the autocorrelation array 
-        # and original array respectively
-        i1, i2 = np.asarray(i).T
-
-        x1 = x.copy()
-        x2 = x.copy()
-
-        for i0 in i2:
-            # clip the unshifted array at the end
-            x1 = x1[:-i0]
-            # and the shifted array at the beginning
-            x2 = x2[i0:]
-
-            # prepare to do the same for 
-            # the next axis
-            x1 = x1.transpose(t)
-            x2 = x2.transpose(t)
+def acfSLOTTED(time, x, **kwargs):
+  """
+  Determines the autocorrelation of an unevenly sampled (e.g. gapped BRITE) timeseries, with the slotted (binned) autocorrelation function.
+  
+  The measurements are summed in slots of ACFslot in time. The sums of the products of all pairs of slots at a given lag (a multiple of ACFslot), and the number of pairs of datapoints, both follow from an FFT. Lags without any pair (e.g. inside the orbital gaps) have a NaN autocorrelation. The normalisation is the same as for acf1D, i.e. the mean product at each lag divided by the variance.
+  
+  NOTE The lag of a pair is only known up to ACFslot. The autocorrelation at lag zero also contains the pairs of each datapoint with itself.
+  NOTE The FFT has a length of about (timespan + ACFmaxLAG) / ACFslot, so do not choose ACFslot needlessly small.
+  
+  Returns: the lags, the autocorrelation of x, and the number of pairs for each lag
+  
+  @param time: time measurements [d]
+  @type time: numpy array of length N
+  @param x: measurements of x [???]
+  @type x: numpy array of length N
+  
+  @return lags: the lags [d]
+  @rtype lags: numpy array of length K
+  @return acor: the autocorrelation of x
+  @rtype acor: numpy array of length K
+  @return numberPAIRS: number of pairs of datapoints for each lag
+  @rtype numberPAIRS: numpy array of length K (dtype='int')
+  
+  @kwargs: ACFslot: width of the slots - Default is the median time difference [d]
+  @kwargs: ACFmaxLAG: maximum lag - Default is half the timespan [d]
+  """
+  time, x = np.asarray(time, dtype=float), np.asarray(x, dtype=float)
+  widthSLOT = kwargs.get('ACFslot', np.median(np.diff(np.sort(time)))) #[d]
+  maxLAG = kwargs.get('ACFmaxLAG', 0.5 * (np.max(time) - np.min(time))) #[d]
+  
+  variance = x.var()
+  x = x-x.mean()
+  
+  # Sums and number of datapoints per slot
+  idxSLOT = np.floor((time - np.min(time)) / widthSLOT).astype(int)
+  numberSLOTS, numberLAGS = idxSLOT.max() + 1, int(np.floor(maxLAG / widthSLOT)) + 1
+  sumsSLOT = np.bincount(idxSLOT, weights=x, minlength=numberSLOTS)
+  countsSLOT = np.bincount(idxSLOT, minlength=numberSLOTS).astype(float)
+  
+  sumsPRODUCT = _correlationSUMS(sumsSLOT, numberLAGS)
+  numberPAIRS = np.rint(_correlationSUMS(countsSLOT, numberLAGS)).astype(int)
+  
+  acor = np.full(len(numberPAIRS), np.nan)
+  acor[numberPAIRS > 0] = sumsPRODUCT[numberPAIRS > 0] / (variance * numberPAIRS[numberPAIRS > 0])
+  
+  return widthSLOT * np.arange(len(numberPAIRS)), acor, numberPAIRS
 
-        # normalize shifted and unshifted arrays
-        x1 -= x1.mean()
-        x1 /= x1.std()
-        x2 -= x2.mean()
-        x2 /= x2.std()
+def _correlationSUMS(x, numberSHIFTS=None):
+  """
+  The sums of x[i] x[i+shift] for all non-negative shifts (along every axis) up to numberSHIFTS - 1 (default: the full shape), from the FFT of x zero padded to a 5-smooth length without wrap around.
+  """
+  numberSHIFTS = x.shape if numberSHIFTS is None else np.minimum(np.atleast_1d(numberSHIFTS), x.shape)
+  lengthsFFT = [fastFFTlength(s + n - 1) for s, n in zip(x.shape, numberSHIFTS)]
+  transformX = np.fft.rfftn(x, s=lengthsFFT)
+  sums = np.fft.irfftn(transformX * np.conj(transformX), s=lengthsFFT)
+  return sums[tuple(slice(0, n) for n in numberSHIFTS)]
 
-        # compute the autocorrelation directly
-        # from the definition
-        acor[tuple(i1)] = (x1 * x2).mean()
+def _prefixSUMS(x):
+  """
+  The sums of x[:k1, :k2, ...] for all k (from 0 up to the shape), i.e. cumulative sums along every axis with a leading zero.
+  """
+  sums = np.pad(x, [(1, 0)] * x.ndim, mode='constant')
+  for axis in range(x.ndim):
+    sums = np.cumsum(sums, axis=axis)
+  return sums
 
-    return acor
\ No newline at end of file
+def _suffixSUMS(x):
+  """
+  The sums of x[k1:, k2:, ...] for all k (from 0 up to the shape), i.e. reversed cumulative sums along every axis with a trailing zero.
+  """
+  reverse = tuple(slice(None, None, -1) for axis in range(x.ndim))
+  return _prefixSUMS(x[reverse])[reverse]
@@ -17,6 +17,8 @@ import numpy as np
 import matplotlib.pyplot as plt
 import copy
 import scipy.interpolate as scInterp
+import scipy.ndimage as scNdimage
+import scipy.stats as scStats
 from glob import glob
 #BRITE_decor packages
 
@@ -25,81 +27,131 @@ import BRITE_decor.detrending.detrendTempFlux as TEMPdetrendBRITE
 import BRITE_decor.detrending.detrendOrbitFlux as ORBdetrendBRITE
 
 import BRITE_decor.clipping.percentageclipping as percentageclipBRITE
+import BRITE_decor.fitting.splineadditive as additiveBRITE
+from BRITE_decor.timing.orbit import SATELLITEperiods
 #===============================================================================
 #   Functions
 #===============================================================================
 	
-def map(flux, xph, yph, sizex=10, sizey=10):
+def map(flux, xph, yph, sizex=10, sizey=10, fill='mean', smooth=0.):
     """
-    make a 2D map of pixel with number of bins in each direction given sizex and size y
+    make a 2D map of pixel with number of bins in each direction given sizex and size y. Every cell is the mean flux of the points in it, computed at once with a bincount over the flattened cell indices (see intrapixel_cells).
 
     @flux - flux of star
-    @xph - x pixel position of center mod 1
-    @yph - y pixel position of center mod 1
+    @xph - x pixel position of center mod 1, scaled to the number of x bins (i.e. 0 <= xph < sizex)
+    @yph - y pixel position of center mod 1, scaled to the number of y bins (i.e. 0 <= yph < sizey)
     @sizex - number of x bins for map
     @sizey - number of y bins for map
+    @fill - value of the cells without points: 'mean' or 'median' of the flux, 'nearest' filled cell, or 'nan'
+    @smooth - width (sigma) of the gaussian smoothing of the map, in cells. The map wraps around, as the pixel phase does. No smoothing if 0.
+    @return - map (sizex x sizey array)
 
     """
 
-
     sizex = int(sizex)
     sizey = int(sizey)
-    data = np.column_stack((flux,xph,yph))
-    mask = np.zeros((sizex,sizey))
-    for x in range(sizex):
-#		print x
-        for y in range(sizey):
-            mask[x,y] = np.sum(data[:,0][(np.floor(data[:,1])==x) & (np.floor(data[:,2])==y)]/len(data[:,0][(np.floor(data[:,1])==x) & (np.floor(data[:,2])==y)]))
-            if  len(data[:,0][(np.floor(data[:,1])==x) & (np.floor(data[:,2])==y)])==0:
-                mask[x,y] = np.mean(flux)
+    cells = intrapixel_cells(xph, yph, sizex, sizey)
+    mask = cell_maps(flux, cells, (sizex, sizey), fill=fill, smooth=smooth)
 
     return mask
 
 
+def intrapixel_cells(xph, yph, sizex=10, sizey=10):
 
+    """
+    Index of the cell of each point in the flattened sizex x sizey map, i.e. floor(xph)*sizey + floor(yph). Points outside the map are put in the closest edge cell.
 
-def intrem(flux, xpos, ypos):
+    @xph - x pixel position of center mod 1, scaled to the number of x bins
+    @yph - y pixel position of center mod 1, scaled to the number of y bins
+    @sizex - number of x bins for map
+    @sizey - number of y bins for map
+    @return - cell indices (integer array)
 
     """
-    create a x, y map of a pixel and remove it from the flux. 
+
+    xcell = np.clip(np.floor(xph).astype(int), 0, sizex-1)
+    ycell = np.clip(np.floor(yph).astype(int), 0, sizey-1)
+
+    return xcell*sizey + ycell
+
+
+def cell_maps(flux, cells, shape, fill='mean', smooth=0.):
+
+    """
+    Mean flux in each cell of one or more maps, with one bincount for all of them. The last two axes of shape are the x and y cells of a map, any leading axes count the maps (e.g. one map per data chunk).
+    @flux - flux array
+    @cells - index of the cell of each flux point in the flattened array of maps (integer array)
+    @shape - shape of the array of maps (tuple)
+    @fill - value of the cells without points: 'mean' or 'median' of the flux of that map, 'nearest' filled cell of that map, or 'nan'
+    @smooth - width (sigma) of the gaussian smoothing of each map, in cells. The maps wrap around, as the pixel phase does. No smoothing if 0.
+    @return - maps (array of the given shape)
+
+    """
+
+    ncells = int(np.prod(shape))
+    counts = np.bincount(cells, minlength=ncells).reshape(shape).astype(float)
+    sums = np.bincount(cells, weights=flux, minlength=ncells).reshape(shape)
+
+    if smooth > 0:
+        # smooth the sums and the counts, so empty cells do not pull the map down
+        sigma = (0,)*(len(shape)-2) + (smooth, smooth)
+        sums = scNdimage.gaussian_filter(sums, sigma, mode='wrap')
+        counts = scNdimage.gaussian_filter(counts, sigma, mode='wrap')
+
+    empty = counts <= 1.e-8*np.max(counts)
+    mask = sums/np.where(empty, 1., counts)
+
+    if not np.any(empty):
+        return mask
+
+    if fill == 'mean':
+        totals = np.sum(sums, axis=(-2,-1))/np.sum(counts, axis=(-2,-1))
+        mask[empty] = np.broadcast_to(totals[...,np.newaxis,np.newaxis], shape)[empty]
+    elif fill == 'median':
+        # the median of the flux of each map, with the maps sorted along with the flux
+        maps = cells//(shape[-2]*shape[-1])
+        order = np.lexsort((flux, maps))
+        starts = np.searchsorted(maps[order], np.arange(ncells//(shape[-2]*shape[-1])))
+        lengths = np.diff(np.append(starts, len(flux)))
+        medians = 0.5*(flux[order][np.clip(starts+(lengths-1)//2, 0, len(flux)-1)] + flux[order][np.clip(starts+lengths//2, 0, len(flux)-1)])
+        mask[empty] = np.broadcast_to(medians.reshape(shape[:-2])[...,np.newaxis,np.newaxis], shape)[empty]
+    elif fill == 'nearest':
+        # nearest filled cell within the same map, since a step between maps is larger than any distance within a map
+        sampling = (shape[-2]+shape[-1],)*(len(shape)-2) + (1, 1)
+        nearest = scNdimage.distance_transform_edt(empty, sampling=sampling, return_distances=False, return_indices=True)
+        mask = mask[tuple(nearest)]
+    elif fill == 'nan':
+        mask[empty] = np.nan
+    else:
+        raise ValueError(str(fill)+' is not a valid fill option. Use mean, median, nearest or nan.')
+
+    return mask
+
+
+def intrem(flux, xpos, ypos, sizex=10, sizey=10, fill='mean', smooth=0.):
+
+    """
+    create a x, y map of a pixel and remove it from the flux. The map (minus its median) is subtracted from each point with one gather over the cell indices.
 
     @flux- flux array
     @xpos - array of x center positions for the star psf
     @ypos - array of y center positions for the star psf
+    @sizex - number of x bins in a pixel (sub-pixel resolution)
+    @sizey - number of y bins in a pixel (sub-pixel resolution)
+    @fill - value of the cells without points, see map
+    @smooth - width of the gaussian smoothing of the map in cells, see map
  
     @return intrapixel corrected flux
     @rtype: numpy array
 
     """
 
-    fluxn = np.array([])
-    xcph = xpos % 1 * 10
-    ycph = ypos % 1 * 10
-    mask = map(flux, xcph, ycph)
-    mask = mask -np.median(mask)
-    rem = np.column_stack((np.floor(xcph).astype(int), np.floor(ycph).astype(int)))
-    nrem = [(x[0],x[1]) for x in rem]
-#	print "NREM", nrem
-#	print nrem[0]
-#	print mask[nrem[0]]
-    for x in range(len(flux)):
-        fluxn = np.append(fluxn, flux[x] - mask[nrem[x]])
-#    for x in range(len(flux)):
-#        print "x1", x
-#        fluxn = np.append(fluxn, flux[x] - mask[nrem[x]])
-#    for x in range(len(flux)):
-
-#        print "x2", x
-#        fluxn = np.append(fluxn, flux[x] - mask[nrem[x]])
-#        print x    
-#    for x in range(len(flux)):
-#        print x, len(flux)
-##        print x, nrem[x], flux[x]
-#        print fluxn
-#        fluxn = np.append(fluxn, flux[x] - mask[nrem[x]])
-#        print fluxn
-#        print len(flux)
-#	new = np.column_stack((data[:,0], fluxn, data[:,[2,-3,-2,-1]]))
+    xcph = xpos % 1 * sizex
+    ycph = ypos % 1 * sizey
+    cells = intrapixel_cells(xcph, ycph, sizex, sizey)
+    mask = cell_maps(flux, cells, (sizex, sizey), fill=fill, smooth=smooth)
+    mask = mask - np.nanmedian(mask)
+    fluxn = flux - mask.ravel()[cells]
 
     return fluxn
 
@@ -108,64 +160,81 @@ def intrem(flux, xpos, ypos):
 
 
 
-def binnedINTRAPIXEL(flux, xpos, ypos, binENDindexes, plot=False):
+def binnedINTRAPIXEL(flux, xpos, ypos, binENDindexes, plot=False, sizex=10, sizey=10, fill='mean', smooth=0., return_maps=False):
 
     """
-    This function will loop over all the individual defined data chunks and perform an intrapixel correction on each one.
+    This function will perform an intrapixel correction (see intrem) on each of the individual defined data chunks. All chunks are done at once: the maps of all chunks follow from one bincount over the (chunk, xcell, ycell) keys, and the correction from one gather.
     @flux- flux array
     @xpos - array of x center positions for the star psf
     @ypos - array of y center positions for the star psf
     @binENDindexes - indexes corresponding to the end of each data chunk used to split the full array.
-    @return intrapixel corrected flux
-    @rtype: numpy array
+    @plot - plot the original and corrected flux of each chunk afterwards (see plot_intrapixel)
+    @sizex, sizey, fill, smooth - sub-pixel resolution, fill policy of empty cells and smoothing of the maps, see intrem
+    @return_maps - also return the map of each chunk (minus its median)
+    @return intrapixel corrected flux (and the maps if return_maps=True)
+    @rtype: numpy array (and numpy array of size (number of chunks) x sizex x sizey)
 
     """
-    init_ind = 0 # starting index
-    flux_corrected = []
-    for x in range(len(binENDindexes)):
+    binENDindexes = np.asarray(binENDindexes)
+    nbins = len(binENDindexes)
+    npoints = binENDindexes[-1]+1 # the points after the last chunk are not returned
+    flux = flux[:npoints]
+    xpos = xpos[:npoints]
+    ypos = ypos[:npoints]
 
-        
-        fin_ind = binENDindexes[x]+1 # ending index
-        
-        # define data chunk
-        fluxchunk = flux[init_ind:fin_ind]
-        xchunk = xpos[init_ind:fin_ind]
-        ychunk = ypos[init_ind:fin_ind]
-        
-        # apply intrapixel correction
-            
-        fluxchunknew =  intrem(fluxchunk, xchunk, ychunk)   
-       
-        #plot if that's what you want to do 
-        if plot:
-            f, (ax1, ax2) = plt.subplots(2,1)
-            ax1.set_xlabel('X Position')
-            ax1.set_ylabel('Flux')
-            ax2.set_ylabel('Flux')
-            ax2.set_xlabel('Y Position')
-
-            ax1.plot(xchunk, fluxchunk, 'k.', label='original')
-            ax1.plot(xchunk, fluxchunknew, 'r.', ms=2, label='corrected')
-            ax1.legend(prop={'size':7})
-            ax2.plot(ychunk, fluxchunk, 'k.', label='original')
-            ax2.plot(ychunk, fluxchunknew, 'r.', ms=2, label='corrected')
-            ax2.legend(prop={'size':7})
-            plt.show()                        
-        # append timechunk to an array
-
-        flux_corrected.append(fluxchunknew)
-        
-        # redefine init_ind
+    # chunk of each point, and its cell within the maps of all chunks
+    bins = np.searchsorted(binENDindexes, np.arange(npoints), side='left')
+    cells = bins*sizex*sizey + intrapixel_cells(xpos % 1 * sizex, ypos % 1 * sizey, sizex, sizey)
+
+    maps = cell_maps(flux, cells, (nbins, sizex, sizey), fill=fill, smooth=smooth)
+    maps = maps - np.nanmedian(maps.reshape(nbins, -1), axis=1)[:,np.newaxis,np.newaxis]
+    flux_corrected = flux - maps.ravel()[cells]
 
-        init_ind = binENDindexes[x]+1
+    #plot if that's what you want to do
+    if plot:
+        plot_intrapixel(flux, flux_corrected, xpos, ypos, binENDindexes)
 
-    flux_corrected = np.concatenate(flux_corrected)
+    # flux is the only value which has changed and therefore the only value returned, unless the maps are asked for
 
-    # flux is the only value which has changed and therefore the only value returned
+    if return_maps:
+        return flux_corrected, maps
 
     return flux_corrected
 
 
+def plot_intrapixel(flux, flux_corrected, xpos, ypos, binENDindexes):
+
+    """
+    Plot the original and intrapixel corrected flux against the x and y position, one figure per data chunk (see binnedINTRAPIXEL).
+    @flux- flux array
+    @flux_corrected - intrapixel corrected flux array
+    @xpos - array of x center positions for the star psf
+    @ypos - array of y center positions for the star psf
+    @binENDindexes - indexes corresponding to the end of each data chunk used to split the full array.
+
+    """
+    init_ind = 0 # starting index
+    for fin_ind in np.asarray(binENDindexes)+1:
+        chunk = slice(init_ind, fin_ind)
+        f, (ax1, ax2) = plt.subplots(2,1)
+        ax1.set_xlabel('X Position')
+        ax1.set_ylabel('Flux')
+        ax2.set_ylabel('Flux')
+        ax2.set_xlabel('Y Position')
+
+        ax1.plot(xpos[chunk], flux[chunk], 'k.', label='original')
+        ax1.plot(xpos[chunk], flux_corrected[chunk], 'r.', ms=2, label='corrected')
+        ax1.legend(prop={'size':7})
+        ax2.plot(ypos[chunk], flux[chunk], 'k.', label='original')
+        ax2.plot(ypos[chunk], flux_corrected[chunk], 'r.', ms=2, label='corrected')
+        ax2.legend(prop={'size':7})
+
+        init_ind = fin_ind
+    plt.show()
+
+    return
+
+
 def phase_shift(phase):
 
     """
@@ -211,7 +280,7 @@ def phase_shift(phase):
 
     return phshift
 
-def corr_strength(data, col, names = None, plot=False):
+def corr_strength(data, col, names = None, plot=False, method='pearson'):
 
     """
 
@@ -220,14 +289,12 @@ def corr_strength(data, col, names = None, plot=False):
     @data - data (array)
     @col - data columns to be considered (Flux must be the first column). (list)
     @columns - columns dictionary for providing names to the correlations (optional). Otherwise just the columns will be printed. (dict)
+    @method - 'pearson' correlation, or 'spearman' rank correlation
     @return correlations and corresponding data column numbers in descending order
     """
 
-    datan = data[:,col]
-    datan = datan-np.mean(datan, axis=0)
-    datan = datan/np.std(datan, axis=0) 
-    cov_matrix = np.cov(datan.T)
-    correlations = cov_matrix[0]
+    datan = standardised_columns(data, col, method=method)
+    correlations = datan.T.dot(datan[:,0])/len(datan)
 #    correlations = np.delete(correlations, 0)
 #    names2 = np.copy(names)
     y = np.argsort(abs(correlations[1::]))[::-1]
@@ -253,6 +320,45 @@ def corr_strength(data, col, names = None, plot=False):
     return colmax, cormax
 
 
+def standardised_columns(data, col, method='pearson'):
+
+    """
+    Standardise the given data columns to zero mean and unit standard deviation, such that the correlation of two columns is the mean of their product. Constant columns become zero, i.e. they have no correlation with anything.
+
+    @data - data (array)
+    @col - data columns to standardise (list)
+    @method - 'pearson' uses the values themselves, 'spearman' their ranks (rank correlation)
+    @return - standardised columns (array of size N x len(col))
+    """
+
+    values = data[:,col].astype(float)
+    if method == 'spearman':
+        values = np.apply_along_axis(scStats.rankdata, 0, values)
+    elif method != 'pearson':
+        raise ValueError(str(method)+' is not a valid correlation method. Use pearson or spearman.')
+
+    values = values - np.mean(values, axis=0)
+    std = np.std(values, axis=0)
+
+    return values/np.where(std > 0, std, np.inf)
+
+
+def flux_correlations(flux, standardised, method='pearson'):
+
+    """
+    Correlation of the flux with each of the (already) standardised columns, see standardised_columns. Only the flux is standardised here, so this costs O(N p) for p columns.
+
+    @flux - flux array
+    @standardised - standardised columns (array of size N x p)
+    @method - 'pearson' or 'spearman', as used for the standardised columns
+    @return - correlations (array of length p)
+    """
+
+    fluxn = standardised_columns(flux[:,np.newaxis], [0], method=method)[:,0]
+
+    return standardised.T.dot(fluxn)/len(fluxn)
+
+
 def ind_split(time, gapsize=0.5):
 
     """
@@ -355,11 +461,11 @@ def param_detrend(time, flux, param, name, **kwargs):
 
         #correct for position
         try:
-            tckPOScorrection = POSdetrendBRITE.detrendPOSITIONflux(time, param, flux,SPLINEknotpointsSPACING = SPLINEknotpointsSPACING,  **kwargs)
+            tckPOScorrection = POSdetrendBRITE.detrendPOSITIONflux(time, param, flux, **kwargs)
 
             correction = scInterp.splev(param, tckPOScorrection)
-        except:
-            #sometimes the knotpointspacing is larger than the lenght of the parameters
+        except ValueError:
+            #sometimes the knotpointspacing is larger than the lenght of the parameters, so none of the spline fits is usable
             SPLINEknotpointsSPACING = np.linspace((max(param)-min(param))/4.0, max(param)-min(param)-0.1, 4)   
             tckPOScorrection = POSdetrendBRITE.detrendPOSITIONflux(time, param, flux,SPLINEknotpointsSPACING = SPLINEknotpointsSPACING,  **kwargs)
 
@@ -398,8 +504,8 @@ SPLINEknotpointsSPACING=SPLINEknotpointsSPACING, **kwargs)
 #        tckPOScorrection = POSdetrendBRITE.detrendPOSITIONflux(time, param, flux, **kwargs)
 
 #        correction = scInterp.splev(param, tckPOScorrection) 
-        except:
-            #sometimes the knotpointspacing is larger than the lenght of the parameters
+        except ValueError:
+            #sometimes the knotpointspacing is larger than the lenght of the parameters, so none of the spline fits is usable
             SPLINEknotpointsSPACING = np.linspace((max(param)-min(param))/4.0, max(param)-min(param)-0.1, 4)   
             tckTEMPcorrection = TEMPdetrendBRITE.detrendTEMPflux(time, param, flux,SPLINEknotpointsSPACING = SPLINEknotpointsSPACING,  **kwargs)
 
@@ -411,7 +517,7 @@ SPLINEknotpointsSPACING=SPLINEknotpointsSPACING, **kwargs)
         try:
             tckTEMPcorrection = TEMPdetrendBRITE.detrendTEMPflux(time, param, flux, **kwargs)
             correction = scInterp.splev(param, tckTEMPcorrection)
-        except:
+        except ValueError:
             SPLINEknotpointsSPACING = np.linspace((max(param)-min(param))/4.0, max(param)-min(param)-0.1, 4)   
             tckTEMPcorrection = TEMPdetrendBRITE.detrendTEMPflux(time, param, flux,SPLINEknotpointsSPACING = SPLINEknotpointsSPACING,  **kwargs)
 
@@ -431,57 +537,66 @@ SPLINEknotpointsSPACING=SPLINEknotpointsSPACING, **kwargs)
 
     return correction
 
-def auto_detrend(data, cols, columns, mincorr=0.1, plot=False, **kwargs):
+def auto_detrend(data, cols, columns, mincorr=0.1, plot=False, method='pearson', silent=False, **kwargs):
 
     """
     for a given set of data. Determine correlation, If correlation is over mincorr, correct and iterate until no correlations over mincorr exist. One correction maximum per parameter is done.
+    The parameter columns do not change, so they are standardised once (see standardised_columns), and only the correlations with the corrected flux are updated in each iteration (see flux_correlations).
     @data - data array.
-    @cols - columns to consider for correlations
+    @cols - columns to consider for correlations (Flux must be the first column)
     @columns - dictionary of columns
     @mincorr - minimum correlation necessary in order to detrend on a given parameter.
+    @method - 'pearson' correlation, or 'spearman' rank correlation
+    @silent - do not print the correlations and corrections
+    @return - detrended flux
     """ 
 
     inv_columns = {v: k for k, v in columns.items()}
-    maxcorr = mincorr
-    names = [ inv_columns[k] for k in cols]
+    params = list(cols[1:])
     time = data[:,columns['HJD']]
     flux = data[:,columns['FLUX']]
-    coln = copy.copy(cols)
-    datan = np.copy(data)
+    standardised = standardised_columns(data, params, method=method)
+    todo = np.ones(len(params), dtype=bool) # parameters which have not been corrected yet
     if plot:
         plot_names = []
         plot_fluxes = []
         plot_params = []
         plot_corrections = []
 
-    while (maxcorr >= mincorr) and (len(coln) > 1):
-
-        colnum, maxcorr = corr_strength(datan, coln, names = names, plot=False)
-        print colnum, maxcorr
-        if maxcorr >= mincorr:
-            param = data[:,colnum]
-            name = inv_columns[colnum]
+    while np.any(todo):
+
+        correlations = np.zeros(len(params))
+        correlations[todo] = flux_correlations(flux, standardised[:,todo], method=method)
+        best = np.argmax(abs(correlations))
+        colnum, maxcorr = params[best], abs(correlations[best])
+        if not silent:
+            for x in np.argsort(abs(correlations))[::-1][:np.sum(todo)]:
+                print(str(inv_columns[params[x]])+' '+str(correlations[x]))
+        if maxcorr < mincorr:
+            break
+
+        param = data[:,colnum]
+        name = inv_columns[colnum]
+        if not silent:
             print("Correcting for "+str(name))
-            correction = param_detrend(time, flux, param, name, **kwargs)
-            datan[:,columns['FLUX']] = flux-correction
-            if plot:
-                plot_names.append(name)
-                plot_fluxes.append(flux)
-                plot_params.append(param)
-                plot_corrections.append(correction)
+        correction = param_detrend(time, flux, param, name, **kwargs)
+        if plot:
+            plot_names.append(name)
+            plot_fluxes.append(flux)
+            plot_params.append(param)
+            plot_corrections.append(correction)
             
             
-            flux = flux - correction
-            coln.remove(colnum)
-            names.remove(inv_columns[colnum])
+        flux = flux - correction
+        todo[best] = False
 
     if plot == True:
 
         nrows = 2
         ncols = int(len(plot_names))
-        print ncols
         if ncols == 0:
-            print("I didn't correct anything so there is nothing to plot")
+            if not silent:
+                print("I didn't correct anything so there is nothing to plot")
         elif ncols == 1:
             f, axarr = plt.subplots(nrows, ncols, sharey = True)
             x= 0
@@ -495,10 +610,7 @@ def auto_detrend(data, cols, columns, mincorr=0.1, plot=False, **kwargs):
         else: 
             f, axarr = plt.subplots(nrows, ncols, sharey = True)
             for x in range(len(plot_names)):
-                print "shape", axarr.shape
-                print plot_names[x], x
                 axarr[0,x].set_title(plot_names[x])
-                print len(plot_params[x]), len(plot_fluxes[x]), np.mean(plot_fluxes[x]) 
                 axarr[0,x].plot(plot_params[x], plot_fluxes[x]-np.mean(plot_fluxes[x]), 'k.', ms=1.0)
                 axarr[0,x].plot(plot_params[x], plot_corrections[x], 'r.')
                 axarr[1,x].plot(plot_params[x], plot_fluxes[x]-np.mean(plot_fluxes[x]) -plot_corrections[x], 'k.', ms=1.0)
@@ -507,6 +619,38 @@ def auto_detrend(data, cols, columns, mincorr=0.1, plot=False, **kwargs):
 
     return flux
 
+def simultaneous_detrend(data, cols, columns, spacings=None, **kwargs):
+
+    """
+    Detrend the flux for all given parameters at once, with one additive spline model (see BRITE_decor.fitting.splineadditive). Unlike auto_detrend, there is no iteration over the most correlated parameter, so the result does not depend on the order of the corrections.
+    @data - data array.
+    @cols - columns of the parameters to detrend on
+    @columns - dictionary of columns
+    @spacings - dictionary with the knotpoint spacing per column name (optional). Otherwise 1/5 of the range of each parameter is used, or 1/6 for the (periodic) phase.
+    @return - detrended flux, and the correction for each parameter (dictionary with the column names as keys)
+    """
+
+    inv_columns = {v: k for k, v in columns.items()}
+    names = [inv_columns[k] for k in cols]
+    flux = data[:,columns['FLUX']]
+    params = [data[:,k] for k in cols]
+    if spacings is None:
+        spacings = {}
+
+    periodic = [name in ['Phase', 'phase'] for name in names]
+    knotspacing = []
+    for name, param, per in zip(names, params, periodic):
+        if name in spacings:
+            knotspacing.append(spacings[name])
+        elif per:
+            knotspacing.append(1./6.)
+        else:
+            knotspacing.append((max(param)-min(param))/5.)
+
+    corrections, offset, tcks = additiveBRITE.additiveSPLINEfit(flux, params, ADDITIVEknotpointsSPACING=knotspacing, ADDITIVEperiodic=periodic, **kwargs)
+
+    return flux - np.sum(corrections, axis=0), dict(zip(names, corrections))
+
 def orb_err(flux):
 
     """
@@ -549,18 +693,20 @@ def data_err(time, flux, oper):
     return tot_err
 
 
-def bin_brite(data, tcol=0 , tel=None, per=None, error = False, return_dict =False):
+def bin_brite(data, tcol=0 , tel=None, per=None, error = False, return_dict =False, median=False, std=False):
 
     """
     
-    Bin data on the  BRITE satellite orbital period. This will bin every quantity in the given array AND will provide an rms column for the flux if error = True.
+    Bin data on the  BRITE satellite orbital period. This will bin every quantity in the given array AND will provide an rms column for the flux if error = True. All orbits and columns are binned at once, with np.add.reduceat over the first index of each orbit.
     @data - data array. Flux is assumed to be the second column (array)
     @tcol - data column corresponding to the time array (integer)
     @tel - BRITE telescope ID. This is necessary unless period is provided (string)
     @per - orbital period...will accept telescope first if given (float)
     @error - calculate error in fluxes (boolean)
     @return_dict - when calculating errors this returns dictionary entries for added column
-    @return - binned data array with flux errors if error == True and 2 separate dictionary entries if return_dict=True.
+    @median - bin every quantity with the median of each orbit instead of the mean (boolean)
+    @std - also return the standard deviation of every quantity in each orbit (boolean)
+    @return - binned data array with flux errors if error == True and 2 separate dictionary entries if return_dict=True. If std == True, the array with the standard deviations (same shape as the binned data, without the error column) is returned last.
     
     """
 
@@ -573,51 +719,65 @@ def bin_brite(data, tcol=0 , tel=None, per=None, error = False, return_dict =Fal
 
     if tel:
 
-        oper = {'UBr':100.3708/1440., 'BAb':100.3617/1440., 'BTr':98.2428/1440., 'BLb':99.6651/1440., 'BHr':97.0972/1440.} 
-        per = oper[tel]
+        per = SATELLITEperiods[tel]/1440.
 
-    if per == 'None':
+    if per is None:
 
         raise ValueError('you must provide a telescope ID OR your own period')
 
 
-    datan = copy.copy(data)
-    dmax = per/(2*1440.)
+    # first index and number of points of each orbit
+    indices = ind_split(time, per/2.0)
+    starts = np.append(0, indices[:-1]+1)
+    lengths = np.diff(np.append(starts, len(data)))[:,np.newaxis].astype(float)
 
-    tstart = time[0]
-    tfin = tstart+dmax 
+    means = np.add.reduceat(data, starts, axis=0)/lengths
+    if error or std:
+        deviations = data - np.repeat(means, lengths[:,0].astype(int), axis=0)
+        stds = np.sqrt(np.add.reduceat(deviations**2.0, starts, axis=0)/lengths)
 
-    indices = ind_split(time, per/2.0)
-    datasplit = array_split(data, indices)
-    binned = []
-    if error:
-        rms_error=[]
-    for x in datasplit:
-        
-        binned.append(np.mean(x, axis=0))
-        
-        if error:
-            
-            #calculate rms error here
-            rms_error.append(orb_err(x[:,1]))
-            colnew = {}
-            parnew = {}
-    datab = np.vstack((binned))
+    if median:
+        datab = np.column_stack([_segment_median(column, starts) for column in data.T])
+    else:
+        datab = means
 
     
     if error:
-        rms_error = np.array(rms_error)
+        # rms error of the flux, as orb_err
+        rms_error = stds[:,1]/np.sqrt(lengths[:,0])
         
         #append rms error to datab array as last column
         datab = np.column_stack((datab, rms_error))
-        colnew['Error'] = len(datab[0])-1
-        parnew['column'+str(len(datab[0])-1)] = 'Error'
+        colnew = {'Error': len(datab[0])-1}
+        parnew = {'column'+str(len(datab[0])-1): 'Error'}
 
+    results = (datab,)
     if return_dict and error:
-        return datab, colnew, parnew
+        results = results + (colnew, parnew)
+    if std:
+        results = results + (stds,)
 
+    if len(results) == 1:
+        return datab
     else:
-        return datab   
+        return results
+
+
+def _segment_median(values, starts):
+
+    """
+    Median of the values in each segment, with the segments starting at the given indices. The values are sorted within each segment at once.
+    @values - array of values
+    @starts - first index of each segment (array)
+    @return - median of each segment (array)
+
+    """
+
+    segments = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(values))))
+    values = values[np.lexsort((values, segments))]
+    ends = np.append(starts[1:], len(values))-1
+
+    return 0.5*(values[(starts+ends)//2] + values[(starts+ends+1)//2])
     
 def outlier_id(param, time, percent_low, percent_high, frac = 0.15, **kwargs):
 
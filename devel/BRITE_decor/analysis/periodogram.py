@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+Routines to determine the periodogram (amplitude or Lomb-Scargle power spectrum) of unevenly sampled data, e.g. the residuals of a detrended BRITE lightcurve, and to annotate its peaks with the orbital frequency of the satellite and its aliases.
+
+The periodogram follows from the trigonometric sums sum(h cos(2 pi f t)) and sum(h sin(2 pi f t)) on an equidistant frequency grid. These are determined either exactly, with vectorised (chunked) sums over all datapoints and frequencies, or approximately, by extirpolating the data onto an equidistant time grid and using one FFT (Press & Rybicki 1989). The fast method scales as O(N log N) instead of O(N x number of frequencies). Use the exact method to validate it.
+
+NOTE Works on full-cadence data, and on orbit averaged data (e.g. BRITE_decor.timing.orbit.averageORBIT), where the number of datapoints per orbit can be used as weights.
+
+Last update 19 October 2026
+
+@author: Bram Buysschaert
+"""
+
+#===============================================================================
+# 				Packages
+#===============================================================================
+import numpy as np
+
+from math import factorial
+
+from BRITE_decor.clipping.fourierfilters import fastFFTlength
+from BRITE_decor.timing.orbit import SATELLITEperiods
+#===============================================================================#
+# 			Class for colored console printing			#
+#===============================================================================#
+"""
+Copied from http://stackoverflow.com/questions/22886353/printing-colors-in-python-terminal
+"""
+class bcolors:
+    HEADER = '\033[95m'
+    OKBLUE = '\033[94m'
+    OKGREEN = '\033[92m'
+    WARNING = '\033[93m'
+    FAIL = '\033[91m'
+    ENDC = '\033[0m'
+    BOLD = '\033[1m'
+    UNDERLINE = '\033[4m'
+#===============================================================================
+# 				Code
+#===============================================================================
+def frequencyGRID(time, **kwargs):
+    """
+    Determine the equidistant frequency grid of the periodogram.
+
+    Returns: The frequencies.
+
+    @param time: time measurements [d]
+    @type time: numpy array of length N
+
+    @return frequencies: equidistant frequencies [c/d]
+    @rtype: numpy array of length F
+
+    @kwargs: PERIODOGRAMoversample: number of frequencies per 1/T, with T the timespan - Default is 10 [integer]
+    @kwargs: PERIODOGRAMfmin: lowest frequency - Default is the frequency step [c/d]
+    @kwargs: PERIODOGRAMfmax: upper limit of the frequencies, which stay strictly below it - Default is half the median sampling rate (the Nyquist frequency of evenly sampled data), with a maximum of 50 [c/d]
+    """
+    oversampleGRID = kwargs.get('PERIODOGRAMoversample', 10) #[integer]
+    stepFREQUENCY = 1. / (oversampleGRID * (np.max(time) - np.min(time))) #[c/d]
+    minFREQUENCY = kwargs.get('PERIODOGRAMfmin', stepFREQUENCY) #[c/d]
+    maxFREQUENCY = kwargs.get('PERIODOGRAMfmax', min(0.5 / np.median(np.diff(np.sort(time))), 50.)) #[c/d]
+
+    # Strictly below maxFREQUENCY: at the Nyquist frequency of evenly sampled data, the sine term of the fit is undetermined
+    return minFREQUENCY + stepFREQUENCY * np.arange(int(np.ceil((maxFREQUENCY - minFREQUENCY) / stepFREQUENCY)))
+
+def periodogram(time, flux, **kwargs):
+    """
+    Determine the amplitude spectrum or the Lomb-Scargle power spectrum of the flux, on the equidistant frequency grid of frequencyGRID.
+
+    The amplitude spectrum is the classical (Fourier) one, 2 |sum(w h exp(2 pi i f t))| with normalised weights w, i.e. sqrt(4 P / N) for the classical periodogram P of equally weighted data. It equals the amplitude of a sine at f in well sampled data, and does not blow up at frequencies where the sampling cannot constrain a sine (e.g. the Nyquist frequency, or half the orbital frequency of strictly periodic orbit sampling).
+
+    The power spectrum is the Lomb-Scargle one: for each frequency, a sine is fitted by least squares (with the phase offset tau of Lomb-Scargle, so the cosine and sine terms are orthogonal), and the fraction of the variance it explains is returned (the 'standard' normalised power, between 0 and 1). The sine term is dropped where its normalisation falls below PERIODOGRAMtolerance, since it is undetermined there.
+
+    Returns: The frequencies and the amplitude (or power) spectrum.
+
+    @param time: time measurements [d]
+    @type time: numpy array of length N
+    @param flux: flux measurements [adu]
+    @type flux: numpy array of length N
+
+    @return frequencies: frequencies [c/d]
+    @rtype: numpy array of length F
+    @return spectrum: amplitude [adu] or power [] of each frequency
+    @rtype: numpy array of length F
+
+    @kwargs: PERIODOGRAMmethod: 'fast' (extirpolation and FFT) or 'exact' (direct sums) - Default is 'fast' [string]
+    @kwargs: PERIODOGRAMnormalization: 'amplitude' or 'power' - Default is 'amplitude' [string]
+    @kwargs: PERIODOGRAMweights: weight of each datapoint, e.g. the number of datapoints per orbit for orbit averaged data - Default is None (equal weights)
+    @kwargs: PERIODOGRAMchunk: maximum number of elements (datapoints x frequencies) per chunk of the exact method - Default is 1e7 [integer]
+    @kwargs: PERIODOGRAMfftOVERSAMPLE: oversampling of the FFT grid of the fast method - Default is 10 [integer]
+    @kwargs: PERIODOGRAMextirpolation: number of grid points used to extirpolate each datapoint in the fast method - Default is 6 [integer]
+    @kwargs: PERIODOGRAMtolerance: minimum normalisation of the sine term of the power - Default is 1e-10 [float]
+    @kwargs: see frequencyGRID for the frequency grid
+    """
+    methodPERIODOGRAM = kwargs.get('PERIODOGRAMmethod', 'fast') #[string]
+    normalizationPERIODOGRAM = kwargs.get('PERIODOGRAMnormalization', 'amplitude') #[string]
+    weights = kwargs.get('PERIODOGRAMweights', None)
+    toleranceSS = kwargs.get('PERIODOGRAMtolerance', 1.e-10) #[float]
+    if not methodPERIODOGRAM in ['fast', 'exact']:
+      raise ValueError('Please specify PERIODOGRAMmethod properly as either "fast" or "exact".')
+    if not normalizationPERIODOGRAM in ['amplitude', 'power']:
+      raise ValueError('Please specify PERIODOGRAMnormalization properly as either "amplitude" or "power".')
+
+    # The periodogram does not depend on the zeropoint of the time, but the rounding errors of the phases do
+    time = np.asarray(time, dtype=float) - np.min(time)
+    flux = np.asarray(flux, dtype=float)
+    frequencies = frequencyGRID(time, **kwargs)
+    weights = np.ones_like(flux) if weights is None else np.asarray(weights, dtype=float)
+    weights = weights / np.sum(weights)
+    fluxCENTERED = flux - np.dot(weights, flux)
+
+    # The trigonometric sums of the data, and of the weights at double the frequencies (for tau of the power)
+    sinFLUX, cosFLUX = trigSUMS(time, weights * fluxCENTERED, frequencies[0], frequencies[1] - frequencies[0], len(frequencies), **kwargs)
+    if normalizationPERIODOGRAM == 'amplitude':
+      return frequencies, 2. * np.hypot(sinFLUX, cosFLUX)
+    sinDOUBLE, cosDOUBLE = trigSUMS(time, weights, 2. * frequencies[0], 2. * (frequencies[1] - frequencies[0]), len(frequencies), **kwargs)
+
+    # cos(2 omega tau) and sin(2 omega tau), converted to cos(omega tau) and sin(omega tau)
+    normDOUBLE = np.hypot(cosDOUBLE, sinDOUBLE)
+    cos2TAU = np.where(normDOUBLE > 0, cosDOUBLE / np.where(normDOUBLE > 0, normDOUBLE, 1.), 1.)
+    cosTAU = np.sqrt(0.5 * (1. + cos2TAU))
+    sinTAU = np.where(sinDOUBLE < 0, -1., 1.) * np.sqrt(np.clip(0.5 * (1. - cos2TAU), 0., None))
+
+    YC = cosFLUX * cosTAU + sinFLUX * sinTAU
+    YS = sinFLUX * cosTAU - cosFLUX * sinTAU
+    CC = 0.5 * (1. + normDOUBLE)
+    SS = 0.5 * (1. - normDOUBLE)
+    termSS = np.where(SS > toleranceSS, YS**2 / np.where(SS > toleranceSS, SS, 1.), 0.)
+
+    return frequencies, (YC**2 / CC + termSS) / np.dot(weights, fluxCENTERED**2)
+
+def trigSUMS(time, values, minFREQUENCY, stepFREQUENCY, NUMBERfrequencies, **kwargs):
+    """
+    Determine sum(values sin(2 pi f time)) and sum(values cos(2 pi f time)) for the equidistant frequencies f = minFREQUENCY + stepFREQUENCY * k, with k = 0, ..., NUMBERfrequencies - 1.
+
+    Returns: The sine and cosine sums.
+
+    @param time: time measurements [d]
+    @type time: numpy array of length N
+    @param values: values to sum [???]
+    @type values: numpy array of length N
+    @param minFREQUENCY: first frequency [c/d]
+    @type minFREQUENCY: numpy.float
+    @param stepFREQUENCY: frequency step [c/d]
+    @type stepFREQUENCY: numpy.float
+    @param NUMBERfrequencies: number of frequencies
+    @type NUMBERfrequencies: integer
+
+    @return sinSUMS: sine sums
+    @rtype: numpy array of length F
+    @return cosSUMS: cosine sums
+    @rtype: numpy array of length F
+
+    @kwargs: see periodogram (PERIODOGRAMmethod, PERIODOGRAMchunk, PERIODOGRAMfftOVERSAMPLE and PERIODOGRAMextirpolation)
+    """
+    methodPERIODOGRAM = kwargs.get('PERIODOGRAMmethod', 'fast') #[string]
+
+    if methodPERIODOGRAM == 'exact':
+      sizeCHUNK = max(1, int(kwargs.get('PERIODOGRAMchunk', 1e7) // len(time))) #[frequencies]
+      sinSUMS, cosSUMS = np.zeros(NUMBERfrequencies), np.zeros(NUMBERfrequencies)
+      for startCHUNK in range(0, NUMBERfrequencies, sizeCHUNK):
+        frequenciesCHUNK = minFREQUENCY + stepFREQUENCY * np.arange(startCHUNK, min(startCHUNK + sizeCHUNK, NUMBERfrequencies))
+        phasesCHUNK = 2. * np.pi * np.outer(frequenciesCHUNK, time)
+        sinSUMS[startCHUNK:startCHUNK + len(frequenciesCHUNK)] = np.dot(np.sin(phasesCHUNK), values)
+        cosSUMS[startCHUNK:startCHUNK + len(frequenciesCHUNK)] = np.dot(np.cos(phasesCHUNK), values)
+      return sinSUMS, cosSUMS
+
+    oversampleFFT = kwargs.get('PERIODOGRAMfftOVERSAMPLE', 10) #[integer]
+    orderEXTIRPOLATION = kwargs.get('PERIODOGRAMextirpolation', 6) #[integer]
+
+    # The data are extirpolated onto an equidistant grid in (time * stepFREQUENCY) modulo 1, after shifting the frequencies to start at minFREQUENCY. The inverse FFT of this grid gives the sums at all frequencies at once.
+    timeSTART = np.min(time)
+    valuesSHIFTED = values * np.exp(2.j * np.pi * minFREQUENCY * (time - timeSTART))
+    lengthFFT = fastFFTlength(NUMBERfrequencies * oversampleFFT)
+    positionsGRID = (((time - timeSTART) * stepFREQUENCY) % 1.) * lengthFFT
+    gridFFT = extirpolate(positionsGRID, valuesSHIFTED.real, lengthFFT, orderEXTIRPOLATION) + 1.j * extirpolate(positionsGRID, valuesSHIFTED.imag, lengthFFT, orderEXTIRPOLATION)
+    sumsFFT = lengthFFT * np.fft.ifft(gridFFT)[:NUMBERfrequencies]
+    sumsFFT *= np.exp(2.j * np.pi * timeSTART * (minFREQUENCY + stepFREQUENCY * np.arange(NUMBERfrequencies)))
+    return sumsFFT.imag, sumsFFT.real
+
+def extirpolate(positions, values, lengthGRID, orderEXTIRPOLATION=4):
+    """
+    Extirpolate the values at the (non-integer) positions onto the integer grid 0, ..., lengthGRID - 1, such that sum(grid * g(arange(lengthGRID))) approximates sum(values * g(positions)) for any smooth function g. Each value is spread over orderEXTIRPOLATION neighbouring grid points with Lagrange weights (Press & Rybicki 1989).
+
+    Returns: The extirpolated grid.
+
+    @param positions: positions of the values, between 0 and lengthGRID
+    @type positions: numpy array of length N
+    @param values: values [???]
+    @type values: numpy array of length N
+    @param lengthGRID: length of the grid
+    @type lengthGRID: integer
+    @param orderEXTIRPOLATION: number of grid points per value
+    @type orderEXTIRPOLATION: integer
+
+    @return grid: extirpolated values
+    @rtype: numpy array of length lengthGRID
+    """
+    # Values exactly on a grid point need no spreading
+    onGRID = positions % 1 == 0
+    grid = np.bincount(positions[onGRID].astype(int) % lengthGRID, weights=values[onGRID], minlength=lengthGRID).astype(float)
+    positions, values = positions[~onGRID], values[~onGRID]
+
+    IDXlow = np.clip((positions - orderEXTIRPOLATION // 2).astype(int), 0, lengthGRID - orderEXTIRPOLATION)
+    numerator = values * np.prod(positions - IDXlow - np.arange(orderEXTIRPOLATION)[:, np.newaxis], 0)
+    denominator = float(factorial(orderEXTIRPOLATION - 1))
+    for jj in range(orderEXTIRPOLATION):
+      if jj > 0:
+        denominator *= jj / float(jj - orderEXTIRPOLATION)
+      IDXgrid = IDXlow + (orderEXTIRPOLATION - 1 - jj)
+      grid += np.bincount(IDXgrid, weights=numerator / (denominator * (positions - IDXgrid)), minlength=lengthGRID)
+    return grid
+
+def periodogramPEAKS(frequencies, spectrum, **kwargs):
+    """
+    Find the highest local maxima of a periodogram.
+
+    Returns: The indexes of the peaks, from the highest to the lowest.
+
+    @param frequencies: frequencies [c/d]
+    @type frequencies: numpy array of length F
+    @param spectrum: amplitude or power of each frequency
+    @type spectrum: numpy array of length F
+
+    @return IDXpeaks: indexes of the peaks
+    @rtype: numpy array of length P (dtype='int')
+
+    @kwargs: PEAKSnumber: maximum number of peaks - Default is 10 [integer]
+    """
+    NUMBERpeaks = kwargs.get('PEAKSnumber', 10) #[integer]
+
+    maskPEAKS = np.zeros(len(spectrum), dtype='bool')
+    maskPEAKS[1:-1] = (spectrum[1:-1] > spectrum[:-2]) & (spectrum[1:-1] >= spectrum[2:])
+    IDXpeaks = np.flatnonzero(maskPEAKS)
+    return IDXpeaks[np.argsort(spectrum[IDXpeaks], kind='mergesort')[::-1][:NUMBERpeaks]]
+
+def orbitalALIASES(frequencies, **kwargs):
+    """
+    Annotate the (peak) frequencies, ordered from the highest to the lowest peak, with the orbital frequency of the satellite. A frequency is flagged as a harmonic of the orbital frequency, and/or as an alias of a higher peak, i.e. at a multiple of the orbital frequency away from it.
+
+    Returns: The harmonic number of each frequency (0 if none), the index of the higher peak it is an alias of (-1 if none), and the number of orbital frequencies between them.
+
+    @param frequencies: frequencies, from the highest to the lowest peak [c/d]
+    @type frequencies: numpy array of length P
+
+    @return harmonicNUMBER: closest harmonic of the orbital frequency, if within ALIAStolerance
+    @rtype: numpy array of length P (dtype='int')
+    @return aliasOF: index of the higher peak, if within ALIAStolerance
+    @rtype: numpy array of length P (dtype='int')
+    @return aliasORDER: number of orbital frequencies between the alias and the higher peak (positive or negative)
+    @rtype: numpy array of length P (dtype='int')
+
+    @kwargs: SATELLITE: name of the satellite, see BRITE_decor.timing.orbit.SATELLITEperiods - Default is 'BAb' [string]
+    @kwargs: Porbit: orbital period of the satellite, overrules SATELLITE [min]
+    @kwargs: ALIAStolerance: maximum frequency difference - Default is 0.01 [c/d]
+    @kwargs: ALIASmaxORDER: maximum number of orbital frequencies between an alias and its peak - Default is 3 [integer]
+    """
+    periodORBIT = kwargs.get('Porbit', SATELLITEperiods[kwargs.get('SATELLITE', 'BAb')]) #[min]
+    toleranceALIAS = kwargs.get('ALIAStolerance', 0.01) #[c/d]
+    maxORDER = kwargs.get('ALIASmaxORDER', 3) #[integer]
+
+    frequencies = np.atleast_1d(frequencies)
+    frequencyORBIT = 1440. / periodORBIT #[c/d]
+
+    harmonicNUMBER = np.rint(frequencies / frequencyORBIT).astype(int)
+    harmonicNUMBER[(np.abs(frequencies - harmonicNUMBER * frequencyORBIT) > toleranceALIAS) | (harmonicNUMBER == 0)] = 0
+
+    # Difference between all pairs, in units of the orbital frequency. Also the reflection at zero frequency (f -> -f) gives an alias.
+    aliasOF, aliasORDER = -np.ones(len(frequencies), dtype=int), np.zeros(len(frequencies), dtype=int)
+    for signREFLECTION in [+1, -1]:
+      differences = frequencies[:, np.newaxis] - signREFLECTION * frequencies[np.newaxis, :]
+      orders = np.rint(differences / frequencyORBIT).astype(int)
+      maskALIAS = (np.abs(differences - orders * frequencyORBIT) <= toleranceALIAS) & (orders != 0) & (np.abs(orders) <= maxORDER)
+      # Only higher peaks, i.e. earlier in the array
+      maskALIAS &= np.tri(len(frequencies), k=-1, dtype='bool')
+      for pp in np.flatnonzero(np.any(maskALIAS, axis=1) & (aliasOF == -1)):
+        aliasOF[pp] = np.flatnonzero(maskALIAS[pp])[0]
+        aliasORDER[pp] = orders[pp, aliasOF[pp]]
+
+    return harmonicNUMBER, aliasOF, aliasORDER
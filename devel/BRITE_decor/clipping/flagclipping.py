@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Routines to perform a rule-based outlier rejection on the (auxiliary) columns of a setup file, such as the qFLAG of DR2 data, or the PSFC1, PSFC2, and RTSC of DR4 data.
+
+NOTE: flagFILTER only uses threshold and percentile comparisons, so it is much faster than any of the lowess based routines. Use it as the first step of your clipping, so the more expensive steps work on fewer datapoints.
+
+Last update 19 October 2026
+
+@author: Bram Buysschaert
+"""
+
+#===============================================================================
+# 				Packages
+#===============================================================================
+import numpy as np
+#===============================================================================#
+# 			Class for colored console printing			#
+#===============================================================================#
+"""
+Copied from http://stackoverflow.com/questions/22886353/printing-colors-in-python-terminal
+"""
+class bcolors:
+    HEADER = '\033[95m'
+    OKBLUE = '\033[94m'
+    OKGREEN = '\033[92m'
+    WARNING = '\033[93m'
+    FAIL = '\033[91m'
+    ENDC = '\033[0m'
+    BOLD = '\033[1m'
+    UNDERLINE = '\033[4m'
+#===============================================================================
+# 				Code
+#===============================================================================
+def flagRULE(param, operator, threshold, **kwargs):
+    """
+    Routine to evaluate one clipping rule on param, returning which elements violate it.
+
+    The supported operators are '==', '!=', '<', '<=', '>' and '>=' (param is compared to the float threshold), 'outside' (threshold is a (percentageLOW, percentageUP) tuple, with the same meaning as in percentageclipping.percentageFILTER), and 'outsideRANGE' (threshold is a (lowerLIMIT, upperLIMIT) tuple in units of param).
+
+    NOTE: NaN values never satisfy a comparison. Use FLAGnan to decide what happens with them.
+
+    Returns: A boolean mask, which is True for the outliers.
+
+    @param param: param measurements [???]
+    @type param: numpy array of length N
+    @param operator: comparison of the rule
+    @type operator: string
+    @param threshold: threshold of the rule [???] or [0-100]
+    @type threshold: numpy.float or tuple of length 2
+
+    @return maskOUTLIERS: mask of the outliers
+    @rtype: numpy array of length N (dtype='bool')
+
+    @kwargs: FLAGnan: consider NaN values in param as outliers - Default is True [Boolean]
+    """
+    # Reading in the kwargs
+    flagNAN = kwargs.get('FLAGnan', True) #[Boolean]
+
+    param = np.asarray(param, dtype=float)
+
+    if operator == '==':
+      maskOUTLIERS = param == threshold
+    elif operator == '!=':
+      maskOUTLIERS = param != threshold
+    elif operator == '<':
+      maskOUTLIERS = param < threshold
+    elif operator == '<=':
+      maskOUTLIERS = param <= threshold
+    elif operator == '>':
+      maskOUTLIERS = param > threshold
+    elif operator == '>=':
+      maskOUTLIERS = param >= threshold
+    elif operator == 'outside':
+      # Same convention as percentageFILTER, i.e. the limits themselves are considered outliers.
+      percentageLOW, percentageUP = threshold
+      lowerLIMIT, upperLIMIT = np.nanpercentile(param, [percentageLOW, 100-percentageUP])
+      maskOUTLIERS = (param <= lowerLIMIT) | (param >= upperLIMIT)
+    elif operator == 'outsideRANGE':
+      lowerLIMIT, upperLIMIT = threshold
+      maskOUTLIERS = (param < lowerLIMIT) | (param > upperLIMIT)
+    else:
+      raise ValueError('Please specify the operator properly as either "==", "!=", "<", "<=", ">", ">=", "outside" or "outsideRANGE".')
+
+    # The comparisons above are False for NaNs, and the != is True for NaNs. So, we force the result here.
+    maskNAN = np.isnan(param)
+    maskOUTLIERS[maskNAN] = flagNAN
+
+    return maskOUTLIERS
+
+def flagFILTER(columns, rules, **kwargs):
+    """
+    Routine to perform a rule-based filtering on any set of loaded columns, e.g. qFLAG for DR2 data, or PSFC1, PSFC2 and RTSC for DR4 data (see BRITE_decor.inout.load.loadSETUP).
+
+    Each rule is a tuple (columnNAME, operator, threshold), which describes the *outliers*. A datapoint is rejected when it violates at least one rule. Some examples are:
+    - ('qFLAG', '==', 0): remove the datapoints where the aperture was not fully rendered (DR2).
+    - ('RTSC', '>', 0.1): remove the datapoints with a strong RTS signal (DR4).
+    - ('PSFC1', 'outside', (1., 1.)): remove the lowest and highest 1% of the PSF blurring coefficient (DR4).
+    See flagRULE for all supported operators.
+
+    Every rule is evaluated on the full arrays at once, without loops over the datapoints. The percentiles of the 'outside' rules are always determined on the full columns, hence the order of the rules does not matter.
+
+    Returns: A boolean mask, which is True for the outliers. Use np.where(maskOUTLIERS)[0] to get the indexes of the outliers, compared to the original array.
+
+    @param columns: the columns on which the rules are applied, with the column name as key
+    @type columns: dictionary of numpy arrays of length N
+    @param rules: the clipping rules (columnNAME, operator, threshold)
+    @type rules: list of tuples
+
+    @return maskOUTLIERS: mask of the outliers
+    @rtype: numpy array of length N (dtype='bool')
+
+    @kwargs: FLAGnan: consider NaN values in the ruled columns as outliers - Default is True [Boolean]
+    @kwargs: doSILENT: silent the printing option of the function - Default is True [Boolean]
+    """
+    # Reading in the kwargs
+    doSILENT = kwargs.get('doSILENT', True) #[Boolean]
+
+    # Check if all columns are there and have the same length, before doing any work
+    lengthCOLUMNS = None
+    for columnNAME, operator, threshold in rules:
+      if not columnNAME in columns:
+        raise KeyError('The column "{}" of the rule is not given. Available columns are: {}'.format(columnNAME, ', '.join(sorted(columns.keys()))))
+      if lengthCOLUMNS is None:
+        lengthCOLUMNS = len(columns[columnNAME])
+      elif len(columns[columnNAME]) != lengthCOLUMNS:
+        raise ValueError('The column "{}" does not have the same length as the other columns.'.format(columnNAME))
+    if lengthCOLUMNS is None: # No rules were given
+      lengthCOLUMNS = len(list(columns.values())[0]) if len(columns) != 0 else 0
+
+    # Doing the filtering itself
+    maskOUTLIERS = np.zeros(lengthCOLUMNS, dtype='bool')
+    for columnNAME, operator, threshold in rules:
+      maskRULE = flagRULE(columns[columnNAME], operator, threshold, **kwargs)
+      if not(doSILENT):
+        print(bcolors.OKBLUE + '\tflagFILTER: rule {} {} {} removes {:d} datapoints'.format(columnNAME, operator, threshold, np.sum(maskRULE)) + bcolors.ENDC)
+      maskOUTLIERS |= maskRULE
+
+    return maskOUTLIERS
+
+if __name__ == '__main__':
+    # TESTING needed
+
+    qFLAG = np.array([1, 1, 0, 1, 0, 1])
+    RTSC = np.array([0.01, 0.5, 0.02, 0.03, 0.01, np.nan])
+    print('outliers are at indexes {}'.format(np.where(flagFILTER({'qFLAG':qFLAG, 'RTSC':RTSC}, [('qFLAG', '==', 0), ('RTSC', '>', 0.1)]))[0]))
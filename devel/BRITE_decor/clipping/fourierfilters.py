@@ -2,7 +2,7 @@
 """
 Routines to perform filtering of a given flux array in Fourier space.
     
-Last update 17 March 2016
+Last update 19 October 2026
 
 @author: Bram Buysschaert
 """
@@ -33,92 +33,227 @@ class bcolors:
 #===============================================================================
 # 				Code
 #===============================================================================
-def highPASSfilter(time, flux, cutOffFrequency, **kwargs):
+def fastFFTlength(length, **kwargs):
   """
-  Passes the lightcurve through a high-pass filter. This leaves only short-time variations in the lightcurve, while reducing any long-term effects.
+  Determine the smallest 5-smooth number (i.e. 2^a 3^b 5^c) which is at least length. FFTs of such a length are much faster than those of e.g. a (large) prime length.
   
-  NOTE: An alternative way is to use a window averaging filter in the time domain. This behaves as a low pass filter. Dividing the low pass from the signal yields a high pass
+  Returns: the FFT length
   
-  Returns: filtered flux measurements (centered around zero intensity units)
+  @param length: minimum length
+  @type length: integer
+  
+  @return: lengthFFT
+  @rtype: integer
+  """
+  lengthFFT = 2**int(np.ceil(np.log2(max(length, 1))))
+  power5 = 1
+  while power5 < lengthFFT:
+    power35 = power5
+    while power35 < lengthFFT:
+      power235 = power35
+      while power235 < length:
+	power235 *= 2
+      lengthFFT = min(lengthFFT, power235)
+      power35 *= 3
+    power5 *= 5
+  return lengthFFT
+
+def equidistantGRID(time, flux, **kwargs):
+  """
+  Resample the lightcurve on an equidistant time grid (with the median time spacing), using a linear interpolation. Nothing is done if the time is already equidistant (roughly in the order of seconds, if the time is in days).
+  
+  Returns: the equidistant time and flux, the time spacing, and if the input was already equidistant
   
   @param time: time measurements [d]
   @type time: numpy array of length N
   @param flux: flux measurements [adu]
   @type flux: numpy array of length N
-  @param cutOffFrequency: frequency limit for the highpass filter (needs inverse units of @param time)
-  @type cutOffFrequency: integer
   
-  @return: filteredFlux
-  @rtype: numpy array of length N
-  
-  
-  WARNING
-  It is expected that your flux is in relative units. Nevertheless, the result from the filtered photometry results in photometry centered around zero.
-  WARNING
-  """
-  """
-  Equidistancy check
-  ------------------
+  @return: equidistantTime
+  @rtype: numpy array of length M
+  @return: equidistantFlux
+  @rtype: numpy array of length M
+  @return: timeSpacing
+  @rtype: numpy.float
+  @return: equidistant
+  @rtype: Boolean
   """
   #The check is roughly in the order of seconds (if the time string is in days)
   meanTimeSpacing = np.mean(time[1:] - time[:-1])
   medianTimeSpacing = np.median(time[1:] - time[:-1])
+  timeSpacing = np.round(medianTimeSpacing,5)
   
-  if np.round(meanTimeSpacing,4) == np.round(medianTimeSpacing,4):
-    equidistant=True
-  else:
-    equidistant=False
+  equidistant = np.round(meanTimeSpacing,4) == np.round(medianTimeSpacing,4)
   
-  if equidistant == False:
-    intFlux = scInterp.interp1d(time,flux) #This is a function
-    equidistantTime = np.arange(time[0], time[-1]+np.round(medianTimeSpacing,5), np.round(medianTimeSpacing,5)) #Might be better, since it increases the length of the array
+  if not(equidistant):
+    equidistantTime = np.arange(time[0], time[-1]+timeSpacing, timeSpacing) #Might be better, since it increases the length of the array
     equidistantTime[-1] = time[-1] #NOTE: this changes the equidistancy for the last pixels, yet it is necessary for a good backwards interpolation
-    equidistantFlux = intFlux(equidistantTime)
+    equidistantFlux = np.interp(equidistantTime, time, flux)
   else:
-    equidistantTime = time
-    equidistantFlux = flux    
-  arrayLength = len(equidistantTime)
+    equidistantTime, equidistantFlux = time, flux
+  return equidistantTime, equidistantFlux, timeSpacing, equidistant
+
+def fourierFILTERS(time, flux, filters, **kwargs):
   """
-  Zero padding in order to have an even entry in the equidistant arrays
-  -----------------
-  """    
-  if arrayLength % 2 == 0:
-    paddingTime = np.arange(max(equidistantTime)+np.round(medianTimeSpacing,5), max(equidistantTime)+(arrayLength+1) * np.round(medianTimeSpacing,5), np.round(medianTimeSpacing,5))
-  else:
-    paddingTime = np.arange(max(equidistantTime)+np.round(medianTimeSpacing,5), max(equidistantTime)+(arrayLength) * np.round(medianTimeSpacing,5), np.round(medianTimeSpacing,5))
-  equidistantTime = np.append(equidistantTime, paddingTime)
-  equidistantFlux = np.append(equidistantFlux-np.mean(equidistantFlux),np.linspace(0,0,num=arrayLength))
+  Passes the lightcurve through any number of ideal filters in Fourier space at once. The lightcurve is resampled on an equidistant grid, mean subtracted, zero padded and Fourier transformed only once. Each filter is a mask on this spectrum, and all filtered spectra are transformed back in one call.
+  
+  The filters are given as tuples:
+  - ('highpass', cutOffFrequency): remove all frequencies below cutOffFrequency.
+  - ('lowpass', cutOffFrequency): remove all frequencies above cutOffFrequency.
+  - ('bandstop', centerOfBands, widthOfBands): remove all frequencies within the bands.
+  - ('bandpass', centerOfBands, widthOfBands): only keep the frequencies within the bands.
+  The frequencies need inverse units of @param time.
+  
+  NOTE: The zero padding is up to a 5-smooth length (see fastFFTlength) of at least (1 + FILTERpadding) times the length of the equidistant lightcurve, so the FFT stays fast for any length.
+  
+  Returns: filtered flux measurements (centered around zero intensity units) for each filter
+  
+  @param time: time measurements [d]
+  @type time: numpy array of length N
+  @param flux: flux measurements [adu]
+  @type flux: numpy array of length N
+  @param filters: the filters, see above
+  @type filters: list of F tuples
+  
+  @return: filteredFluxes
+  @rtype: numpy array of size FxN
+  
+  @kwargs FILTERpadding: minimum zero padding, relative to the length of the equidistant lightcurve - Default is 1.0 [float]
+  @kwargs FILTERnoise: set the removed frequencies to the median of the spectrum (in complex space) instead of putting them to 0+0j - Default is False [Boolean]
+  @kwargs FILTERmode: 'full' interpolates over all gaps, while 'segments' and 'orbits' do not, see segmentedFOURIERfilters - Default is 'full' [string]
+  
+  WARNING
+  It is expected that your flux is in relative units. Nevertheless, the result from the filtered photometry results in photometry centered around zero.
+  WARNING
+  """
+  # Reading the kwargs
+  paddingFILTER = kwargs.get('FILTERpadding', 1.0) #[float]
+  setNoise = kwargs.get('FILTERnoise', False) #[Boolean]
+  modeFILTER = kwargs.get('FILTERmode', 'full') #[string]
+  
+  if modeFILTER != 'full':
+    return segmentedFOURIERfilters(time, flux, filters, **kwargs)
+  
+  equidistantTime, equidistantFlux, timeSpacing, equidistant = equidistantGRID(time, flux)
+  arrayLength = len(equidistantTime)
+  
   """
   Fourier transform
   -----------------
   """
-  fourTransf = np.fft.rfft(equidistantFlux)
-  fourierFreq = np.fft.fftfreq(len(equidistantTime),d=np.round(medianTimeSpacing,5)) #Needs implementation of the rfftfreq, np version 1.9
+  lengthFFT = fastFFTlength(int(np.ceil((1. + paddingFILTER) * arrayLength)))
+  fourTransf = np.fft.rfft(equidistantFlux - np.mean(equidistantFlux), n=lengthFFT)
+  fourierFreq = np.fft.rfftfreq(lengthFFT, d=timeSpacing)
   
-  maxIndexfourierFreq = np.int(len(fourTransf)-1) #Needed, since fftfreq gives you double the amount of elements (negative frequencies)
-  idxToClip = np.where(fourierFreq[:maxIndexfourierFreq] < cutOffFrequency)[0]
-  fourTransfFilter = np.copy(fourTransf)
-  fourTransfFilter[idxToClip] = 0.  
+  """
+  Filtering
+  ---------
+  """
+  # One row of the mask per filter, where True means that the frequency is removed
+  maskFILTERS = np.zeros((len(filters), len(fourierFreq)), dtype='bool')
+  for ff, filterSPEC in enumerate(filters):
+    if filterSPEC[0] == 'highpass':
+      maskFILTERS[ff] = fourierFreq < filterSPEC[1]
+    elif filterSPEC[0] == 'lowpass':
+      maskFILTERS[ff] = fourierFreq > filterSPEC[1]
+    elif filterSPEC[0] in ['bandstop', 'bandpass']:
+      centerOfBands, widthOfBands = np.atleast_1d(filterSPEC[1]), filterSPEC[2]
+      # Frequencies within any of the bands, for all bands at once
+      maskBANDS = np.any(np.abs(fourierFreq[np.newaxis,:] - centerOfBands[:,np.newaxis]) < widthOfBands/2., axis=0)
+      maskFILTERS[ff] = maskBANDS if filterSPEC[0] == 'bandstop' else ~maskBANDS
+    else:
+      raise ValueError('Please specify the filter properly as either "highpass", "lowpass", "bandstop" or "bandpass".')
+  
+  fourTransfFilter = np.where(maskFILTERS, np.median(fourTransf) if setNoise else 0., fourTransf[np.newaxis,:])
   
   """
   Inverse fourier transform
   -------------------------
   """
-  equidistantFluxFilter = np.fft.irfft(fourTransfFilter)
-
-  if equidistant == False:
-    intFluxFilter = scInterp.interp1d(equidistantTime,equidistantFluxFilter) #This is a function
-    filteredFlux = intFluxFilter(time)
+  equidistantFluxFilter = np.fft.irfft(fourTransfFilter, n=lengthFFT, axis=-1)[:,:arrayLength]
+  
+  if not(equidistant):
+    filteredFluxes = np.array([np.interp(time, equidistantTime, fluxFILTER) for fluxFILTER in equidistantFluxFilter])
   else:
-    filteredFlux = equidistantFluxFilter[:arrayLength+1]
-  return filteredFlux
+    filteredFluxes = equidistantFluxFilter
+  return filteredFluxes
 
-def lowPASSfilter(time, flux, cutOffFrequency, **kwargs):
+def segmentedFOURIERfilters(time, flux, filters, **kwargs):
   """
-  Passes the lightcurve through a low-pass filter.
-  This leaves only long-time variations in the lightcurve, while reducing any short-term effects.
+  Passes the lightcurve through the filters of fourierFILTERS, without interpolating over the gaps of the BRITE data.
   
-  NOTE: An alternative way is to use a window averaging filter in the time domain. This behaves directly as a as a low pass filter. Dividing the low pass from the signal yields a high pass
+  The lightcurve is split at every gap larger than SEGMENTgap (e.g. between observing seasons or after a safe mode), and each segment is filtered on its own, so no filler is interpolated over these gaps and the FFT length follows the actual data. Each segment is centered around zero on its own.
+  
+  With FILTERmode = 'orbits', the datapoints of each orbit (separated by gaps larger than LIMITsoft times the median time difference, as in BRITE_decor.timing.orbit.averageORBIT) are averaged first, and the filters work on these orbit averages. The filtered orbit averages are linearly interpolated to all datapoints. The variations within an orbit are above the frequencies resolved by the orbit averages, so they are added back for the filters which pass the high frequencies ('highpass' and 'bandstop'), and removed for the others ('lowpass' and 'bandpass').
+  
+  NOTE: In the 'orbits' mode, the frequencies of the filters should be well below half the orbital frequency of the satellite.
+  
+  Returns: filtered flux measurements (centered around zero intensity units per segment) for each filter
+  
+  @param time: time measurements [d]
+  @type time: numpy array of length N
+  @param flux: flux measurements [adu]
+  @type flux: numpy array of length N
+  @param filters: the filters, see fourierFILTERS
+  @type filters: list of F tuples
+  
+  @return: filteredFluxes
+  @rtype: numpy array of size FxN
+  
+  @kwargs FILTERmode: filter the datapoints ('segments') or the orbit averages ('orbits') of each segment - Default is 'segments' [string]
+  @kwargs SEGMENTgap: minimum gap between two segments - Default is 0.5 [d]
+  @kwargs LIMITsoft: minimum gap between two orbits, as a multiple of the median time difference - Default is 5 [float]
+  """
+  # Reading the kwargs
+  modeFILTER = kwargs.pop('FILTERmode', 'segments') #[string]
+  gapSEGMENT = kwargs.pop('SEGMENTgap', 0.5) #[d]
+  limitORBIT = kwargs.pop('LIMITsoft', 5) #[float]
+  if not modeFILTER in ['segments', 'orbits']:
+    raise ValueError('Please specify FILTERmode properly as either "full", "segments" or "orbits".')
+  
+  time, flux = np.asarray(time, dtype=float), np.asarray(flux, dtype=float)
+  timeDIFF = time[1:] - time[:-1]
+  startSEGMENTS = np.concatenate(([0], np.flatnonzero(timeDIFF > gapSEGMENT) + 1, [len(time)]))
+  
+  if modeFILTER == 'orbits':
+    startORBITS = np.concatenate(([0], np.flatnonzero(timeDIFF >= limitORBIT * np.median(timeDIFF)) + 1))
+    # Every segment starts with a new orbit
+    startORBITS = np.union1d(startORBITS, startSEGMENTS[:-1])
+    numberORBIT = np.diff(np.concatenate((startORBITS, [len(time)])))
+    timeORBIT = np.add.reduceat(time, startORBITS) / numberORBIT
+    fluxORBIT = np.add.reduceat(flux, startORBITS) / numberORBIT
+    # Index of the orbit of each datapoint
+    idxORBIT = np.repeat(np.arange(len(startORBITS)), numberORBIT)
+    passHIGH = np.array([filterSPEC[0] in ['highpass', 'bandstop'] for filterSPEC in filters])
+  
+  filteredFluxes = np.zeros((len(filters), len(time)))
+  for startSEG, endSEG in zip(startSEGMENTS[:-1], startSEGMENTS[1:]):
+    if modeFILTER == 'segments':
+      if endSEG - startSEG > 1:
+	filteredFluxes[:,startSEG:endSEG] = fourierFILTERS(time[startSEG:endSEG], flux[startSEG:endSEG], filters, FILTERmode='full', **kwargs)
+      continue
+    
+    # Orbit averages of this segment
+    firstORBIT, lastORBIT = idxORBIT[startSEG], idxORBIT[endSEG-1] + 1
+    if lastORBIT - firstORBIT > 1:
+      filteredORBIT = fourierFILTERS(timeORBIT[firstORBIT:lastORBIT], fluxORBIT[firstORBIT:lastORBIT], filters, FILTERmode='full', **kwargs)
+    else:
+      filteredORBIT = np.zeros((len(filters), 1))
+    for ff in range(len(filters)):
+      filteredFluxes[ff,startSEG:endSEG] = np.interp(time[startSEG:endSEG], timeORBIT[firstORBIT:lastORBIT], filteredORBIT[ff])
+    # The variations within each orbit
+    withinORBIT = flux[startSEG:endSEG] - fluxORBIT[idxORBIT[startSEG:endSEG]]
+    filteredFluxes[passHIGH,startSEG:endSEG] += withinORBIT[np.newaxis,:]
+  
+  return filteredFluxes
+
+def highPASSfilter(time, flux, cutOffFrequency, **kwargs):
+  """
+  Passes the lightcurve through a high-pass filter. This leaves only short-time variations in the lightcurve, while reducing any long-term effects.
+  
+  NOTE: An alternative way is to use a window averaging filter in the time domain. This behaves as a low pass filter. Dividing the low pass from the signal yields a high pass
+  
+  NOTE: Use fourierFILTERS directly when you need several filters of the same lightcurve.
   
   Returns: filtered flux measurements (centered around zero intensity units)
   
@@ -126,7 +261,7 @@ def lowPASSfilter(time, flux, cutOffFrequency, **kwargs):
   @type time: numpy array of length N
   @param flux: flux measurements [adu]
   @type flux: numpy array of length N
-  @param cutOffFrequency: frequency limit for the lowpass filter (needs inverse units of @param time)
+  @param cutOffFrequency: frequency limit for the highpass filter (needs inverse units of @param time)
   @type cutOffFrequency: integer
   
   @return: filteredFlux
@@ -137,64 +272,35 @@ def lowPASSfilter(time, flux, cutOffFrequency, **kwargs):
   It is expected that your flux is in relative units. Nevertheless, the result from the filtered photometry results in photometry centered around zero.
   WARNING
   """
+  return fourierFILTERS(time, flux, [('highpass', cutOffFrequency)], **kwargs)[0]
+
+def lowPASSfilter(time, flux, cutOffFrequency, **kwargs):
   """
-  Equidistancy check
-  ------------------
-  """
-  #The check is roughly in the order of seconds (if the time string is in days)
-  meanTimeSpacing = np.mean(time[1:] - time[:-1])
-  medianTimeSpacing = np.median(time[1:] - time[:-1])
+  Passes the lightcurve through a low-pass filter.
+  This leaves only long-time variations in the lightcurve, while reducing any short-term effects.
   
-  if np.round(meanTimeSpacing,4) == np.round(medianTimeSpacing,4):
-    equidistant=True
-  else:
-    equidistant=False
+  NOTE: An alternative way is to use a window averaging filter in the time domain. This behaves directly as a as a low pass filter. Dividing the low pass from the signal yields a high pass
   
-  if equidistant == False:
-    intFlux = scInterp.interp1d(time,flux) #This is a function
-    equidistantTime = np.arange(time[0], time[-1]+np.round(medianTimeSpacing,5), np.round(medianTimeSpacing,5)) #Might be better, since it increases the length of the array
-    equidistantTime[-1] = time[-1] #NOTE: this changes the equidistancy for the last pixels, yet it is necessary for a good backwards interpolation
-    equidistantFlux = intFlux(equidistantTime)
-  else:
-    equidistantTime = time
-    equidistantFlux = flux    
-  arrayLength = len(equidistantTime)
-  """
-  Zero padding in order to have an even entry in the equidistant arrays
-  -----------------
-  """
-  if arrayLength % 2 == 0: #SOLVED an issue at some point, now it doesnt ...
-    paddingTime = np.arange(max(equidistantTime)+np.round(medianTimeSpacing,5), max(equidistantTime)+(arrayLength) * np.round(medianTimeSpacing,5), np.round(medianTimeSpacing,5))
-  else:
-    paddingTime = np.arange(max(equidistantTime)+np.round(medianTimeSpacing,5), max(equidistantTime)+(arrayLength) * np.round(medianTimeSpacing,5), np.round(medianTimeSpacing,5))
-  equidistantTime = np.append(equidistantTime, paddingTime)
-  equidistantFlux = np.append(equidistantFlux-np.mean(equidistantFlux),np.linspace(0,0,num=arrayLength))
-  print len(equidistantTime), len(equidistantFlux), len(paddingTime), arrayLength
-  """
-  Fourier transform
-  -----------------
-  """
-  fourTransf = np.fft.rfft(equidistantFlux)
-  fourierFreq = np.fft.fftfreq(len(equidistantTime),d=np.round(medianTimeSpacing,5)) #Needs implementation of the rfftfreq, np version 1.9
+  NOTE: Use fourierFILTERS directly when you need several filters of the same lightcurve.
   
-  maxIndexfourierFreq = np.int(len(fourTransf)-1) #Needed, since fftfreq gives you double the amount of elements (negative frequencies)
-  idxToClip = np.where(fourierFreq[:maxIndexfourierFreq] > cutOffFrequency)[0] #NOTE Changed the sign here compared to the highPASSFIlter
-  fourTransfFilter = np.copy(fourTransf)
-  fourTransfFilter[idxToClip] = 0.  
+  Returns: filtered flux measurements (centered around zero intensity units)
   
-  """
-  Inverse fourier transform
-  -------------------------
-  """
-  equidistantFluxFilter = np.fft.irfft(fourTransfFilter)
-
-  if equidistant == False:
-    intFluxFilter = scInterp.interp1d(equidistantTime,equidistantFluxFilter) #This is a function
-    filteredFlux = intFluxFilter(time)
-  else:
-    filteredFlux = equidistantFluxFilter[:arrayLength+1]
+  @param time: time measurements [d]
+  @type time: numpy array of length N
+  @param flux: flux measurements [adu]
+  @type flux: numpy array of length N
+  @param cutOffFrequency: frequency limit for the lowpass filter (needs inverse units of @param time)
+  @type cutOffFrequency: integer
   
-  return filteredFlux
+  @return: filteredFlux
+  @rtype: numpy array of length N
+  
+  
+  WARNING
+  It is expected that your flux is in relative units. Nevertheless, the result from the filtered photometry results in photometry centered around zero.
+  WARNING
+  """
+  return fourierFILTERS(time, flux, [('lowpass', cutOffFrequency)], **kwargs)[0]
 
 def multipleBANDPASSfilter(time, flux, centerOfBands, widthOfBands=None, invertBands=False, setNoise=False, **kwargs):
   """    
@@ -203,6 +309,8 @@ def multipleBANDPASSfilter(time, flux, centerOfBands, widthOfBands=None, invertB
   
   NOTE: the specified width for the frequency bands is the same for *all* bands
   
+  NOTE: Use fourierFILTERS directly when you need several filters of the same lightcurve.
+  
   Returns: filtered flux measurements (centered around zero intensity units)
   
   @param time: time measurements [d]
@@ -220,125 +328,10 @@ def multipleBANDPASSfilter(time, flux, centerOfBands, widthOfBands=None, invertB
   @kwargs BANDSonly: only take the flux which passes through the bands, instead of blocking it - Default is False [Boolean]
   @kwargs BANDSnoise: set the flux to an average noise level (in complex space) instead of putting int to 0+0j - Default is False [Boolean]
   """
-  # Reading the kwargs
-  widthOfBands = kwargs.get('BANDSwidth', 10 * 1./(time[-1]-time[0])) #[inverse units of @param time)]
-  invertBands = kwargs.get('BANDSonly', False) #[Boolean]
-  setNoise = kwargs.get('BANDSnoise', False) #[Boolean]
-  
-  # Trying to undersand the number of bands you are specifying
-  try:
-    numberOfBands = len(centerOfBands)
-  except:
-    if (isinstance(centerOfBands,int)) or (isinstance(centerOfBands,float)):
-      numberOfBands = 1
-    else:
-      print "Data type for center of filterband(s) not understood"
-      exit()
-  """
-  Equidistancy check
-  ------------------
-  """
-  #The check is roughly in the order of seconds (if the time string is in days)
-  meanTimeSpacing = np.mean(time[1:] - time[:-1])
-  medianTimeSpacing = np.median(time[1:] - time[:-1])
+  # Reading the kwargs, where the arguments are used as defaults
+  widthOfBands = kwargs.pop('BANDSwidth', widthOfBands if widthOfBands is not None else 10 * 1./(time[-1]-time[0])) #[inverse units of @param time)]
+  invertBands = kwargs.pop('BANDSonly', invertBands) #[Boolean]
+  setNoise = kwargs.pop('BANDSnoise', setNoise) #[Boolean]
   
-  if np.round(meanTimeSpacing,4) == np.round(medianTimeSpacing,4):
-    equidistant=True
-  else:
-    equidistant=False
-  
-  if equidistant == False:
-    intFlux = scInterp.interp1d(time,flux) #This is a function
-    equidistantTime = np.arange(time[0], time[-1]+np.round(medianTimeSpacing,5), np.round(medianTimeSpacing,5)) #Might be better, since it increases the length of the array
-    equidistantTime[-1] = time[-1] #NOTE: this changes the equidistancy for the last pixels, yet it is necessary for a good backwards interpolation
-    equidistantFlux = intFlux(equidistantTime)
-  else:
-    equidistantTime = time
-    equidistantFlux = flux    
-  arrayLength = len(equidistantTime)
-  """
-  Zero padding in order to have an even entry in the equidistant arrays
-  -----------------
-  """    
-  if arrayLength % 2 == 0:
-    paddingTime = np.arange(max(equidistantTime)+np.round(medianTimeSpacing,5), max(equidistantTime)+(arrayLength+1) * np.round(medianTimeSpacing,5), np.round(medianTimeSpacing,5))
-  else:
-    paddingTime = np.arange(max(equidistantTime)+np.round(medianTimeSpacing,5), max(equidistantTime)+(arrayLength) * np.round(medianTimeSpacing,5), np.round(medianTimeSpacing,5))
-  equidistantTime = np.append(equidistantTime, paddingTime)
-  equidistantFlux = np.append(equidistantFlux-np.mean(equidistantFlux),np.linspace(0,0,num=arrayLength))
-  #print len(equidistantTime), len(equidistantFlux), len(paddingTime)
-  """
-  Fourier transform
-  -----------------
-  """
-  fourTransf = np.fft.rfft(equidistantFlux)
-  fourierFreq = np.fft.fftfreq(len(equidistantTime),d=np.round(medianTimeSpacing,5)) #Needs implementation of the rfftfreq, np version 1.9
-  
-  maxIndexfourierFreq = np.int(len(fourTransf)-1) #Needed, since fftfreq gives you double the amount of elements (negative frequencies)
-  """
-  Filtering
-  ---------
-  """
-  idxToClipMax, idxToClipMin = [], []
-  fourTransfFilter = np.copy(fourTransf)
-
-  #Only one bandfilter
-  if numberOfBands == 1:
-    idxToClipMax.append(np.int64(np.where(fourierFreq[:maxIndexfourierFreq] < centerOfBands + widthOfBands/2.)[0][-1]))
-    idxToClipMin.append(np.int64(np.where(fourierFreq[:maxIndexfourierFreq] > centerOfBands - widthOfBands/2.)[0][0]))
-    
-    if invertBands:
-      if setNoise:
-	fourTransfFilter[:idxToClipMin[0]] = np.median(fourTransf)
-	fourTransfFilter[idxToClipMax[0]:] = np.median(fourTransf)
-      else:
-	fourTransfFilter[:idxToClipMin[0]] = 0
-	fourTransfFilter[idxToClipMax[0]:] = 0
-    else:
-      if setNoise:
-	fourTransfFilter[idxToClipMin[0]:idxToClipMax[0]+1] = np.median(fourTransf)
-      else:
-	fourTransfFilter[idxToClipMin[0]:idxToClipMax[0]+1] = 0
-  #Multiple bandfilters
-  else:
-    for nn in range(numberOfBands):
-      idxToClipMax.append(np.int64(np.where(fourierFreq[:maxIndexfourierFreq] < centerOfBands[nn] + widthOfBands/2.)[0][-1]))
-      idxToClipMin.append(np.int64(np.where(fourierFreq[:maxIndexfourierFreq] > centerOfBands[nn] - widthOfBands/2.)[0][0]))
-      
-    if invertBands:
-      for nn in range(numberOfBands):
-	if setNoise:
-	  if nn == 0:
-	    fourTransfFilter[:idxToClipMin[nn]] = np.median(fourTransf)
-	  elif nn == numberOfBands-1:
-	    fourTransfFilter[idxToClipMax[nn]:] = np.median(fourTransf)
-	    fourTransfFilter[idxToClipMax[nn-1]:idxToClipMin[nn]] = np.median(fourTransf)
-	  else:
-	    fourTransfFilter[idxToClipMax[nn-1]:idxToClipMin[nn]] = np.median(fourTransf)
-	else:
-	  if nn == 0:
-	    fourTransfFilter[:idxToClipMin[nn]] = 0
-	  elif nn == numberOfBands-1:
-	    fourTransfFilter[idxToClipMax[nn]:] = 0
-	    fourTransfFilter[idxToClipMax[nn-1]:idxToClipMin[nn]] = 0
-	  else:
-	    fourTransfFilter[idxToClipMax[nn-1]:idxToClipMin[nn]] = 0
-    else:
-      for nn in range(numberOfBands):
-	if setNoise:
-	  fourTransfFilter[idxToClipMin[nn]:idxToClipMax[nn]+1] = np.median(fourTransf)
-	else:
-	  fourTransfFilter[idxToClipMin[nn]:idxToClipMax[nn]+1] = 0
-  """
-  Inverse fourier transform
-  -------------------------
-  """
-  equidistantFluxFilter = np.fft.irfft(fourTransfFilter)
-
-  if equidistant == False:
-    intFluxFilter = scInterp.interp1d(equidistantTime,equidistantFluxFilter) #This is a function
-    filteredFlux = intFluxFilter(time)
-  else:
-    filteredFlux = equidistantFluxFilter[:arrayLength+1]
-
-  return filteredFlux
+  filterSPEC = ('bandpass' if invertBands else 'bandstop', centerOfBands, widthOfBands)
+  return fourierFILTERS(time, flux, [filterSPEC], FILTERnoise=setNoise, **kwargs)[0]
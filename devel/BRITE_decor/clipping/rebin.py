@@ -2,7 +2,7 @@
 """
 Routines to perform rebinning of data
     
-Last update 18 March 2016
+Last update 19 October 2026
 
 @author: Bram Buysschaert
 """
@@ -38,6 +38,8 @@ def rebinUNIQUE(param1, param2, **kwargs):
     Rebinning of a given param2, according to unique values in the param1 array.
     This should be a general script, which does not assume anything on both arrays, except that they have an equal length
     
+    NOTE All bins are done at once: we sort param2 within each unique param1 value, so the mean and std follow from np.add.reduceat and the median and percentiles from the (linearly interpolated) order statistics, exactly as np.percentile does.
+    
     Returns: an array with the unique param1 values, a matrix with bin values (mean, median, std, percentiles) for param2
     
     @param param1: parameter 1 values (the values of which you take unique values)
@@ -50,11 +52,65 @@ def rebinUNIQUE(param1, param2, **kwargs):
     @return: param2MATRIX
     @rtype: numpy matrix of size 5xM
     """
-    param1UNIQUE = np.unique(param1)
+    param1UNIQUE, IDXunique = np.unique(param1, return_inverse=True)
     param2MATRIX = np.zeros((5,len(param1UNIQUE))) #mean, median, std, 15.85%, 84.15%
     
-    for uu in range(len(param1UNIQUE)):
-      param2BIN = param2[param1==param1UNIQUE[uu]]
-      param2MATRIX[:,uu] = [np.mean(param2BIN), np.median(param2BIN), np.std(param2BIN), np.percentile(param2BIN, 15.85), np.percentile(param2BIN, 84.15)]
+    # Sorting param2 within each bin, so each bin is a consecutive block
+    param2SORTED = np.asarray(param2, dtype=float)[np.lexsort((param2, IDXunique))]
+    countsBIN = np.bincount(IDXunique, minlength=len(param1UNIQUE))
+    IDXstart = np.concatenate(([0], np.cumsum(countsBIN)[:-1]))
+    
+    param2MATRIX[0,:] = np.add.reduceat(param2SORTED, IDXstart) / countsBIN
+    param2MATRIX[2,:] = np.sqrt(np.add.reduceat((param2SORTED - np.repeat(param2MATRIX[0,:], countsBIN))**2, IDXstart) / countsBIN)
+    for rr, percentage in [(1, 50.), (3, 15.85), (4, 84.15)]:
+      positionBIN = IDXstart + (countsBIN - 1) * percentage / 100.
+      IDXlower = np.floor(positionBIN).astype(int)
+      IDXupper = np.minimum(IDXlower + 1, IDXstart + countsBIN - 1)
+      param2MATRIX[rr,:] = param2SORTED[IDXlower] + (param2SORTED[IDXupper] - param2SORTED[IDXlower]) * (positionBIN - IDXlower)
+    
+    return param1UNIQUE, param2MATRIX
+
+def rebinGRID(param1, param2, **kwargs):
+    """
+    Rebinning of a given param2 on a uniform grid of param1, for fitting the binned data instead of the full data (see GRIDrebin of BRITE_decor.fitting.splinegrid.splineGRIDsearch). Empty bins are dropped.
+    
+    Each bin is represented by the mean param1 and mean param2 of its datapoints. The weight of a bin is the inverse of the standard error on its mean, i.e. sqrt(count) / std. Bins with a single datapoint (or a zero std) get the median std of the other bins, so they do not dominate the fit. For equal stds, these weights make the least-squares fit to the bins equivalent to the fit to the full data, as long as the fit is close to linear within a bin.
+    
+    Everything is done with np.bincount, without any loop over the bins or the datapoints.
+    
+    Returns: The param1 and param2 values of the bins, the weights of the bins and the number of datapoints in each bin
+    
+    @param param1: parameter 1 values (the values which are binned)
+    @type param1: numpy array of length N
+    @param param2: parameter 2 values (the values of which you take bin values)
+    @type param2: numpy array of length N
+    
+    @return: param1BIN
+    @rtype: numpy array of length M (sorted)
+    @return: param2BIN
+    @rtype: numpy array of length M
+    @return: weightsBIN
+    @rtype: numpy array of length M
+    @return: countsBIN
+    @rtype: numpy array of length M
+    
+    @kwargs: REBINnumber: number of bins between the minimum and the maximum of param1 - Default is 200 [integer]
+    """
+    REBINnumber = int(kwargs.get('REBINnumber', 200)) #[integer]
+    
+    param1, param2 = np.asarray(param1, dtype=float), np.asarray(param2, dtype=float)
+    param1MIN, param1MAX = np.min(param1), np.max(param1)
+    IDXbin = np.minimum(((param1 - param1MIN) / (param1MAX - param1MIN) * REBINnumber).astype(int), REBINnumber - 1) if param1MAX > param1MIN else np.zeros(len(param1), dtype=int)
+    
+    countsBIN = np.bincount(IDXbin, minlength=REBINnumber)
+    maskFILLED = countsBIN != 0
+    countsFILLED = countsBIN.astype(float); countsFILLED[~maskFILLED] = 1.
+    param1BIN = np.bincount(IDXbin, weights=param1, minlength=REBINnumber) / countsFILLED
+    param2BIN = np.bincount(IDXbin, weights=param2, minlength=REBINnumber) / countsFILLED
+    stdBIN = np.sqrt(np.bincount(IDXbin, weights=(param2 - param2BIN[IDXbin])**2, minlength=REBINnumber) / countsFILLED)
+    
+    maskSTD = maskFILLED & (countsBIN > 1) & (stdBIN > 0)
+    stdBIN[~maskSTD] = np.median(stdBIN[maskSTD]) if np.any(maskSTD) else 1.
+    weightsBIN = np.sqrt(countsBIN) / stdBIN
     
-    return param1UNIQUE, param2MATRIX
\ No newline at end of file
+    return param1BIN[maskFILLED], param2BIN[maskFILLED], weightsBIN[maskFILLED], countsBIN[maskFILLED]
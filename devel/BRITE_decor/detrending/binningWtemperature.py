@@ -2,7 +2,7 @@
 """
 Routines which allow you to perform binning of the BRITE timeseries, using the longterm temperature variations. In addition, it is possibile to include the gapsize between datapoints for binning.
     
-Last update 15 November 2016
+Last update 19 October 2026
 
 @author: Bram Buysschaert
 """
@@ -67,10 +67,32 @@ def convertSLOPEtoSIGN(slope, **kwargs):
 	print 'Congratulations, you have a slope with exactly zero!'
 	return +1
     
+def orbitENDindexes(time, **kwargs):
+    """
+    Routine to determine the indexes of all ends of an orbit at once, i.e. the indexes after which the time difference is large compared to the median time difference. Give the output to findENDofORBIT (IDXorbitENDS), so it does not have to look for them again.
+    
+    Returns:
+    the sorted indexes of the ends of the orbits
+    
+    @param time: time measurements [d]
+    @type time: numpy array
+    
+    @return: indexesENDofORBIT
+    @rtype: numpy array (dtype='int')
+    
+    @kwargs: IDXsigma: integer indicating how large the difference has to be compared to the median time difference - default is 25 [integer]
+    """
+    sigma = kwargs.get('IDXsigma', 25) # [integer]
+    
+    timeDIFF = time[1:]-time[:-1]
+    return np.flatnonzero(timeDIFF >= sigma*np.median(timeDIFF))
+
 def findENDofORBIT(time, index, **kwargs):
     """
     Routine to look for the nearest end of an orbit around a given index. 
     
+    The ends of the orbits are looked up with a binary search in the output of orbitENDindexes. When you call this routine many times for the same time array, give this output (IDXorbitENDS), so it is determined only once.
+    
     Returns:
     the index of the nearest end of an orbit
     
@@ -86,35 +108,39 @@ def findENDofORBIT(time, index, **kwargs):
     @kwargs: IDXsigma: integer indicating how large the difference has to be compared to the median time difference - default is 25 [integer]
     @kwargs: IDXforce: force to take a given index - default is False
     @kwargs: IDXtake: indicate which index is forced; needs to be used with forceIDX - default is indexUP.
+    @kwargs: IDXorbitENDS: the output of orbitENDindexes for this time array - default is None (determined here)
     """
     # Reading the kwargs
     # ------------------
     maxIDXsearch = np.int(kwargs.get('IDXmaxSEARCH', 200)) #[idx]
-    sigma = kwargs.get('IDXsigma', 25) # [integer]
     forceIDX = kwargs.get('IDXforce', False) #[Boolean]
     if forceIDX:
       takeIDX = kwargs.pop('IDXtake')
       if not takeIDX in ['IDXup', 'IDXdown']:
 	raise ValueError, 'Please specify "IDXtake" while using "IDXforce", possible options are "IDXup" or "IDXdown"'
+    orbitENDS = kwargs.get('IDXorbitENDS', None)
+    if orbitENDS is None:
+      orbitENDS = orbitENDindexes(time, **kwargs)
     
     # Performing the calculations
     # ---------------------------
-    medianTIMEdiff = np.median(time[1:]-time[:-1])
+    # The first end at or after index, and the last end before index. Both have to be within maxIDXsearch indexes.
+    positionUP = np.searchsorted(orbitENDS, index, side='left')
+    indexUP = orbitENDS[positionUP] if positionUP < len(orbitENDS) and orbitENDS[positionUP] < index+maxIDXsearch else None
+    indexDOWN = orbitENDS[positionUP-1] if positionUP > 0 and orbitENDS[positionUP-1] > index-maxIDXsearch-1 else None
     
-    for ii in range(index, index+maxIDXsearch, 1):
-      if time[ii+1] - time[ii] >= sigma*medianTIMEdiff:
-	indexUP = ii  
-	break
-    for ii in range(index, index-maxIDXsearch, -1):
-      if time[ii] - time[ii-1] >= sigma*medianTIMEdiff:
-	indexDOWN = ii-1
-	break
+    if indexUP is None and indexDOWN is None:
+      raise ValueError, 'No end of an orbit found within {:d} indexes of index {:d}. Consider a larger IDXmaxSEARCH or a lower IDXsigma.'.format(maxIDXsearch, index)
     
     # Check which one is the closest
     # ------------------------------
     # NOTE you want to check the time difference, not necessarily the index difference
     if not(forceIDX):
-      if np.abs(time[index] - time[indexUP]) > np.abs(time[index] - time[indexDOWN]):
+      if indexUP is None:
+	return indexDOWN
+      elif indexDOWN is None:
+	return indexUP
+      elif np.abs(time[index] - time[indexUP]) > np.abs(time[index] - time[indexDOWN]):
 	return indexDOWN
       elif np.abs(time[index] - time[indexUP]) < np.abs(time[index] - time[indexDOWN]):
 	return indexUP
@@ -122,10 +148,10 @@ def findENDofORBIT(time, index, **kwargs):
 	print bcolors.WARNING + '\t\tBoth time difference are equally large, taking the upper time difference.\n\t\tIndex \t\t= {:6.0f}\n\t\tIndexUP \t= {:6.0f}\t\ttimeUP \t= {:1.10e}\n\t\tIndexDOWN \t= {:6.0f}\t\ttimeDOWN \t= {:1.10e}'.format(index, indexUP, time[indexUP]-time[index], indexDOWN, time[indexDOWN]-time[index]) + bcolors.ENDC
 	return indexUP
       
-    elif takeIDX == 'IDXup':
-      return indexUP
-    elif takeIDX == 'IDXdown':
-      return indexDOWN
+    indexTAKE = indexUP if takeIDX == 'IDXup' else indexDOWN
+    if indexTAKE is None:
+      raise ValueError, 'No end of an orbit found for {} within {:d} indexes of index {:d}. Consider a larger IDXmaxSEARCH or a lower IDXsigma.'.format(takeIDX, maxIDXsearch, index)
+    return indexTAKE
 
 def openTIMEwithTEMPERATURE(time, temperature, **kwargs):
     """
@@ -139,6 +165,9 @@ def openTIMEwithTEMPERATURE(time, temperature, **kwargs):
     NOTE
     No minimum length for the time bins are specified. Thus, it is theoretically possible that one time bin has the length of one orbit. However, we provide a way to check if the length of the various time bins is too short compared to the specified minimum length. Yet, this is only a printing output and you should redefine your input parameters / start scripting if you want to change this.
     
+    NOTE
+    The slopes for all indexes are determined at once from cumulative sums, and each bin end is found with vectorised comparisons. So, the loop only runs over the bins, not over the datapoints. Use sweepTIMEwithTEMPERATURE to compare the binning for several TEMPcrit, GAPScrit and BINminSIZE values, without repeating the lowess filtering.
+    
     NOTE
     The slope of the long term variations is also considered and calculated within a window of slopeWINDOW, since nothing specifies that this is a monotoneous function. Whenever we pass a local extrema point, we change our temperature criterion from DeltaTEMP >= maxSPECIFIED to DeltaTEMP = 0. WARNING that slopeWINDOW might be able to significantly change your calculations. In case of onboard stacked data, this value should be significantly lower.
     
@@ -169,13 +198,124 @@ def openTIMEwithTEMPERATURE(time, temperature, **kwargs):
     """
     
     dTEMP = kwargs.get('TEMPcrit', 2.5) # [deg]
-    lowessFRAC = kwargs.get('LOWESSfrac', 0.2) # []
     stopGAPS = kwargs.get('GAPSinclude', False) # Boolean
-    if stopGAPS:
-      gapSIZE = kwargs.get('GAPScrit', 0.3) # [d]
+    gapSIZE = kwargs.get('GAPScrit', 0.3) if stopGAPS else None # [d]
     slopeWINDOW = np.int(kwargs.get('WINDOWslope', 100)) # [idx]
     binSIZEmin = kwargs.get('BINminSIZE', 1.0) # [d]
     
+    timeLONG, temperatureLONG = longTEMPERATURE(time, temperature, **kwargs)
+
+    """
+        Determining the temperature bins
+     ---------------------------------------
+    """
+    # The slope of the long term temperature variations (a linear fit within a window) is needed at every index. We determine all of them at once from cumulative sums, see _slopeSUMS.
+    # NOTE: not possible to determine the slope below this half (approximately one orbit for non-stacked data). Fully passed to the subset bin.
+    sumsSLOPE = _slopeSUMS(timeLONG, temperatureLONG)
+    IDXall = np.arange(len(timeLONG))
+    signsTT = _slopeSIGNS(sumsSLOPE, IDXall - slopeWINDOW/2, IDXall + slopeWINDOW/2)
+    # The ends of the orbits are only determined once, see findENDofORBIT.
+    kwargsORBIT = dict(kwargs, IDXorbitENDS=orbitENDindexes(time, **kwargs))
+    
+    print '\n\tInitialising complete...'
+    if not(stopGAPS):
+      print '\tRemember, you have switched off to account for gaps while binning'
+    
+    timeINDEXES, timeINDEXES_reason = _segmentTIME(time, temperatureLONG, sumsSLOPE, signsTT, dTEMP, gapSIZE, slopeWINDOW, binSIZEmin, kwargsORBIT, True)
+    
+    return np.array(timeINDEXES, dtype='int32'), timeINDEXES_reason, temperatureLONG
+
+# The reasons of the bin ends, as coded in the output of sweepTIMEwithTEMPERATURE
+SWEEPreasons = ['temperature', 'gap', 'end']
+
+def sweepTIMEwithTEMPERATURE(time, temperature, **kwargs):
+    """
+    Routine which determines the temperature bins of openTIMEwithTEMPERATURE for a whole grid of TEMPcrit and GAPScrit values, e.g. to choose the binning of a setup in one call.
+    
+    The expensive parts, i.e. the lowess filtering of the temperature, the slopes of the long term variations and the ends of the orbits, only depend on LOWESSfrac and WINDOWslope. So, they are determined once and shared by all combinations. The binning of each combination is identical to the output of openTIMEwithTEMPERATURE with the same kwargs.
+    
+    Returns:
+    the end indexes, reasons and lengths of the bins of all combinations (concatenated), the start and stop of each combination within these arrays, the number of bins shorter than each BINminSIZE, the long term temperature variations
+    
+    NOTE
+    The bins of the combination (TEMPcrit[ii], GAPScrit[jj]) are e.g. sweepINDEXES[sweepOFFSETS[ii,jj,0]:sweepOFFSETS[ii,jj,1]]. The reasons are coded as indexes of SWEEPreasons.
+    
+    @param time: time measurements [d]
+    @type time: numpy array of length N
+    @param temperature: temperature measurements [deg]
+    @type temperature: numpy array of length N
+    
+    @return: sweepINDEXES
+    @rtype: numpy array (dtype='int32') of length K
+    @return: sweepREASONS
+    @rtype: numpy array (dtype='int8') of length K
+    @return: sweepLENGTHS
+    @rtype: numpy array of length K [d]
+    @return: sweepOFFSETS
+    @rtype: numpy array (dtype='int') of size TxGx2
+    @return: sweepSHORT
+    @rtype: numpy array (dtype='int') of size TxGxB
+    @return: temperatureLONG
+    @rtype: numpy array of length N
+    
+    @kwargs: TEMPcrit: temperature differences between subsequent subsets - default is [2.5] [deg]
+    @kwargs: GAPScrit: sizes the gap has to be to stop the subset, where None does not stop at gaps - default is [None] [d]
+    @kwargs: BINminSIZE: the minimum timelengths you would expect for a given temperature bin - default is [1.0] [d]
+    @kwargs: LOWESSfrac: fraction of the data you wish to use for the lowess filter - default is 0.2 (should be in range ~0.15 and ~0.35)
+    @kwargs: WINDOWslope: size in which you want to calculate the slope of the long term temperature variations - default is 100 [idx] (should be at least the approximate size of one orbit passage)
+    """
+    dTEMPgrid = np.atleast_1d(kwargs.pop('TEMPcrit', [2.5])) # [deg]
+    gapSIZEgrid = list(np.atleast_1d(kwargs.pop('GAPScrit', [None]))) # [d]
+    binSIZEmin = np.atleast_1d(kwargs.pop('BINminSIZE', [1.0])) # [d]
+    slopeWINDOW = np.int(kwargs.get('WINDOWslope', 100)) # [idx]
+    
+    # Shared by all combinations
+    timeLONG, temperatureLONG = longTEMPERATURE(time, temperature, **kwargs)
+    sumsSLOPE = _slopeSUMS(timeLONG, temperatureLONG)
+    IDXall = np.arange(len(timeLONG))
+    signsTT = _slopeSIGNS(sumsSLOPE, IDXall - slopeWINDOW/2, IDXall + slopeWINDOW/2)
+    kwargsORBIT = dict(kwargs, IDXorbitENDS=orbitENDindexes(time, **kwargs))
+    
+    sweepINDEXES, sweepREASONS, sweepLENGTHS = [], [], []
+    sweepOFFSETS = np.zeros((len(dTEMPgrid), len(gapSIZEgrid), 2), dtype='int')
+    sweepSHORT = np.zeros((len(dTEMPgrid), len(gapSIZEgrid), len(binSIZEmin)), dtype='int')
+    for ii, dTEMP in enumerate(dTEMPgrid):
+      for jj, gapSIZE in enumerate(gapSIZEgrid):
+        timeINDEXES, timeINDEXES_reason = _segmentTIME(time, temperatureLONG, sumsSLOPE, signsTT, dTEMP, gapSIZE, slopeWINDOW, None, kwargsORBIT, False)
+        timeINDEXES = np.array(timeINDEXES, dtype='int32')
+        # Each bin starts right after the end of the previous one
+        binLENGTHS = time[timeINDEXES] - time[np.concatenate(([0], timeINDEXES[:-1]+1))]
+        
+        sweepOFFSETS[ii,jj] = len(sweepINDEXES), len(sweepINDEXES) + len(timeINDEXES)
+        sweepSHORT[ii,jj] = np.sum(binLENGTHS[:,np.newaxis] < binSIZEmin[np.newaxis,:], axis=0)
+        sweepINDEXES.extend(timeINDEXES); sweepLENGTHS.extend(binLENGTHS)
+        sweepREASONS.extend([SWEEPreasons.index(reason) for reason in timeINDEXES_reason])
+    
+    return np.array(sweepINDEXES, dtype='int32'), np.array(sweepREASONS, dtype='int8'), np.array(sweepLENGTHS), sweepOFFSETS, sweepSHORT, temperatureLONG
+
+def longTEMPERATURE(time, temperature, **kwargs):
+    """
+    Routine to determine the long term temperature variations with a lowess filter, as used by openTIMEwithTEMPERATURE and sweepTIMEwithTEMPERATURE.
+    
+    Returns:
+    the time and the long term temperature variations
+    
+    @param time: time measurements [d]
+    @type time: numpy array of length N
+    @param temperature: temperature measurements [deg]
+    @type temperature: numpy array of length N
+    
+    @return: timeLONG
+    @rtype: numpy array of length N
+    @return: temperatureLONG
+    @rtype: numpy array of length N
+    
+    @kwargs: LOWESSfrac: fraction of the data you wish to use for the lowess filter - default is 0.2 (should be in range ~0.15 and ~0.35)
+    @kwargs: WINDOWslope: size in which you want to calculate the slope of the long term temperature variations - default is 100 [idx], only used for the warning on stacked data
+    """
+    lowessFRAC = kwargs.get('LOWESSfrac', 0.2) # []
+    slopeWINDOW = np.int(kwargs.get('WINDOWslope', 100)) # [idx]
+    
     #Determine the median amount of datapoints per day
     MEDIANdpointsDAY = 1./np.median(time[1:] - time[:-1])
     
@@ -201,100 +341,112 @@ def openTIMEwithTEMPERATURE(time, temperature, **kwargs):
       print bcolors.WARNING + '\tWARNING\n\tYour global *maximum* temperature is not at the beginning / end of the dataset. You will see this reflected in the subset bins.' + bcolors.ENDC
     if (np.where(temperatureMIN==temperatureLONG)[0][0] != 0) and (np.where(temperatureMIN==temperatureLONG)[0][0] != len(temperatureLONG)-1):
       print bcolors.WARNING + '\tWARNING\n\tYour global *minimum* temperature is not at the beginning / end of the dataset. You will see this reflected in the subset bins.' + bcolors.ENDC
+    
+    return timeLONG, temperatureLONG
 
+def _segmentTIME(time, temperatureLONG, sumsSLOPE, signsTT, dTEMP, gapSIZE, slopeWINDOW, binSIZEmin, kwargsORBIT, doPRINT):
     """
-        Determining the temperature bins
-     ---------------------------------------
-    """
-    # Defining the arrays for the indexes to define the different temperature bins
-    timeINDEXES, timeINDEXES_reason = np.array([], dtype='int32'), []
+    Determine the ends of the temperature bins (see openTIMEwithTEMPERATURE), from the long term temperature, its slope sums and signs, and the kwargs for findENDofORBIT (with IDXorbitENDS). A gapSIZE of None does not stop the bins at gaps.
     
-    # While loop seems more appropriate, since it provides you with some control on when to skip elements. Although, you do need to define tt. Thus, initialising.
-    # NOTE: not possible to determine the slope below this half (approximately one orbit for non-stacked data). Fully passed to the subset bin.
-    # We use the longterm temperature behaviour to calculate the slope (linear flit within the window)
-    temperatureINIT, indexINIT, slopeINIT = temperatureLONG[0], 0, np.polyfit(timeLONG[0:0+slopeWINDOW], temperatureLONG[0:0+slopeWINDOW], 1)[0]
-    signINIT = convertSLOPEtoSIGN(slopeINIT)
-    endBINtemperature = False
-    tt = slopeWINDOW/2 + 1
+    Returns: The list of end indexes and the list of reasons.
+    """
+    signsGAP = np.zeros(len(temperatureLONG), dtype='bool')
+    if gapSIZE is not None:
+      signsGAP[:-1] = time[1:] - time[:-1] > gapSIZE
     
-    print '\n\tInitialising complete...'
-    if not(stopGAPS):
-      print '\tRemember, you have switched off to account for gaps while binning'
+    # Defining the lists for the indexes to define the different temperature bins
+    timeINDEXES, timeINDEXES_reason = [], []
     
-    while tt  < len(timeLONG):      
-      # Not possible to determine the slope below this half (approximately one orbit). Fully passed to the subset bin.
-      if tt >= len(timeLONG)-1 - slopeWINDOW/2 : # Last elements of your array. Stop here!
-	timeINDEXES = np.append(timeINDEXES, len(timeLONG)-1); timeINDEXES_reason.append('end')
-	try:
-	  print '\tEnd of bin: ' + bcolors.BOLD + 'END' + bcolors.ENDC + '\t\t\tindex {:6.0f} (at time {:4.3f} d) with a binlength of {:4.3f} d.'.format(tt, time[tt]-time[0], time[len(timeLONG)-1]-time[timeINDEXES[-2]+1])
-	  if time[len(timeLONG)-1]-time[timeINDEXES[-2]+1] < binSIZEmin:
-	    print bcolors.WARNING + '\t\t\tWARNING: Timelength of this bin is smaller than the minimum length specified, i.e. {:1.3}d'.format(binSIZEmin) + bcolors.ENDC
-	except:
-	  print '\tEnd of bin: ' + bcolors.BOLD + 'END' + bcolors.ENDC + '\t\t\tindex {:6.0f} (at time {:4.3f} d) with a binlength of {:4.3f} d.'.format(tt, time[tt]-time[0], time[len(timeLONG)-1]-time[0])
-	
-	print bcolors.OKBLUE + '\t... found all endpoints for timebins.\n' + bcolors.ENDC
-	break
+    # Initialising the first bin
+    temperatureINIT, signINIT = temperatureLONG[0], _slopeSIGNS(sumsSLOPE, 0, slopeWINDOW)
+    tt = slopeWINDOW/2 + 1
+    ttLAST = len(temperatureLONG)-1 - slopeWINDOW/2 # Last elements of your array, where you stop
+    
+    # We only loop over the ends of the bins. Within a bin, the first index which ends it is found with vectorised comparisons.
+    while tt < len(temperatureLONG):
+      if tt >= ttLAST:
+        timeINDEXES.append(len(temperatureLONG)-1); timeINDEXES_reason.append('end')
+        if doPRINT:
+          _printENDofBIN('END', tt, len(temperatureLONG)-1, time, timeINDEXES, binSIZEmin)
+          print bcolors.OKBLUE + '\t... found all endpoints for timebins.\n' + bcolors.ENDC
+        break
+      
+      tt, endBINtemperature = _findENDofBIN(temperatureLONG, signsTT, signsGAP, tt, ttLAST, temperatureINIT, signINIT, dTEMP)
+      if endBINtemperature:
+        if doPRINT:
+          _printENDofBIN('Temperature', tt, tt, time, timeINDEXES, binSIZEmin)
+          print '\t\tTdiff = {:+2.2f}deg;\tdTEMP limit is {:+2.2f}deg.'.format(temperatureINIT - temperatureLONG[tt], dTEMP)
+        # Now take a more detailed look into which index to actually consider your final index.
+        indexENDofORBIT = findENDofORBIT(time, tt, **kwargsORBIT)
+        timeINDEXES.append(indexENDofORBIT); timeINDEXES_reason.append('temperature')
+        
+        # Make the new initial conditions for the next bin.
+        tt = indexENDofORBIT + 1
+        temperatureINIT, signINIT = temperatureLONG[tt], _slopeSIGNS(sumsSLOPE, tt, tt+slopeWINDOW)
+        tt += 1
       
-      else: #Normal usage
-	slopeTT = np.polyfit(timeLONG[tt-slopeWINDOW/2:tt+slopeWINDOW/2], temperatureLONG[tt-slopeWINDOW/2:tt+slopeWINDOW/2], 1)[0]
-	signTT = convertSLOPEtoSIGN(slopeTT)
-	
-	# Deducing how the slope of your current datapoint compares to the first entry of your bin.
-	if signINIT == +1 and signTT == +1 and temperatureLONG[tt] - temperatureINIT >= dTEMP:
-	  endBINtemperature = True
-	elif signINIT == -1 and signTT == -1 and temperatureINIT - temperatureLONG[tt] >= dTEMP:  
-	  endBINtemperature = True
-        elif signINIT == +1 and signTT == -1 and temperatureINIT >= temperatureLONG[tt]:
-	  endBINtemperature = True
-        elif signINIT == -1 and signTT == +1 and temperatureLONG[tt] >= temperatureINIT:  
-	  endBINtemperature = True
+      # Check if you did not pass a gap with a given gapSIZE. If so, take the previous index as your end of the bin.
+      # NOTE this index should (normally) always be the end of an orbit, so no need to look into more detail.
+      elif tt < ttLAST:
+        if doPRINT:
+          _printENDofBIN('Gap', tt, tt, time, timeINDEXES, binSIZEmin)
+          print '\t\ttdiff = {:2.3f}d;\t\tgapSIZE limit is {:2.3f}d.'.format(time[tt+1] - time[tt], gapSIZE)
+        timeINDEXES.append(tt); timeINDEXES_reason.append('gap')
         
-        if endBINtemperature == True:        
-	  try:
-	    print '\tEnd of bin: ' + bcolors.BOLD + 'Temperature' + bcolors.ENDC + '\t\tindex {:6.0f} (at time {:4.3f} d) with a binlength of {:4.3f} d.'.format(tt, time[tt]-time[0], time[tt]-time[timeINDEXES[-1]+1])
-	    if time[tt]-time[timeINDEXES[-1]+1] < binSIZEmin:
-	      print bcolors.WARNING + '\t\t\tWARNING: Timelength of this bin is smaller than the minimum length specified, i.e. {:1.3}d'.format(binSIZEmin) + bcolors.ENDC
-	  except:
-	    print '\tEnd of bin: ' + bcolors.BOLD + 'Temperature' + bcolors.ENDC + '\t\tindex {:6.0f} (at time {:4.3f} d) with a binlength of {:4.3f} d.'.format(tt, time[tt]-time[0], time[tt]-time[0]) #This should only happen with the first bin
-	    if time[tt]-time[0] < binSIZEmin:
-	      print bcolors.WARNING + '\t\t\tWARNING: Timelength of this bin is smaller than the minimum length specified, i.e. {:1.3}d'.format(binSIZEmin) + bcolors.ENDC
-	  print '\t\tTdiff = {:+2.2f}deg;\tdTEMP limit is {:+2.2f}deg.'.format(temperatureINIT - temperatureLONG[tt], dTEMP)
-	  # Now take a more detailed look into which index to actually consider your final index.
-	  if signTT != 0:
-	    indexENDofORBIT = findENDofORBIT(time, tt, **kwargs)
-	  else:
-	    indexENDofORBIT = findENDofORBIT(time, tt, IDXforce=True, IDXtake='IDXup', **kwargs)
-	  timeINDEXES = np.append(timeINDEXES, indexENDofORBIT); timeINDEXES_reason.append('temperature')
-	  
-	  # Make the new initial conditions for the next bin.
-	  tt = indexENDofORBIT + 1
-	  temperatureINIT, indexINIT = temperatureLONG[tt], tt
-	  slopeINIT = np.polyfit(timeLONG[tt:tt+slopeWINDOW], temperatureLONG[tt:tt+slopeWINDOW], 1)[0]
-	  signINIT = convertSLOPEtoSIGN(slopeINIT)
-	  tt += 1; endBINtemperature = False
-	  
-	# Check if you did not pass a gap with a given gapSIZE. If so, take the previous index as your end of the bin.
-	# NOTE this index should (normally) always be the end of an orbit, so no need to look into more detail.
-	elif stopGAPS and time[tt+1] - time[tt] > gapSIZE: 
-	  try:
-	    print '\tEnd of bin: ' + bcolors.BOLD + 'Gap' + bcolors.ENDC + '\t\t\tindex {:6.0f} (at time {:4.3f} d) with a binlength of {:4.3f} d.'.format(tt, time[tt]-time[0], time[tt]-time[timeINDEXES[-1]+1])
-	    if time[tt]-time[timeINDEXES[-1]+1] < binSIZEmin:
-	      print bcolors.WARNING + '\t\t\tWARNING: Timelength of this bin is smaller than the minimum length specified, i.e. {:1.3}d'.format(binSIZEmin) + bcolors.ENDC
-	  except:
-	    print '\tEnd of bin: ' + bcolors.BOLD + 'Gap' + bcolors.ENDC + '\t\t\tindex {:6.0f} (at time {:4.3f} d) with a binlength of {:4.3f} d.'.format(tt, time[tt]-time[0], time[tt]-time[0]) #This should only happen with the first bin
-	    if time[tt]-time[0] < binSIZEmin:
-	      print bcolors.WARNING + '\t\t\tWARNING: Timelength of this bin is smaller than the minimum length specified, i.e. {:1.3}d'.format(binSIZEmin) + bcolors.ENDC
-	  print '\t\ttdiff = {:2.3f}d;\t\tgapSIZE limit is {:2.3f}d.'.format(time[tt+1] - time[tt], gapSIZE)  
-	  timeINDEXES = np.append(timeINDEXES, tt); timeINDEXES_reason.append('gap')
-	
-	  # Make the new initial conditions for the next bin.
-	  tt = tt + 1
-	  temperatureINIT, indexINIT = temperatureLONG[tt], tt
-	  slopeINIT = np.polyfit(timeLONG[tt:tt+slopeWINDOW], temperatureLONG[tt:tt+slopeWINDOW], 1)[0]
-	  signINIT = convertSLOPEtoSIGN(slopeINIT)
-	
-	# Temperature difference is not large enough to end your bin nor did you find a gap. So, you continue looping.
-	else:
-          tt += 1
-    
-    return timeINDEXES, timeINDEXES_reason, temperatureLONG
+        # Make the new initial conditions for the next bin.
+        tt = tt + 1
+        temperatureINIT, signINIT = temperatureLONG[tt], _slopeSIGNS(sumsSLOPE, tt, tt+slopeWINDOW)
+    
+    return timeINDEXES, timeINDEXES_reason
+
+def _slopeSUMS(timeLONG, temperatureLONG):
+    """
+    Cumulative sums for the slope of a linear fit within any window [IDXstart, IDXend) of the long term temperature variations, see _slopeSIGNS. The time is taken relative to its first element and the temperature relative to its mean, which keeps the rounding errors of the sums small.
+    """
+    timeRELATIVE, temperatureRELATIVE = timeLONG - timeLONG[0], temperatureLONG - np.mean(temperatureLONG)
+    return [np.concatenate(([0.], np.cumsum(values))) for values in (np.ones_like(timeRELATIVE), timeRELATIVE, temperatureRELATIVE, timeRELATIVE**2, timeRELATIVE*temperatureRELATIVE)]
+
+def _slopeSIGNS(sumsSLOPE, IDXstart, IDXend):
+    """
+    Sign of the slope of a linear fit within the windows [IDXstart, IDXend), i.e. the sign of np.polyfit(time[IDXstart:IDXend], temperature[IDXstart:IDXend], 1)[0] (see convertSLOPEtoSIGN, a zero slope is positive). The windows are clipped to the array. Works for integers or arrays of indexes.
+    """
+    NUMBERpoints = len(sumsSLOPE[0]) - 1
+    IDXstart, IDXend = np.clip(IDXstart, 0, NUMBERpoints), np.clip(IDXend, 0, NUMBERpoints)
+    n, sumX, sumY, sumXX, sumXY = [sums[IDXend] - sums[IDXstart] for sums in sumsSLOPE]
+    # The slope is (n sumXY - sumX sumY) / (n sumXX - sumX^2), where the denominator is never negative
+    slopeNUMERATOR = n*sumXY - sumX*sumY
+    return np.where(slopeNUMERATOR < 0, -1, +1)
+
+def _findENDofBIN(temperatureLONG, signsTT, signsGAP, ttSTART, ttLAST, temperatureINIT, signINIT, dTEMP):
+    """
+    Find the first index from ttSTART (and before ttLAST) where the current bin ends, either because of the temperature (see openTIMEwithTEMPERATURE) or because of a gap. We search in growing chunks, so a short bin does not cost a pass over the full array.
+    
+    Returns: The index, and whether the bin ends because of the temperature (True) or a gap (False). Without any end of the bin, ttLAST is returned.
+    """
+    sizeCHUNK = 1024
+    while ttSTART < ttLAST:
+      ttSTOP = min(ttSTART + sizeCHUNK, ttLAST)
+      temperatureTT, signTT = temperatureLONG[ttSTART:ttSTOP], signsTT[ttSTART:ttSTOP]
+      # Deducing how the slope of your current datapoint compares to the first entry of your bin.
+      if signINIT == +1:
+        endTEMPERATURE = ((signTT == +1) & (temperatureTT - temperatureINIT >= dTEMP)) | ((signTT == -1) & (temperatureINIT >= temperatureTT))
+      else:
+        endTEMPERATURE = ((signTT == -1) & (temperatureINIT - temperatureTT >= dTEMP)) | ((signTT == +1) & (temperatureTT >= temperatureINIT))
+      endBIN = endTEMPERATURE | signsGAP[ttSTART:ttSTOP]
+      if np.any(endBIN):
+        IDXend = np.argmax(endBIN)
+        return ttSTART + IDXend, bool(endTEMPERATURE[IDXend])
+      ttSTART, sizeCHUNK = ttSTOP, 2*sizeCHUNK
+    return ttLAST, False
+
+def _printENDofBIN(reason, tt, IDXend, time, timeINDEXES, binSIZEmin):
+    """
+    Print the end of a bin at index IDXend (found at index tt), with a warning when the bin is shorter than binSIZEmin.
+    """
+    # The bin starts after the end of the previous bin. For the 'END', the new end index is already in timeINDEXES.
+    previousINDEXES = timeINDEXES[:-1] if reason == 'END' else timeINDEXES
+    timeSTART = time[previousINDEXES[-1]+1] if len(previousINDEXES) != 0 else time[0] #The else should only happen with the first bin
+    tabs = {'END': '\t\t\t', 'Temperature': '\t\t', 'Gap': '\t\t\t'}[reason]
+    print '\tEnd of bin: ' + bcolors.BOLD + reason + bcolors.ENDC + tabs + 'index {:6.0f} (at time {:4.3f} d) with a binlength of {:4.3f} d.'.format(tt, time[tt]-time[0], time[IDXend]-timeSTART)
+    if time[IDXend]-timeSTART < binSIZEmin:
+      print bcolors.WARNING + '\t\t\tWARNING: Timelength of this bin is smaller than the minimum length specified, i.e. {:1.3}d'.format(binSIZEmin) + bcolors.ENDC
@@ -14,7 +14,7 @@ import numpy as np
 
 import scipy.interpolate as scInterp
 
-from BRITE_decor.fitting.splinefit import splineFIT, splineGOODNESSofFITandINFORMATIONCRITERION
+from BRITE_decor.fitting.splinegrid import splineGRIDsearch
 #===============================================================================#
 # 			Class for colored console printing			#
 #===============================================================================#
@@ -60,52 +60,27 @@ def detrendPARAMflux(param, flux, **kwargs):
     @kwargs: SPLINEorder: order for the spline fits; does accept numpy arrays! - Default is np.array([3],dtype='int32')
     @kwargs: SPLINEtckLENGTH: number of bytes allocated for the to-string-converted TCK - Default is 2000 [integer]
     @kwargs: SPLINEperiodic: perform a periodic spline fit (i.e. fit at last point == fit at first point) - Default is False [Boolean]
+    
+    @kwargs: GRIDworkers: number of workers to distribute the fits over; 1 is serial, None uses all CPUs - Default is 1 [integer]
+    @kwargs: GRIDpool: type of the pool of workers, either 'process' or 'thread' - Default is 'process' [string]
+    @kwargs: GRIDsearch: fit all cells ('exhaustive'), or do an experimental coarse-to-fine search over the phase shifts ('adaptive', which may not find the same optimum; check it with benchmarkGRIDsearch), see BRITE_decor.fitting.splinegrid - Default is 'exhaustive' [string]
+    @kwargs: GRIDcache: directory of the on-disk cache of the grid searches, see BRITE_decor.fitting.splinecache - Default is None (no cache) [string]
+    @kwargs: GRIDrebin: number of bins along param to fit instead of the full data, see BRITE_decor.fitting.splinegrid - Default is None (full data) [integer]
     """
     # Reading in the kwargs and performing some minor checks, so we have everything in the correct input format
     SPLINEknotpointsSPACING = kwargs.get('SPLINEknotpointsSPACING', np.array([1./3., 0.5, 1.0])) #[param]
     SPLINEphaseSHIFT = kwargs.get('SPLINEphaseSHIFT', 0.01) #[param]
     SPLINEorder = kwargs.get('SPLINEorder', np.array([3],dtype='int32')) #[integer]
-    SPLINEtckLENGTH = 'S' + str(np.int(kwargs.get('SPLINEstringLENGTH', 2000))) # [string] 
-    periodicSPLINE = kwargs.get('SPLINEperiodic', False) #[Boolean]
     # Making sure you gave a numpy array for SPLINEorder with integers. If not, change it
     try:
       len(SPLINEorder)
     except:
       SPLINEorder = np.array([SPLINEorder],dtype='int32')
-    maxNUMBERphaseSHIFTS = np.int(np.max(SPLINEknotpointsSPACING)/SPLINEphaseSHIFT)
-    
-    # Setting up the local matrices, for which we store the output. We multiply everthing with 1.e50 since we want the minimum BIC / AIC, and in case nothing is calculated, we want to avoid it and being able to trace it. -- If 1.e50 is too small for your usage, you are doing something horribly wrong. -- NOTE that the likelihood should be maximised, thus np.zeros
-    matrixAIClocal, matrixBIClocal, likelihoodMATRIXlocal, matrixTCKlocal = np.ones((len(SPLINEknotpointsSPACING),maxNUMBERphaseSHIFTS,len(SPLINEorder)))*1.e50, np.ones((len(SPLINEknotpointsSPACING),maxNUMBERphaseSHIFTS,len(SPLINEorder)))*1.e50, np.zeros((len(SPLINEknotpointsSPACING),maxNUMBERphaseSHIFTS,len(SPLINEorder))), np.ones((len(SPLINEknotpointsSPACING),maxNUMBERphaseSHIFTS,len(SPLINEorder)), dtype=SPLINEtckLENGTH)
+    kwargs['SPLINEknotpointsSPACING'] = SPLINEknotpointsSPACING; kwargs['SPLINEphaseSHIFT'] = SPLINEphaseSHIFT; kwargs['SPLINEorder'] = SPLINEorder
     
     # Subtracted the mean of your flux, ensuring to not change any offsets to your flux when calculating the corrections.
     flux = flux - np.mean(flux)
     
-    # Sorting the temperature and flux
-    paramSORTED, fluxSORTED = (list(t) for t in zip(*sorted(zip(param, flux))))
-    paramSORTED, fluxSORTED = np.array(paramSORTED), np.array(fluxSORTED)
-    
-    # Doing the fitting itself.
-    for kk in range(len(SPLINEknotpointsSPACING)):	# Loop over the different sets of knotpoints
-      NUMBERphaseSHIFTS = np.int(SPLINEknotpointsSPACING[kk]/SPLINEphaseSHIFT)
-      for pp in range(NUMBERphaseSHIFTS): 		# Loop over the different phaseshifts for a given set of knotpoints
-	if pp !=0: # A shift
-	  #paramKNOTPOINTS = np.arange(np.min(param) + SPLINEknotpointsSPACING[kk] - pp*SPLINEphaseSHIFT, np.max(param), SPLINEknotpointsSPACING[kk]) # Old == BAD
-	  paramKNOTPOINTS = np.arange(np.min(param) + SPLINEknotpointsSPACING[kk], np.max(param), SPLINEknotpointsSPACING[kk]) + pp*SPLINEphaseSHIFT # New
-	else: # No shift
-	  paramKNOTPOINTS = np.arange(np.min(param) + SPLINEknotpointsSPACING[kk], np.max(param), SPLINEknotpointsSPACING[kk])
-	# Check whether the last element is too far away or over the maximum value of that position. This happens roughly in ~50% of the calculations
-	if np.max(param) - paramKNOTPOINTS[-1] > SPLINEknotpointsSPACING[kk]:
-	  paramKNOTPOINTS = np.append(paramKNOTPOINTS, paramKNOTPOINTS[-1] + SPLINEknotpointsSPACING[kk])
-	elif (np.max(param) - paramKNOTPOINTS[-1] <= 0) and (len(paramKNOTPOINTS) != 1):
-	  paramKNOTPOINTS = np.delete(paramKNOTPOINTS, -1)
-	#  Check whether the first element is too far away from the minimum. This happens roughly in ~50% of the calculations
-	if abs(np.min(param) - paramKNOTPOINTS[0]) > SPLINEknotpointsSPACING[kk] + SPLINEphaseSHIFT:
-	  paramKNOTPOINTS = np.append(paramKNOTPOINTS[0] - SPLINEknotpointsSPACING[kk], paramKNOTPOINTS)
-	
-	for oo in range(len(SPLINEorder)): 		# Loop over the different orders of spline
-	  NUMBERestimatedPARAMSparam = (len(paramKNOTPOINTS) + 1) * (SPLINEorder[oo] + 1)		# Preferred usage #NOTE +1 here, since the knotpoints DO NOT include beginning and ending
-	  ###NUMBERestimatedPARAMSparam = np.int(1./SPLINEknotpointsSPACING[kk]) * (SPLINEorder[oo] + 1)	# Alternative, more prone to overfitting minor effects
-	  TCKparam, TCKerror = splineFIT(paramSORTED, fluxSORTED, SPLINEgiveKNOTPOINTS = True, SPLINEknotpoints = paramKNOTPOINTS, SPLINEorder=SPLINEorder[oo], SPLINEperiodic=periodicSPLINE)    
-	  AICparam, BICparam, likelihoodPARAM = splineGOODNESSofFITandINFORMATIONCRITERION(param, flux, TCKparam, PARAMSdetermine=False, PARAMSestimated=NUMBERestimatedPARAMSparam) # You should provide the full coord array, no rebinned arrays. We provide the number of estimated parameters.
-	  matrixAIClocal[kk,pp,oo], matrixBIClocal[kk,pp,oo], likelihoodMATRIXlocal[kk,pp,oo], matrixTCKlocal[kk,pp,oo] = AICparam, BICparam, likelihoodPARAM, str(TCKparam)
+    # Doing the fitting itself, for all sets of knotpoints, phase shifts and spline orders. See BRITE_decor.fitting.splinegrid for the engine.
+    matrixAIClocal, matrixBIClocal, likelihoodMATRIXlocal, matrixTCKlocal = splineGRIDsearch(param, flux, **kwargs)
     return matrixAIClocal, matrixBIClocal, likelihoodMATRIXlocal, matrixTCKlocal
\ No newline at end of file
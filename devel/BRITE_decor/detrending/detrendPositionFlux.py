@@ -61,6 +61,8 @@ def detrendPOSITIONflux(time, position, flux, **kwargs):
     @kwargs: SPLINEphaseSHIFT: value to consider for the phase shift for the same sets of knotpoints - Default is 0.01 [pixel]
     @kwargs: SPLINEorder: order for the spline fits; does accept numpy arrays! - Default is np.array([3],dtype='int32')
     @kwargs: SPLINEtckLENGTH: number of bytes allocated for the to-string-converted TCK - Default is 2000 [integer]
+    @kwargs: GRIDworkers: number of workers to distribute the spline fits over, see BRITE_decor.fitting.splinegrid - Default is 1 [integer]
+    @kwargs: GRIDcache: directory of the on-disk cache of the grid searches, see BRITE_decor.fitting.splinecache - Default is None (no cache) [string]
     
     @kwargs: show_ME: Boolean to indicate if you want plotting at each possible step - Default is False [Boolean]
     @kwargs: show_FITS: Boolean to indicate if you want plotting after each bin fitting step - Default is False [Boolean]
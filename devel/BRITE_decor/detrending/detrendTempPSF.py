@@ -4,9 +4,9 @@ Routines to detrend for the temperature dependent PSF changes, which produce ins
 
 In general, you should call the routine detrendTEMPpsfFULL.
 
-WARNING The routine will fail in case the positions are not well clipped. This can (and will) happen for even *one* bad datapoint. At present, I do not provide a routine to redo the fitting. Your best bet is to use a try-except statement, where you change the used spacings (make them larger!) for the knotpoints in the except window (or even ignore it at that moment). Remember, you can use the doSILENT = False to see why it happens. But it will only show you an errormessage=10, i.e. error on the input data (and NaNs in the whole AIC/BIC matrix; besides the 1.e50s).
+WARNING The routine will fail in case the positions are not well clipped. This can (and will) happen for even *one* bad datapoint. Your best bet is to change the used spacings (make them larger!) for the knotpoints and redo the fitting. detrendTEMPpsfBINS does this automatically for each temperature bin. Remember, you can use the doSILENT = False to see why it happens (see the status of the cells in BRITE_decor.fitting.splinegrid).
     
-Last update 21 March 2016
+Last update 19 October 2026
 
 @author: Bram Buysschaert
 """
@@ -19,7 +19,11 @@ import pylab as pl
 
 import scipy.interpolate as scInterp
 
-from BRITE_decor.fitting.splinefit import splineFIT, splineGOODNESSofFITandINFORMATIONCRITERION, reconvertTCKfromSTRING
+import multiprocessing
+import multiprocessing.pool
+
+from BRITE_decor.fitting.splinefit import reconvertTCKfromSTRING
+from BRITE_decor.fitting.splinegrid import splineGRIDsearch
 from BRITE_decor.plotting.PLOTdetrendTempPSF import PLOTdetrendTEMPpsfFULL, PLOTdetrendTEMPpsfDIAGinformCRIT
 #===============================================================================#
 # 			Class for colored console printing			#
@@ -39,7 +43,7 @@ class bcolors:
 #===============================================================================
 # 				Code
 #===============================================================================
-def detrendTEMPpsfCOORD(flux, coord, **kwargs): # actually redundant and should be replaced by BRITE.detrending.detrendPARAMflux
+def detrendTEMPpsfCOORD(flux, coord, **kwargs): # shares the grid search engine with BRITE.detrending.detrendPARAMflux
     """
     Routine to perform the fitting between a CCD coordinate vs flux for the temperature dependent PSF of BRITE photometry, using the full position arrays. This routine is three times called during fitPSFpositionFULL. This saves some coding lines and makes everything easier to understand / clearer on what happens.
     
@@ -64,61 +68,25 @@ def detrendTEMPpsfCOORD(flux, coord, **kwargs): # actually redundant and should
     @kwargs: SPLINEphaseSHIFT: value to consider for the phase shift for the same sets of knotpoints - default is 0.01 [pixel]
     @kwargs: SPLINEtckLENGTH: number of bytes allocated for the to-string-converted TCK - default is 2000 [integer]
     @kwargs: doSILENT: silent the printing option of the function - Default is True [Boolean]
+    
+    @kwargs: GRIDworkers: number of workers to distribute the fits over; 1 is serial, None uses all CPUs - Default is 1 [integer]
+    @kwargs: GRIDpool: type of the pool of workers, either 'process' or 'thread' - Default is 'process' [string]
     """
     # Reading in the kwargs and performing some minor checks, so we have everything in the correct input format
     SPLINEknotpointsSPACING = kwargs.get('SPLINEknotpointsSPACING', np.array([0.2,0.25,1./3.])) #[pixel]
     SPLINEphaseSHIFT = kwargs.get('SPLINEphaseSHIFT', 0.01) #[pixel]
     SPLINEorder = kwargs.get('SPLINEorder', np.array([3],dtype='int32')) #[integer]
-    SPLINEtckLENGTH = 'S' + str(np.int(kwargs.get('SPLINEstringLENGTH', 2000))) # [string] 
-    silence = kwargs.get('doSILENT', True) #[boolean] --- diagnostic
     # Making sure you gave a numpy array for SPLINEorder with integers. If not, change it
     try:
       len(SPLINEorder)
     except:
       SPLINEorder = np.array([SPLINEorder],dtype='int32')
-    maxNUMBERphaseSHIFTS = np.int(np.max(SPLINEknotpointsSPACING)/SPLINEphaseSHIFT)
+    kwargs['SPLINEknotpointsSPACING'] = SPLINEknotpointsSPACING; kwargs['SPLINEphaseSHIFT'] = SPLINEphaseSHIFT; kwargs['SPLINEorder'] = SPLINEorder
+    kwargs['SPLINEperiodic'] = False # The positions are never periodic
+    
+    # Doing the fitting itself, for all sets of knotpoints, phase shifts and spline orders. See BRITE_decor.fitting.splinegrid for the engine. You should provide the full coord array, no rebinned arrays.
+    matrixAIClocal, matrixBIClocal, likelihoodMATRIXlocal, matrixTCKlocal = splineGRIDsearch(coord, flux, **kwargs)
     
-    # Setting up the local matrices, for which we store the output. We multiply everthing with 1.e50 since we want the minimum BIC / AIC, and in case nothing is calculated, we want to avoid it and being able to trace it. -- If 1.e50 is too small for your usage, you are doing something horribly wrong. -- NOTE that the likelihood should be maximised, thus np.zeros
-    matrixAIClocal, matrixBIClocal, likelihoodMATRIXlocal, matrixTCKlocal = np.ones((len(SPLINEknotpointsSPACING),maxNUMBERphaseSHIFTS,len(SPLINEorder)))*1.e50, np.ones((len(SPLINEknotpointsSPACING),maxNUMBERphaseSHIFTS,len(SPLINEorder)))*1.e50, np.zeros((len(SPLINEknotpointsSPACING),maxNUMBERphaseSHIFTS,len(SPLINEorder))), np.ones((len(SPLINEknotpointsSPACING),maxNUMBERphaseSHIFTS,len(SPLINEorder)), dtype=SPLINEtckLENGTH)
-    
-    # Sorting the positions
-    coordSORTED, fluxSORTED = (list(t) for t in zip(*sorted(zip(coord, flux))))
-    coordSORTED, fluxSORTED = np.array(coordSORTED), np.array(fluxSORTED)
-    
-    # Doing the fitting itself.
-    for kk in range(len(SPLINEknotpointsSPACING)):	# Loop over the different sets of knotpoints
-      NUMBERphaseSHIFTS = np.int(SPLINEknotpointsSPACING[kk]/SPLINEphaseSHIFT)
-      for pp in range(NUMBERphaseSHIFTS): 		# Loop over the different phaseshifts for a given set of knotpoints
-	#if pp != 0: # A shift
-	  #coordKNOTPOINTS = np.arange(np.min(coord) + SPLINEknotpointsSPACING[kk] - pp*SPLINEphaseSHIFT, np.max(coord), SPLINEknotpointsSPACING[kk])
-	#else: # No shift
-	  #coordKNOTPOINTS = np.arange(np.min(coord) + SPLINEknotpointsSPACING[kk], np.max(coord), SPLINEknotpointsSPACING[kk])
-	  
-	## Check whether the last element is too far away or over the maximum value of that position. This happens roughly in ~0.1% of the calculations
-	#if np.max(coord) - coordKNOTPOINTS[-1] > SPLINEknotpointsSPACING[kk]:
-	  #coordKNOTPOINTS = np.append(coordKNOTPOINTS, coordKNOTPOINTS[-1] + SPLINEknotpointsSPACING[kk])
-	#elif np.max(coord) - coordKNOTPOINTS[-1] <= 0:
-	  #coordKNOTPOINTS = np.delete(coordKNOTPOINTS, -1)
-	if pp !=0: # A shift
-	  coordKNOTPOINTS = np.arange(np.min(coord) + SPLINEknotpointsSPACING[kk], np.max(coord), SPLINEknotpointsSPACING[kk]) + pp*SPLINEphaseSHIFT # New
-	else: # No shift
-	  coordKNOTPOINTS = np.arange(np.min(coord) + SPLINEknotpointsSPACING[kk], np.max(coord), SPLINEknotpointsSPACING[kk])
-	# Check whether the last element is too far away or over the maximum value of that position. This happens roughly in ~50% of the calculations
-	if np.max(coord) - coordKNOTPOINTS[-1] > SPLINEknotpointsSPACING[kk]:
-	  coordKNOTPOINTS = np.append(coordKNOTPOINTS, coordKNOTPOINTS[-1] + SPLINEknotpointsSPACING[kk])
-	elif np.max(coord) - coordKNOTPOINTS[-1] <= 0:
-	  coordKNOTPOINTS = np.delete(coordKNOTPOINTS, -1)
-	#  Check whether the first element is too far away from the minimum. This happens roughly in ~50% of the calculations
-	if abs(np.min(coord) - coordKNOTPOINTS[0]) > SPLINEknotpointsSPACING[kk] + SPLINEphaseSHIFT:
-	  coordKNOTPOINTS = np.append(coordKNOTPOINTS[0] - SPLINEknotpointsSPACING[kk], coordKNOTPOINTS)
-	  
-	for oo in range(len(SPLINEorder)): 		# Loop over the different orders of spline
-	  NUMBERestimatedPARAMScoord = (len(coordKNOTPOINTS) + 1) * (SPLINEorder[oo] + 1)			# Preferred usage #NOTE +1 here, since the knotpoints DO NOT include beginning and ending
-	  ###NUMBERestimatedPARAMScoord = np.int(1./SPLINEknotpointsSPACING[kk]) * (SPLINEorder[oo] + 1)	# Alternative, more prone to overfitting minor effects
-	  TCKcoord, TCKerror = splineFIT(coordSORTED, fluxSORTED, SPLINEgiveKNOTPOINTS = True, SPLINEknotpoints = coordKNOTPOINTS, SPLINEorder = SPLINEorder[oo], doSILENT = silence)   
-	  AICcoord, BICcoord, likelihoodCOORD = splineGOODNESSofFITandINFORMATIONCRITERION(coord, flux, TCKcoord, PARAMSdetermine=False, PARAMSestimated=NUMBERestimatedPARAMScoord, doSILENT = silence) # You should provide the full coord array, no rebinned arrays. We provide the number of estimated parameters.
-	  matrixAIClocal[kk,pp,oo], matrixBIClocal[kk,pp,oo], likelihoodMATRIXlocal[kk,pp,oo], matrixTCKlocal[kk,pp,oo] = AICcoord, BICcoord, likelihoodCOORD, str(TCKcoord)
-	  
     return matrixAIClocal, matrixBIClocal, likelihoodMATRIXlocal, matrixTCKlocal
 
 def detrendTEMPpsfFULL(time, flux, xPOS, yPOS, **kwargs):
@@ -134,7 +102,7 @@ def detrendTEMPpsfFULL(time, flux, xPOS, yPOS, **kwargs):
     WARNING DANGER WARNING DANGER WARNING DANGER WARNING DANGER WARNING
     Because of the implementation of the spline fitting routines in scipy.interpolate (splrep function), you *need* to have at least sorted and ascending x values when performing the fitting process. 
     
-    In addition, you can choose to have unique values along the x axis, but then you need to perform rebinning (=/= smoothing !!!). This is currently not implemented, but the routine rebinUNIQUE allows you to do this for two general parameter arrays. It provides an matrix as output, see the description of rebinUNIQUE, which should provide you with enough diagnostics to properly fit the spline to the rebinned values. At present, we only fit to the averages per bin, although one can implement an additional layer to decide if you should fit to the mean or the median value per position bin.
+    In addition, you can choose to have unique values along the x axis, but then you need to perform rebinning (=/= smoothing !!!). Use the kwarg GRIDrebin for this, which fits the (weighted) averages of position bins instead of the full arrays, see BRITE_decor.fitting.splinegrid.splineGRIDsearch and BRITE_decor.clipping.rebin.rebinGRID. The routine rebinUNIQUE provides more diagnostics (e.g. the median value) for bins of unique positions.
     WARNING DANGER WARNING DANGER WARNING DANGER WARNING DANGER WARNING
     
     NOTE Since we also want to compare the information criteria for x-position and y-position fits, we have to unify the number of fitting parameters somehow. If this is not done, the length of x (or y) will influence your BIC/AIC, since a larger lenght will give you more fitting parameters. As such, we use the spacing between consecutive knotpoints as a proxy for the number of fitting parameters, by calculating how many knotpoints we would have in a position region of length one. WARNING The phase shift might give you more knotpoints over the whole region. Unsure if we want to account for this! WARNING
@@ -169,6 +137,12 @@ def detrendTEMPpsfFULL(time, flux, xPOS, yPOS, **kwargs):
     @kwargs: SPLINEphaseSHIFT: value to consider for the phase shift for the same sets of knotpoints - Default is 0.01 [pixel]
     @kwargs: SPLINEorder: order for the spline fits; does accept numpy arrays! - Default is np.array([3],dtype='int32')
     @kwargs: SPLINEtckLENGTH: number of bytes allocated for the to-string-converted TCK - Default is 2000 [integer]
+    @kwargs: GRIDworkers: number of workers to distribute the spline fits over, see BRITE_decor.fitting.splinegrid - Default is 1 [integer]
+    @kwargs: GRIDcache: directory of the on-disk cache of the grid searches, see BRITE_decor.fitting.splinecache - Default is None (no cache) [string]
+    @kwargs: GRIDrebin: number of position bins to fit instead of the full arrays, see BRITE_decor.fitting.splinegrid - Default is None (full arrays) [integer]
+    @kwargs: PSFworkers: number of workers to fit the x and y coordinate concurrently, see _detrendTEMPpsfFIRST; 1 fits them one after the other - Default is 1 [integer]
+    @kwargs: PSFpool: type of the pool of workers, either 'process' or 'thread' - Default is 'process' [string]
+    @kwargs: PSFspeculative: also fit the second coordinate for both possible first corrections, while the first correction is not chosen yet - Default is False [Boolean]
     
     @kwargs: show_ME: Boolean to indicate if you want plotting at each possible step - Default is False [Boolean]
     @kwargs: show_FITS: Boolean to indicate if you want plotting after each bin fitting step - Default is False [Boolean]
@@ -201,11 +175,10 @@ def detrendTEMPpsfFULL(time, flux, xPOS, yPOS, **kwargs):
     
     # Setting up the master matrices, for which we store the output. We multiply everthing with 1.e50 since we want the minimum BIC / AIC, and in case nothing is calculated, we want to avoid it and being able to trace it. -- If 1.e50 is too small for your usage, you are doing something horribly wrong. -- NOTE that the likelihood should be maximised, thus np.zeros
     matrixAICfirst, matrixBICfirst, likelihoodMATRIXfirst, matrixTCKfirst = np.ones((2, len(SPLINEknotpointsSPACING),maxNUMBERphaseSHIFTS,len(SPLINEorder)))*1.e50, np.ones((2, len(SPLINEknotpointsSPACING),maxNUMBERphaseSHIFTS,len(SPLINEorder)))*1.e50, np.zeros((2, len(SPLINEknotpointsSPACING),maxNUMBERphaseSHIFTS,len(SPLINEorder))), np.ones((2, len(SPLINEknotpointsSPACING),maxNUMBERphaseSHIFTS,len(SPLINEorder)), dtype=SPLINEtckLENGTH)
-    # Doing the correction using the x-position
-    matrixAICfirst[0,:,:,:], matrixBICfirst[0,:,:,:], likelihoodMATRIXfirst[0,:,:,:], matrixTCKfirst[0,:,:,:] = detrendTEMPpsfCOORD(flux, xPOS, **kwargs)
-    
-    # Doing the correction using the y-position
-    matrixAICfirst[1,:,:,:], matrixBICfirst[1,:,:,:], likelihoodMATRIXfirst[1,:,:,:], matrixTCKfirst[1,:,:,:] = detrendTEMPpsfCOORD(flux, yPOS, **kwargs)
+    # Doing the correction using the x-position and the y-position (concurrently, when PSFworkers != 1)
+    outputFIRSTx, outputFIRSTy, outputSPECULATIVE = _detrendTEMPpsfFIRST(flux, xPOS, yPOS, **kwargs)
+    matrixAICfirst[0,:,:,:], matrixBICfirst[0,:,:,:], likelihoodMATRIXfirst[0,:,:,:], matrixTCKfirst[0,:,:,:] = outputFIRSTx
+    matrixAICfirst[1,:,:,:], matrixBICfirst[1,:,:,:], likelihoodMATRIXfirst[1,:,:,:], matrixTCKfirst[1,:,:,:] = outputFIRSTy
     
     # Looking for the optimal solution to apply the correction. To do so, we use the AIC and BIC. In doubt, we also resort to the likelihood. -- The nanmin is important, since there might be some NaNs in the matrix --
     AICmin = np.where(matrixAICfirst==np.nanmin(matrixAICfirst))
@@ -296,9 +269,13 @@ def detrendTEMPpsfFULL(time, flux, xPOS, yPOS, **kwargs):
     -----------------------------
     """
     # We do not set up the matrices for the output storage of the fitting, since these were already created by the detrendTEMPpsfCOORD (and are only 3D instead of 4D, since there is only one coordinate to fit)
-    if FIRSTcorrectionPARAMS[0][0] == 0:# Doing the correction using the y-position, since the x-position was chosen for the first correction
+    # The speculative fit can only be used when it started from the same first correction
+    cellFIRST = tuple(int(IDXaxis[0]) for IDXaxis in FIRSTcorrectionPARAMS)
+    if (cellFIRST[0] in outputSPECULATIVE) and (outputSPECULATIVE[cellFIRST[0]][0] == cellFIRST):
+      matrixAICsecond, matrixBICsecond, likelihoodMATRIXsecond, matrixTCKsecond = outputSPECULATIVE[cellFIRST[0]][1]
+    elif FIRSTcorrectionPARAMS[0][0] == 0:# Doing the correction using the y-position, since the x-position was chosen for the first correction
       matrixAICsecond, matrixBICsecond, likelihoodMATRIXsecond, matrixTCKsecond = detrendTEMPpsfCOORD(flux - FLUXfirstCORRECTION, yPOS, **kwargs)
-    if FIRSTcorrectionPARAMS[0][0] == 1:# Doing the correction using the y-position, since the x-position was chosen for the first correction
+    elif FIRSTcorrectionPARAMS[0][0] == 1:# Doing the correction using the y-position, since the x-position was chosen for the first correction
       matrixAICsecond, matrixBICsecond, likelihoodMATRIXsecond, matrixTCKsecond = detrendTEMPpsfCOORD(flux - FLUXfirstCORRECTION, xPOS, **kwargs)
     
     # Looking for the optimal solution to apply the correction. To do so, we use the AIC and BIC. In doubt, we also resort to the likelihood. -- The nanmin is important, since there might be some NaNs in the matrix --
@@ -397,4 +374,167 @@ def detrendTEMPpsfFULL(time, flux, xPOS, yPOS, **kwargs):
     print '1 - knotpoint spacing = {:1.2f}; phaseshift spacing = {:1.2f}'.format(SPLINEknotpointsSPACING[AICmin[1][0]], AICmin[2][0]*SPLINEphaseSHIFT)
     print '2 - knotpoint spacing = {:1.2f}; phaseshift spacing = {:1.2f}'.format(SPLINEknotpointsSPACING[AICmin2[0][0]], AICmin2[1][0]*SPLINEphaseSHIFT)
     
-    return FLUXfirstCORRECTION + FLUXsecondCORRECTION, matrixTCKfirst[FIRSTcorrectionPARAMS][0], matrixTCKsecond[SECONDcorrectionPARAMS][0], diagCORRECTION    
+    return FLUXfirstCORRECTION + FLUXsecondCORRECTION, matrixTCKfirst[FIRSTcorrectionPARAMS][0], matrixTCKsecond[SECONDcorrectionPARAMS][0], diagCORRECTION
+
+def _selectOPTIMUMcell(matrixAIC, matrixBIC, likelihoodMATRIX):
+    """
+    Select the optimal cell of the grid search in the same way as detrendTEMPpsfFULL (the AIC and BIC, and the likelihood in doubt), but without any printing or plotting.
+    
+    Returns: The index of the optimal cell.
+    """
+    AICmin = tuple(int(IDXaxis[0]) for IDXaxis in np.where(matrixAIC==np.nanmin(matrixAIC)))
+    BICmin = tuple(int(IDXaxis[0]) for IDXaxis in np.where(matrixBIC==np.nanmin(matrixBIC)))
+    if (AICmin != BICmin) and (likelihoodMATRIX[AICmin] < likelihoodMATRIX[BICmin]):
+      return BICmin
+    return AICmin
+
+def _detrendTEMPpsfSECOND(flux, coordFIRST, coordSECOND, outputFIRST, coordINDEX, **kwargs):
+    """
+    Perform the second correction for the optimal fit of the first coordinate (i.e. speculatively, before knowing which coordinate is corrected first).
+    
+    Returns: The index of the first correction in the 4D matrices of detrendTEMPpsfFULL, and the output of detrendTEMPpsfCOORD for the second coordinate.
+    """
+    matrixAIClocal, matrixBIClocal, likelihoodMATRIXlocal, matrixTCKlocal = outputFIRST
+    cellFIRST = _selectOPTIMUMcell(matrixAIClocal, matrixBIClocal, likelihoodMATRIXlocal)
+    FLUXfirstCORRECTION = scInterp.splev(coordFIRST, reconvertTCKfromSTRING(matrixTCKlocal[cellFIRST]))
+    return (coordINDEX,) + cellFIRST, detrendTEMPpsfCOORD(flux - FLUXfirstCORRECTION, coordSECOND, **kwargs)
+
+def _detrendTEMPpsfFIRST(flux, xPOS, yPOS, **kwargs):
+    """
+    Perform the first correction of detrendTEMPpsfFULL for the x and y coordinate. Both grid searches are independent, so they are done concurrently when PSFworkers != 1.
+    
+    With PSFspeculative, the second correction is started for a coordinate as soon as its first correction is done, using its own optimal fit. detrendTEMPpsfFULL only uses such a speculative fit when it chooses the same fit for the first correction, else the second correction is done as before. Hence, the latency is roughly two grid searches instead of three.
+    
+    NOTE With a pool of processes, the grid searches themselves are done serially (GRIDworkers = 1), as the worker processes cannot start a pool of their own.
+    
+    Returns: The output of detrendTEMPpsfCOORD for the x and y coordinate, and the speculative second corrections (a dictionary with the coordinate of the first correction as key, and the output of _detrendTEMPpsfSECOND as value).
+    
+    @kwargs: see detrendTEMPpsfFULL
+    """
+    PSFworkers = kwargs.get('PSFworkers', 1) #[integer]
+    PSFpool = kwargs.get('PSFpool', 'process') #[string]
+    if not PSFpool in ['process', 'thread']:
+      raise ValueError('Please specify the "PSFpool" properly as either "process" or "thread".')
+    PSFspeculative = kwargs.get('PSFspeculative', False) #[Boolean]
+    
+    outputSPECULATIVE = {}
+    if PSFworkers == 1:
+      outputFIRSTx = detrendTEMPpsfCOORD(flux, xPOS, **kwargs)
+      outputFIRSTy = detrendTEMPpsfCOORD(flux, yPOS, **kwargs)
+      return outputFIRSTx, outputFIRSTy, outputSPECULATIVE
+    
+    # Two workers suffice, as there are at most two tasks running at the same time
+    NUMBERworkers = PSFworkers if PSFworkers is not None else 2
+    if PSFpool == 'process':
+      kwargs['GRIDworkers'] = 1
+      poolPSF = multiprocessing.Pool(NUMBERworkers)
+    elif PSFpool == 'thread':
+      poolPSF = multiprocessing.pool.ThreadPool(NUMBERworkers)
+    try:
+      asyncFIRSTx = poolPSF.apply_async(detrendTEMPpsfCOORD, (flux, xPOS), kwargs)
+      asyncFIRSTy = poolPSF.apply_async(detrendTEMPpsfCOORD, (flux, yPOS), kwargs)
+      outputFIRSTx = asyncFIRSTx.get()
+      if PSFspeculative:
+        asyncSECONDy = poolPSF.apply_async(_detrendTEMPpsfSECOND, (flux, xPOS, yPOS, outputFIRSTx, 0), kwargs)
+      outputFIRSTy = asyncFIRSTy.get()
+      if PSFspeculative:
+        asyncSECONDx = poolPSF.apply_async(_detrendTEMPpsfSECOND, (flux, yPOS, xPOS, outputFIRSTy, 1), kwargs)
+        outputSPECULATIVE[0] = asyncSECONDy.get()
+        outputSPECULATIVE[1] = asyncSECONDx.get()
+    finally:
+      poolPSF.close(); poolPSF.join()
+    
+    return outputFIRSTx, outputFIRSTy, outputSPECULATIVE
+
+def _detrendTEMPpsfBIN(argsBIN):
+    """
+    Detrend a single temperature bin with detrendTEMPpsfFULL for the worker processes of detrendTEMPpsfBINS, retrying with wider knotpoint spacings when the fitting fails.
+    
+    Returns: The correction, both TCKs (in string format), the diagnostic value and the number of retries for the bin.
+    """
+    timeBIN, fluxBIN, xPOSbin, yPOSbin, kwargs = argsBIN
+    BINretryNUMBER = int(kwargs.get('BINretryNUMBER', 2)) #[integer]
+    BINretryFACTOR = kwargs.get('BINretryFACTOR', 2.) #[float]
+    SPLINEknotpointsSPACING = np.asarray(kwargs.get('SPLINEknotpointsSPACING', np.array([0.2,0.25,1./3.])), dtype=float) #[pixel]
+    
+    for NUMBERretries in range(BINretryNUMBER + 1):
+      kwargs['SPLINEknotpointsSPACING'] = SPLINEknotpointsSPACING * BINretryFACTOR**NUMBERretries
+      try:
+        correctionBIN, tckFIRSTbin, tckSECONDbin, diagnosticBIN = detrendTEMPpsfFULL(timeBIN, fluxBIN, xPOSbin, yPOSbin, **kwargs)
+        return correctionBIN, tckFIRSTbin, tckSECONDbin, diagnosticBIN, NUMBERretries
+      except (ValueError, np.linalg.LinAlgError) as errorBIN:
+        # Only the failures of the spline fitting are retried, programming errors are raised
+        if not(kwargs.get('doSILENT', True)):
+          print(bcolors.WARNING + '\tWARNING: detrendTEMPpsfFULL failed for the bin starting at {:.5f}, with the knotpoint spacings {} ({})'.format(timeBIN[0], kwargs['SPLINEknotpointsSPACING'], errorBIN) + bcolors.ENDC)
+    
+    # Nothing worked, so we do not correct this bin
+    return np.zeros_like(fluxBIN), 'None', 'None', np.int32(-1), BINretryNUMBER + 1
+
+def detrendTEMPpsfBINS(time, flux, xPOS, yPOS, binENDindexes, **kwargs):
+    """
+    Routine to perform detrendTEMPpsfFULL for each temperature bin of a full lightcurve, e.g. the output of BRITE_decor.detrending.binningWtemperature.openTIMEwithTEMPERATURE. The bins are independent, so they can be distributed over a pool of worker processes. The output is always gathered in the order of the bins.
+    
+    When the fitting of a bin fails (see the WARNING of this module), it is redone with the knotpoint spacings multiplied by BINretryFACTOR, at most BINretryNUMBER times. A bin for which every attempt fails is not corrected (zero correction, 'None' for the TCKs and -1 as diagnostic value), so the other bins are never lost.
+    
+    NOTE Each bin starts after the end index of the previous bin, and the last bin runs until the end of the arrays. This is the same convention as examples/read_PSFcorrection_save_example.py.
+    
+    NOTE With more than one worker, the plotting (show_ME, show_FITS and show_DIAG) is turned off, and each bin is fitted serially (GRIDworkers = 1 and PSFworkers = 1), as the worker processes cannot start a pool of their own.
+    
+    Returns: The correction you have to apply to the flux (for the full lightcurve), the TCKs of the first and second correction for each bin, the diagnostic value for each bin, and the number of retries for each bin.
+    
+    @param time: time measurements [d]
+    @type time: numpy array of length N
+    @param flux: flux measurements [adu]
+    @type flux: numpy array of length N
+    @param xPOS: CCD position measurements along x axis [pixel]
+    @type xPOS: numpy array of length N
+    @param yPOS: CCD position measurements along y axis [pixel]
+    @type yPOS: numpy array of length N
+    @param binENDindexes: end index of each temperature bin
+    @type binENDindexes: numpy array (dtype='int32') of length K
+    
+    @return fluxCORRECTION: correction to apply to the flux
+    @rtype: numpy array of length N
+    @return tckFIRSTlist: TCK of the first correction of each bin, in string format
+    @rtype: list of length K
+    @return tckSECONDlist: TCK of the second correction of each bin, in string format
+    @rtype: list of length K
+    @return diagnosticLIST: diagnostic value of each bin, see detrendTEMPpsfFULL
+    @rtype: numpy array (dtype='int32') of length K
+    @return retriesLIST: number of retries of each bin (BINretryNUMBER + 1 for a bin without correction)
+    @rtype: numpy array (dtype='int32') of length K
+    
+    @kwargs: BINworkers: number of workers to distribute the bins over; 1 is serial, None uses all CPUs - Default is 1 [integer]
+    @kwargs: BINretryNUMBER: maximum number of retries with wider knotpoint spacings - Default is 2 [integer]
+    @kwargs: BINretryFACTOR: factor for the knotpoint spacings for each retry - Default is 2. [float]
+    @kwargs: see detrendTEMPpsfFULL for the other kwargs
+    """
+    BINworkers = kwargs.get('BINworkers', 1) #[integer]
+    
+    # Splitting the arrays in their bins
+    IDXbins = np.split(np.arange(len(time)), np.asarray(binENDindexes[:-1]) + 1)
+    
+    NUMBERworkers = BINworkers if BINworkers is not None else multiprocessing.cpu_count()
+    if NUMBERworkers != 1:
+      kwargs['show_ME'], kwargs['show_FITS'], kwargs['show_DIAG'] = False, False, False
+      kwargs['GRIDworkers'], kwargs['PSFworkers'] = 1, 1
+    argsBINS = [(time[IDXbin], flux[IDXbin], xPOS[IDXbin], yPOS[IDXbin], dict(kwargs)) for IDXbin in IDXbins]
+    
+    if NUMBERworkers == 1 or len(argsBINS) <= 1:
+      outputBINS = [_detrendTEMPpsfBIN(argsBIN) for argsBIN in argsBINS]
+    else:
+      poolBINS = multiprocessing.Pool(min(NUMBERworkers, len(argsBINS)))
+      try:
+        outputBINS = poolBINS.map(_detrendTEMPpsfBIN, argsBINS, chunksize=1)
+      finally:
+        poolBINS.close(); poolBINS.join()
+    
+    # Gathering the output in the order of the bins
+    fluxCORRECTION = np.zeros(len(time))
+    tckFIRSTlist, tckSECONDlist, diagnosticLIST, retriesLIST = [], [], np.zeros(len(IDXbins), dtype='int32'), np.zeros(len(IDXbins), dtype='int32')
+    for ii, (IDXbin, outputBIN) in enumerate(zip(IDXbins, outputBINS)):
+      fluxCORRECTION[IDXbin] = outputBIN[0]
+      tckFIRSTlist.append(outputBIN[1]); tckSECONDlist.append(outputBIN[2])
+      diagnosticLIST[ii], retriesLIST[ii] = outputBIN[3], outputBIN[4]
+    
+    return fluxCORRECTION, tckFIRSTlist, tckSECONDlist, diagnosticLIST, retriesLIST
@@ -4,7 +4,7 @@ General routines to perform a pca between two dimensions. At the moment, only a
 
 At present, I do not recommend to use this routine for the arclength. Moreover, the effect of the temperature dependent PSF changes on the position cannot be represented by a PCA!
     
-Last update 17 March 2016
+Last update 19 October 2026
 
 @author: Bram Buysschaert
 """
@@ -45,6 +45,8 @@ def positionPCA(time, xPOS, yPOS, **kwargs):
     Include a proper way to calculate the arclength along this 1D motion (instead of the 10th order polynomial now used in the K2 data reduction). To this end, the time measurments are already included as an input requirement.
     TODO
     
+    NOTE: The arclength is integrated between consecutive datapoints (sorted along the dominant motion) and summed cumulatively, so it takes one vectorised pass instead of one numerical integral per datapoint.
+    
     NOTE: Currently (24/01/16) we are working with the numpy.cov function. This calculations the unnormalized covariance matrix. If you use the numpy.corrcoef routine, you would determine the normalized *correlation* matrix. It should (hopefully) not matter too much which routine you should call.
     DANGER: Within the same sidenote, we intend to warn the user that only a linear trend between the two parameters are properly determined by a correlation / covariance matrix. Anything else, like the periodic variations found here, should be treated with care.
     
@@ -84,16 +86,9 @@ def positionPCA(time, xPOS, yPOS, **kwargs):
     else:
       rotationMATRIX = covarianceMATRIXeigenVecs[:,::-1]
       
-    dMATRIX = np.matrix((dxPOS, dyPOS))
-    dMATRIXrotated = np.dot(dMATRIX.T,rotationMATRIX)
-    
-    dxPOSprime = np.zeros_like(dxPOS)
-    dyPOSprime = np.zeros_like(dyPOS)
-    
-    #Issues with the matrix environment, so we copy elementwise the matrix to arrays. NOTE might need some better way to solve this or might need optimization.
-    for ii in range(len(dxPOS)):
-      dxPOSprime[ii] = dMATRIXrotated[ii,0]
-      dyPOSprime[ii] = dMATRIXrotated[ii,1]
+    # Plain arrays, so the rotated coordinates are the columns of the product
+    dMATRIXrotated = np.dot(np.vstack((dxPOS, dyPOS)).T, rotationMATRIX)
+    dxPOSprime, dyPOSprime = dMATRIXrotated[:,0], dMATRIXrotated[:,1]
     
     if not(doARCLENGTH):
       return dxPOSprime, dyPOSprime
@@ -102,22 +97,18 @@ def positionPCA(time, xPOS, yPOS, **kwargs):
       # We follow here the approach by Vanderburg+2014 (however, the fitting method you use for the relation between dxPOSprime and dyPOSprime is not mentioned)
       maxITER = kwargs.get('CLIPiteration',5)
       #10th order polynomial fit to dxPOSprime and dyPOSprime
-      #outliers are taken into account
-      dxPOSprimeToFit, dyPOSprimeToFit, idx3Sigma = np.copy(dxPOSprime), np.copy(dyPOSprime), np.array([],dtype='int32')  
+      #outliers are taken into account, by keeping a mask of the datapoints still used in the fit
+      maskFIT = np.ones(len(dxPOSprime), dtype='bool')
       for ii in range(maxITER):
-	poly10fit = np.polyfit(dxPOSprimeToFit,dyPOSprimeToFit,10)
-	residualPoly10fit = dyPOSprimeToFit - np.polyval(poly10fit,dxPOSprimeToFit)
-	residualPoly10fitMean, residualPoly10fitSTD = np.mean(residualPoly10fit), np.std(residualPoly10fit)
-	
-	idxToClip = np.where(np.abs(residualPoly10fit) > 3.*residualPoly10fitSTD)[0]
-	for ll in range(len(idxToClip)):
-	  idx3Sigma = np.append(idx3Sigma, np.where(dxPOSprime==dxPOSprimeToFit[idxToClip[ll]])[0]) #NOTE look in original array
+	poly10fit = np.polyfit(dxPOSprime[maskFIT],dyPOSprime[maskFIT],10)
+	residualPoly10fit = dyPOSprime - np.polyval(poly10fit,dxPOSprime)
+	residualPoly10fitSTD = np.std(residualPoly10fit[maskFIT])
 	
+	maskToClip = maskFIT & (np.abs(residualPoly10fit) > 3.*residualPoly10fitSTD)
 	#Checking if there were *three*-sigma outliers
-	if len(idxToClip) > 0: 
+	if np.any(maskToClip):
 	  #Clipping out the outliers
-	  dxPOSprimeToFit = np.delete(dxPOSprimeToFit, idxToClip)
-	  dyPOSprimeToFit = np.delete(dyPOSprimeToFit, idxToClip)
+	  maskFIT &= ~maskToClip
 	else:
 	  break
 	
@@ -125,34 +116,28 @@ def positionPCA(time, xPOS, yPOS, **kwargs):
       poly10fitDerivative = np.polyder(poly10fit,m=1)
       
       #Sort dxPOSprime, in order to calculate the arclength
-      if (np.__version__!='1.8.1') & (np.__version__!='1.9.2'): #OLD version
-	sortRankdxPOSprime = np.argsort(dxPOSprime)
-	dxPOSprimeSorted = dxPOSprime[:,sortRankdxPOSprime]
-	dyPOSprimeSorted = dyPOSprime[:,sortRankdxPOSprime]
-	timeSorted = time[:,sortRankdxPOSprime]
-      else: #GENERAL version and most likely faster
-	dxPOSprimeSorted, dyPOSprimeSorted, timeSorted = (list(t) for t in zip(*sorted(zip(dxPOSprime, dyPOSprime, time))))
-	dxPOSprimeSorted, dyPOSprimeSorted, timeSorted = np.array(dxPOSprimeSorted), np.array(dyPOSprimeSorted), np.array(timeSorted)
+      sortRankdxPOSprime = np.argsort(dxPOSprime, kind='mergesort')
+      dxPOSprimeSorted = dxPOSprime[sortRankdxPOSprime]
       
       """
       Arclength calculation
       ---------------------
       """  
-      #Make function of the integral for the arclength, in order to solve it as an explicit integral
-      integral = lambda xx: np.sqrt(1. + (np.polyval(poly10fitDerivative,xx))**2.)
-      
-      #Calculate the integral for the arclength
-      sSorted = np.zeros_like(dxPOSprimeSorted)
-      for ii in range(len(sSorted)):
-	sSorted[ii] = scInteg.quad(integral,dxPOSprimeSorted[0],dxPOSprimeSorted[ii])[0]
-      
-      #Resort the arclength to match the monotone increasing time array
-      if (np.__version__!='1.8.1') & (np.__version__!='1.9.2'): #OLD version
-	sortRankTime = np.argsort(timeSorted)
-	arclength = sSorted[:,sortRankTime]
-      else: #GENERAL version and most likely faster
-	timeCopy, arclength = (list(t) for t in zip(*sorted(zip(timeSorted, sSorted))))
-	timeCopy, arclength = np.array(timeCopy), np.array(arclength)
+      # The arclength is the integral of sqrt(1 + (dy'/dx')^2) from the smallest dxPOSprime onwards. We integrate it between each pair of consecutive sorted datapoints with a Gauss-Legendre quadrature, and sum these up cumulatively. Wide intervals (e.g. in the sparse tails) are first split in subintervals of at most 1/1000 of the range, so the quadrature stays exact up to rounding.
+      nodesGAUSS, weightsGAUSS = np.polynomial.legendre.leggauss(5)
+      intervalWIDTH = dxPOSprimeSorted[1:] - dxPOSprimeSorted[:-1]
+      numberSUB = np.maximum(1, np.ceil(intervalWIDTH / (1.e-3 * (dxPOSprimeSorted[-1] - dxPOSprimeSorted[0]))).astype('int'))
+      intervalIDX = np.repeat(np.arange(len(intervalWIDTH)), numberSUB)
+      subIDX = np.arange(len(intervalIDX)) - np.repeat(np.cumsum(numberSUB) - numberSUB, numberSUB)
+      subHALF = 0.5 * intervalWIDTH[intervalIDX] / numberSUB[intervalIDX]
+      subMIDDLE = dxPOSprimeSorted[intervalIDX] + (2.*subIDX + 1.) * subHALF
+      xxGAUSS = subMIDDLE[:,np.newaxis] + subHALF[:,np.newaxis] * nodesGAUSS[np.newaxis,:]
+      integral = np.sqrt(1. + (np.polyval(poly10fitDerivative,xxGAUSS))**2.)
+      intervalINTEGRAL = np.bincount(intervalIDX, weights=subHALF * np.dot(integral, weightsGAUSS), minlength=len(intervalWIDTH))
+      sSorted = np.concatenate(([0.], np.cumsum(intervalINTEGRAL)))
       
+      #Resort the arclength to match the original order of the datapoints
+      arclength = np.empty_like(sSorted)
+      arclength[sortRankdxPOSprime] = sSorted
       
-      return arclength
\ No newline at end of file
+      return arclength
@@ -1,8 +1,14 @@
 # -*- coding: utf-8 -*-
 """
 Functions you might want to use, while using the bounded least-squares minimisation with the lmfit package
-    
-Last update 16 March 2016
+
+All functions here belong to one family: a sum of K sine functions on top of a polynomial background, constant + slope * x + ... + sum_k amplitude_k * sin(2 pi (x * frequency_k + phase_k)). The K sines are evaluated at once, as one KxN array, and each function has an analytic jacobian to give as Dfun to lmfit.minimize, so the fits need far fewer function evaluations.
+
+The parameter names define the model (see multisinpoly_params):
+- 'amplitude', 'frequency', 'phase' (one sine), or 'amplitude_k', 'frequency_k', 'phase_k' for k = 0, ..., K-1.
+- 'constant' and 'slope', or 'polynomial_p' for the coefficient of x**p.
+
+Last update 19 October 2026
 
 @author: Bram Buysschaert
 """
@@ -14,73 +20,213 @@ import numpy as np
 #===============================================================================
 # 				Code
 #===============================================================================
+# The kind and index of the parameters with a fixed name
+MULTISINPOLYnames = {'constant': ('polynomial', 0), 'slope': ('polynomial', 1), 'amplitude': ('amplitude', 0), 'frequency': ('frequency', 0), 'phase': ('phase', 0)}
+
 def lmfit_sinslope(params, x):
     """
     Function to be used for the lmfit LS minimisation routine to fit a given function to the data. The function here is a sine function with a *linear* background.
-    
+
     @param param: lmfit parameter containing the information needed to fit
     @type time: lmfit parameter class
     @param x: parameter for which we want to determine a function; y=param(x)
     @type x: numpy array of length N
-    
+
     Returns: The values of the function lmfit_sinslope.
     """
-    frequency = params['frequency'].value
-    constant = params['constant'].value
-    phase = params['phase'].value
-    amplitude = params['amplitude'].value
-    slope = params['slope'].value
-
-    return constant + slope * x +  amplitude * np.sin(2. * np.pi * (x * (frequency) + phase))
+    return lmfit_multisinpoly(params, x)
 
 def lmfit_sinslope_vs_data(params, x, signal):
     """
     Function comparing the data with the returned values of the lmfit_sin function, which is a sine function with a *linear* background.
-    
+
     @param param: lmfit parameter containing the information needed to fit
     @type time: lmfit parameter class
     @param x: parameter for which we want to determine a function; y=param(x)
     @type x: numpy array of length N
     @param signal: parameter which we want to represent with the function y=param(x)
     @type signal: numpy array of length N
-    
+
     Returns: Residuals between the data and the values of the function lmfit_sinslope
     """
     sin_vs_data = signal - lmfit_sinslope(params, x)
 
     return sin_vs_data
-      
+
+def lmfit_sinslope_jacobian(params, x, signal):
+    """
+    Analytic jacobian of lmfit_sinslope_vs_data, see lmfit_multisinpoly_jacobian.
+    """
+    return lmfit_multisinpoly_jacobian(params, x, signal)
+
 def lmfit_sin(params, x):
     """
     Function to be used for the lmfit LS minimisation routine to fit a given function to the data. The function here is a sine function with a *constant* background.
-    
+
     @param param: lmfit parameter containing the information needed to fit
     @type time: lmfit parameter class
     @param x: parameter for which we want to determine a function; y=param(x)
     @type x: numpy array of length N
-    
+
     Returns: The values of the function lmfit_sin.
     """
-    frequency = params['frequency'].value
-    constant = params['constant'].value
-    phase = params['phase'].value
-    amplitude = params['amplitude'].value
-
-    return constant + amplitude * np.sin(2. * np.pi * (x * (frequency) + phase))
+    return lmfit_multisinpoly(params, x)
 
 def lmfit_sin_vs_data(params, x, signal):
     """
     Function comparing the data with the returned values of the lmfit_sin function, which is a sine function with a *constant* background.
-    
+
     @param param: lmfit parameter containing the information needed to fit
     @type time: lmfit parameter class
     @param x: parameter for which we want to determine a function; y=param(x)
     @type x: numpy array of length N
     @param signal: parameter which we want to represent with the function y=param(x)
     @type signal: numpy array of length N
-    
+
     Returns: Residuals between the data and the values of the function lmfit_sin
     """
     sin_vs_data = signal - lmfit_sin(params, x)
 
-    return sin_vs_data   
\ No newline at end of file
+    return sin_vs_data
+
+def lmfit_sin_jacobian(params, x, signal):
+    """
+    Analytic jacobian of lmfit_sin_vs_data, see lmfit_multisinpoly_jacobian.
+    """
+    return lmfit_multisinpoly_jacobian(params, x, signal)
+
+def lmfit_multisin(params, x):
+    """
+    Function to be used for the lmfit LS minimisation routine to fit a given function to the data. The function here is a sum of K sine functions with a *constant* background, i.e. constant + sum_k amplitude_k * sin(2 pi (x * frequency_k + phase_k)).
+
+    @param param: lmfit parameter containing the information needed to fit
+    @type time: lmfit parameter class
+    @param x: parameter for which we want to determine a function; y=param(x)
+    @type x: numpy array of length N
+
+    Returns: The values of the function lmfit_multisin.
+    """
+    return lmfit_multisinpoly(params, x)
+
+def lmfit_multisin_vs_data(params, x, signal):
+    """
+    Function comparing the data with the returned values of the lmfit_multisin function, which is a sum of sine functions with a *constant* background.
+
+    @param param: lmfit parameter containing the information needed to fit
+    @type time: lmfit parameter class
+    @param x: parameter for which we want to determine a function; y=param(x)
+    @type x: numpy array of length N
+    @param signal: parameter which we want to represent with the function y=param(x)
+    @type signal: numpy array of length N
+
+    Returns: Residuals between the data and the values of the function lmfit_multisin
+    """
+    return signal - lmfit_multisin(params, x)
+
+def lmfit_multisin_jacobian(params, x, signal):
+    """
+    Analytic jacobian of lmfit_multisin_vs_data, see lmfit_multisinpoly_jacobian.
+    """
+    return lmfit_multisinpoly_jacobian(params, x, signal)
+
+def multisin_params(params):
+    """
+    Extract the parameters of lmfit_multisin from the lmfit parameter class.
+
+    @param param: lmfit parameter containing the information needed to fit
+    @type time: lmfit parameter class
+
+    Returns: The constant, and the amplitudes, frequencies and phases of the K sines (numpy arrays of length K).
+    """
+    polynomial, amplitudes, frequencies, phases = multisinpoly_params(params)
+
+    return polynomial[0], amplitudes, frequencies, phases
+
+def lmfit_multisinpoly(params, x):
+    """
+    Function to be used for the lmfit LS minimisation routine to fit a given function to the data. The function here is a sum of K sine functions with a *polynomial* background, i.e. sum_p polynomial_p * x**p + sum_k amplitude_k * sin(2 pi (x * frequency_k + phase_k)).
+
+    @param param: lmfit parameter containing the information needed to fit
+    @type time: lmfit parameter class
+    @param x: parameter for which we want to determine a function; y=param(x)
+    @type x: numpy array of length N
+
+    Returns: The values of the function lmfit_multisinpoly.
+    """
+    polynomial, amplitudes, frequencies, phases = multisinpoly_params(params)
+
+    return np.polyval(polynomial[::-1], x) + np.dot(amplitudes, np.sin(2. * np.pi * (np.outer(frequencies, x) + phases[:,np.newaxis])))
+
+def lmfit_multisinpoly_vs_data(params, x, signal):
+    """
+    Function comparing the data with the returned values of the lmfit_multisinpoly function, which is a sum of sine functions with a *polynomial* background.
+
+    @param param: lmfit parameter containing the information needed to fit
+    @type time: lmfit parameter class
+    @param x: parameter for which we want to determine a function; y=param(x)
+    @type x: numpy array of length N
+    @param signal: parameter which we want to represent with the function y=param(x)
+    @type signal: numpy array of length N
+
+    Returns: Residuals between the data and the values of the function lmfit_multisinpoly
+    """
+    return signal - lmfit_multisinpoly(params, x)
+
+def lmfit_multisinpoly_jacobian(params, x, signal):
+    """
+    Analytic jacobian of lmfit_multisinpoly_vs_data (and thus of all the residual functions here), to be given as Dfun to lmfit.minimize (with the default leastsq method and col_deriv=False).
+
+    @param param: lmfit parameter containing the information needed to fit
+    @type time: lmfit parameter class
+    @param x: parameter for which we want to determine a function; y=param(x)
+    @type x: numpy array of length N
+    @param signal: parameter which we want to represent with the function y=param(x)
+    @type signal: numpy array of length N
+
+    Returns: The derivatives of the residuals to each varying parameter (in the order of params), as an array of size Nx(number of varying parameters)
+    """
+    polynomial, amplitudes, frequencies, phases = multisinpoly_params(params)
+
+    argument = 2. * np.pi * (np.outer(frequencies, x) + phases[:,np.newaxis])
+    cosAMPLITUDE = 2. * np.pi * amplitudes[:,np.newaxis] * np.cos(argument)
+    # The derivatives of the residuals, i.e. minus those of the function, for each kind of parameter
+    derivatives = {'polynomial': -x[np.newaxis,:]**np.arange(len(polynomial))[:,np.newaxis], 'amplitude': -np.sin(argument), 'frequency': -cosAMPLITUDE * x, 'phase': -cosAMPLITUDE}
+
+    columns = [derivatives[kind][index] for name, kind, index in _multisinpoly_names(params) if params[name].vary]
+    return np.array(columns).T
+
+def multisinpoly_params(params):
+    """
+    Extract the parameters of lmfit_multisinpoly from the lmfit parameter class. Missing polynomial coefficients are zero.
+
+    @param param: lmfit parameter containing the information needed to fit
+    @type time: lmfit parameter class
+
+    Returns: The polynomial coefficients (from x**0 upwards, numpy array of length P+1), and the amplitudes, frequencies and phases of the K sines (numpy arrays of length K).
+    """
+    values = params.valuesdict()
+    names = _multisinpoly_names(params)
+
+    NUMBERsines = 1 + max([index for name, kind, index in names if kind == 'amplitude'] + [-1])
+    NUMBERpolynomial = 1 + max([index for name, kind, index in names if kind == 'polynomial'] + [0])
+    parameters = {'polynomial': np.zeros(NUMBERpolynomial), 'amplitude': np.zeros(NUMBERsines), 'frequency': np.zeros(NUMBERsines), 'phase': np.zeros(NUMBERsines)}
+    for name, kind, index in names:
+      parameters[kind][index] = values[name]
+
+    return parameters['polynomial'], parameters['amplitude'], parameters['frequency'], parameters['phase']
+
+def _multisinpoly_names(params):
+    """
+    The (name, kind, index) of every parameter of the lmfit parameter class, in its order, e.g. ('amplitude_2', 'amplitude', 2) or ('slope', 'polynomial', 1).
+    """
+    names = []
+    for name in params.keys():
+      if name in MULTISINPOLYnames:
+        kind, index = MULTISINPOLYnames[name]
+      else:
+        kind, _, index = name.rpartition('_')
+        if not kind in ['polynomial', 'amplitude', 'frequency', 'phase']:
+          raise ValueError('The parameter "{}" is not part of the multi-sine model. See BRITE_decor.fitfunctions.ff_lmfit for the names.'.format(name))
+        index = int(index)
+      names.append((name, kind, index))
+    return names
@@ -2,7 +2,7 @@
 """
 Some general fitting routines for lmfit, which could provide to be useful. For example, when trying to determine interpixel variations.
     
-Last update 17 March 2016
+Last update 19 October 2026
 
 @author: Bram Buysschaert
 """
@@ -15,6 +15,7 @@ import numpy as np
 from lmfit import minimize, Parameters, Parameter, report_fit, conf_interval2d, conf_interval, report_ci
 
 import BRITE_decor.fitfunctions.ff_lmfit
+from BRITE_decor.analysis.periodogram import periodogram
 #===============================================================================#
 # 			Class for colored console printing			#
 #===============================================================================#
@@ -38,7 +39,7 @@ def sineFIT(param1, param2, **kwargs):
     """
     Bounded LS minimisation for the fitting of a sinefunction to a given dataset. It is assumed that you can represent param2 as a function of param1. The lmfit package is used to perform the bounded LS minimisation.
     
-    DANGER this routine assumes you have a fixed frequency of 1 [unit**-1]. For example:
+    DANGER by default this routine assumes you have a fixed frequency of 1 [unit**-1] (see SINEfrequency and SINEfrequencyVARY). For example:
     - if param1 is time and param2 is flux, you will have a sine with a frequency of 1 c/d. 
     - if param1 is position and param2 is flux, you will have a sine with a frequency of 1 c/pix.
     
@@ -55,34 +56,37 @@ def sineFIT(param1, param2, **kwargs):
     @rtype: lmfit parameter class
     
     @kwargs: show_ME: Boolean to indicate if you want to see the report_fit - Default is False [Boolean]
+    @kwargs: SINEfrequency: (initial) frequency of the sine - Default is 1 [unit**-1]
+    @kwargs: SINEfrequencyVARY: let the frequency vary in the fit, within 0.05 of SINEfrequency - Default is False [Boolean]
     """
     show_ME = kwargs.get('show_ME', False)
+    frequencyGUESS = kwargs.get('SINEfrequency', 1.) 		# DANGER Here is the frequency assumption assumption.
+    frequencyVARY = kwargs.get('SINEfrequencyVARY', False) 	# [Boolean]
     
     # Determination of the guesses to start your bounded LS fit with.
     constantGUESS = np.median(param2) 				# param2
     amplitudeGUESS = np.max(np.abs(constantGUESS-param2))/2. 	# param2
-    frequencyGUESS = 1. 					# DANGER Here is the frequency assumption assumption.
     phaseGUESS = 0.1 						# Using the param1[np.where(param2==np.max(param2))]-param1[0]%1-0.5 is best, when there is no scatter on param2
     
     paramSINE = Parameters()
     #Make a params class for lmfit. 
     #		  	(Name,		Value,		Vary,	Min,				Max,				Expr)
     paramSINE.add_many(('amplitude',	amplitudeGUESS,	True,	amplitudeGUESS*0.1,		amplitudeGUESS*1.2,		None),
-		      ('frequency',	frequencyGUESS,	False,	frequencyGUESS-0.05,		frequencyGUESS+0.05,		None), # DANGER Here is the frequency assumption assumption. (It is set to non-vary.)
+		      ('frequency',	frequencyGUESS,	frequencyVARY,	frequencyGUESS-0.05,	frequencyGUESS+0.05,		None), # DANGER Here is the frequency assumption assumption. (It is set to non-vary by default.)
 		      ('constant',	constantGUESS,	True,	-abs(constantGUESS)*1.5,	abs(constantGUESS)*1.5,		None),
 		      ('phase',		phaseGUESS,	True,	0.,				1.,				None))
-    resultSIN = minimize(BRITE.fitfunctions.ff_lmfit.lmfit_sin_vs_data, paramSINE, args=(param1, param2))
+    resultSIN = minimize(BRITE_decor.fitfunctions.ff_lmfit.lmfit_sin_vs_data, paramSINE, args=(param1, param2), Dfun=BRITE_decor.fitfunctions.ff_lmfit.lmfit_sin_jacobian)
     
     if show_ME:
-      report_fit(paramsSIN, show_correl=False)
+      report_fit(resultSIN.params, show_correl=False)
     
-    return paramSINE
+    return resultSIN.params
 
 def sineFITwLINEARbackground(param1, param2, **kwargs):
     """
     Bounded LS minimisation for the fitting of a sinefunction to a given dataset *with a linear background instead of a constant background*. It is assumed that you can represent param2 as a function of param1. The lmfit package is used to perform the bounded LS minimisation.
     
-    DANGER this routine assumes you have a fixed frequency of 1 [unit**-1]. For example:
+    DANGER by default this routine assumes you have a fixed frequency of 1 [unit**-1] (see SINEfrequency and SINEfrequencyVARY). For example:
     - if param1 is time and param2 is flux, you will have a sine with a frequency of 1 c/d. 
     - if param1 is position and param2 is flux, you will have a sine with a frequency of 1 c/pix.
     
@@ -101,12 +105,15 @@ def sineFITwLINEARbackground(param1, param2, **kwargs):
     @rtype: lmfit parameter class
     
     @kwargs: show_ME: Boolean to indicate if you want to see the report_fit - Default is False [Boolean]
+    @kwargs: SINEfrequency: (initial) frequency of the sine - Default is 1 [unit**-1]
+    @kwargs: SINEfrequencyVARY: let the frequency vary in the fit, within 0.05 of SINEfrequency - Default is False [Boolean]
     """
     show_ME = kwargs.get('show_ME', False)
+    frequencyGUESS = kwargs.get('SINEfrequency', 1.) 		# DANGER Here is the frequency assumption assumption.
+    frequencyVARY = kwargs.get('SINEfrequencyVARY', False) 	# [Boolean]
     # Determination of the guesses to start your bounded LS fit with.
     constantGUESS = np.median(param2) 				# param2
     amplitudeGUESS = np.max(np.abs(constantGUESS-param2))/2. 	# param2
-    frequencyGUESS = 1. 					# DANGER Here is the frequency assumption assumption.
     phaseGUESS = 0.1 						# Using the param1[np.where(param2==np.max(param2))]-param1[0]%1-0.5 is best, when there is no scatter on param2
     slopeGUESS, constantGUESS = np.polyfit(param1, param2, 1)
     
@@ -114,12 +121,94 @@ def sineFITwLINEARbackground(param1, param2, **kwargs):
     #Make a params class for lmfit. 
     #		  	(Name,		Value,		Vary,	Min,				Max,				Expr)
     paramSINE.add_many(('amplitude',	amplitudeGUESS,	True,	amplitudeGUESS*0.1,		amplitudeGUESS*1.2,		None),
-		      ('frequency',	frequencyGUESS,	False,	frequencyGUESS-0.05,		frequencyGUESS+0.05,		None), # DANGER Here is the frequency assumption assumption. (It is set to non-vary.)
+		      ('frequency',	frequencyGUESS,	frequencyVARY,	frequencyGUESS-0.05,	frequencyGUESS+0.05,		None), # DANGER Here is the frequency assumption assumption. (It is set to non-vary by default.)
 		      ('constant',	constantGUESS,	True,	-abs(constantGUESS)*1.5,	abs(constantGUESS)*1.5,		None),
 		      ('phase',		phaseGUESS,	True,	0.,				1.,				None),
-		      ('slope',		slopeGUESS,	True,	-2*slopeGUESS,			+2*slopeGUESS,			None))
-    resultSIN = minimize(BRITE.fitfunctions.ff_lmfitlmfit_sinslope_vs_data, paramSINE, args=(param1, param2))
+		      ('slope',		slopeGUESS,	True,	-2*abs(slopeGUESS),		+2*abs(slopeGUESS),		None))
+    resultSIN = minimize(BRITE_decor.fitfunctions.ff_lmfit.lmfit_sinslope_vs_data, paramSINE, args=(param1, param2), Dfun=BRITE_decor.fitfunctions.ff_lmfit.lmfit_sinslope_jacobian)
     if show_ME:
-      report_fit(paramsSIN, show_correl=False)
+      report_fit(resultSIN.params, show_correl=False)
     
-    return paramSINE  
\ No newline at end of file
+    return resultSIN.params
+
+def prewhitenSINES(time, flux, **kwargs):
+    """
+    Iterative prewhitening of the flux, i.e. the extraction of the dominant (stellar) frequencies one at a time. Every iteration:
+    - determines the periodogram of the residuals (see BRITE_decor.analysis.periodogram) and takes its highest peak,
+    - stops when the signal-to-noise of this peak (compared to the mean amplitude of the residual periodogram within PREWHITENwindow around it) is below PREWHITENsnr,
+    - estimates the amplitude and phase at this frequency with a linear least-squares fit to the residuals,
+    - fits all frequencies, amplitudes and phases found so far simultaneously, together with a polynomial background of order PREWHITENpolynomial (lmfit, with the multi-sine function and its analytic jacobian from BRITE_decor.fitfunctions.ff_lmfit), starting from the previous solution,
+    - and updates the residuals with the new model.
+    
+    Subtract the returned model (flux - residuals) before clipping or detrending, so these do not remove real stellar variability.
+    
+    NOTE The fit uses the time relative to PREWHITENzeropoint (by default the mean time), which decorrelates the frequencies and phases. The returned phases also refer to this zeropoint, since the phases at e.g. HJD = 0 are far too sensitive to the errors on the frequencies.
+    
+    Returns: The frequencies, amplitudes and phases of the extracted sines, the polynomial background, the signal-to-noise of each extracted peak, and the residuals.
+    
+    @param time: time measurements [d]
+    @type time: numpy array of length N
+    @param flux: flux measurements [adu]
+    @type flux: numpy array of length N
+    
+    @return: frequencies [c/d], amplitudes [adu], phases [0-1] of the model sum_p polynomial_p * (time - PREWHITENzeropoint)**p + sum_k amplitude_k * sin(2 pi ((time - PREWHITENzeropoint) * frequency_k + phase_k))
+    @rtype: numpy arrays of length K
+    @return: polynomial: coefficients of the background, from the constant upwards [adu/d**p]
+    @rtype: numpy array of length PREWHITENpolynomial+1
+    @return: SNRs: signal-to-noise of each extracted peak
+    @rtype: numpy array of length K
+    @return: residuals [adu]
+    @rtype: numpy array of length N
+    
+    @kwargs: PREWHITENnumber: maximum number of frequencies - Default is 10 [integer]
+    @kwargs: PREWHITENsnr: minimum signal-to-noise of a peak to extract it - Default is 4 [float]
+    @kwargs: PREWHITENwindow: frequency window to determine the noise level around a peak - Default is 1 [c/d]
+    @kwargs: PREWHITENzeropoint: zeropoint of the time for the phases - Default is the mean of time [d]
+    @kwargs: PREWHITENpolynomial: order of the polynomial background - Default is 0, i.e. a constant [integer]
+    @kwargs: show_ME: Boolean to indicate if you want to see the report_fit of each iteration - Default is False [Boolean]
+    @kwargs: see BRITE_decor.analysis.periodogram.periodogram for the periodogram (the amplitude normalization is always used)
+    """
+    NUMBERmax = kwargs.get('PREWHITENnumber', 10) #[integer]
+    orderPOLYNOMIAL = kwargs.get('PREWHITENpolynomial', 0) #[integer]
+    SNRlimit = kwargs.get('PREWHITENsnr', 4.) #[float]
+    windowNOISE = kwargs.get('PREWHITENwindow', 1.) #[c/d]
+    show_ME = kwargs.get('show_ME', False)
+    kwargsPERIODOGRAM = dict(kwargs, PERIODOGRAMnormalization='amplitude')
+    
+    time, flux = np.asarray(time, dtype=float), np.asarray(flux, dtype=float)
+    timeZERO = kwargs.get('PREWHITENzeropoint', np.mean(time)) #[d]
+    timeRELATIVE = time - timeZERO
+    
+    # Starting from the LS polynomial background
+    polynomialGUESS = np.polyfit(timeRELATIVE, flux, orderPOLYNOMIAL)[::-1]
+    paramSINES = Parameters()
+    for pp in range(orderPOLYNOMIAL + 1):
+      paramSINES.add('polynomial_%d' % pp, value=polynomialGUESS[pp])
+    residuals, SNRs = flux - np.polyval(polynomialGUESS[::-1], timeRELATIVE), []
+    for kk in range(NUMBERmax):
+      frequenciesPERIODOGRAM, amplitudesPERIODOGRAM = periodogram(timeRELATIVE, residuals, **kwargsPERIODOGRAM)
+      IDXpeak = np.argmax(amplitudesPERIODOGRAM)
+      frequencyPEAK = frequenciesPERIODOGRAM[IDXpeak]
+      noisePEAK = np.mean(amplitudesPERIODOGRAM[np.abs(frequenciesPERIODOGRAM - frequencyPEAK) <= windowNOISE/2.])
+      if amplitudesPERIODOGRAM[IDXpeak] < SNRlimit * noisePEAK:
+        break
+      SNRs.append(amplitudesPERIODOGRAM[IDXpeak] / noisePEAK)
+      
+      # Linear estimate: residuals = a sin(2 pi f t) + b cos(2 pi f t), with a = amplitude cos(2 pi phase) and b = amplitude sin(2 pi phase)
+      argumentPEAK = 2. * np.pi * frequencyPEAK * timeRELATIVE
+      (sinCOEFFICIENT, cosCOEFFICIENT, offset), _, _, _ = np.linalg.lstsq(np.vstack((np.sin(argumentPEAK), np.cos(argumentPEAK), np.ones_like(timeRELATIVE))).T, residuals, rcond=-1)
+      paramSINES.add('amplitude_%d' % kk, value=np.hypot(sinCOEFFICIENT, cosCOEFFICIENT), min=0.)
+      paramSINES.add('frequency_%d' % kk, value=frequencyPEAK)
+      paramSINES.add('phase_%d' % kk, value=np.arctan2(cosCOEFFICIENT, sinCOEFFICIENT) / (2. * np.pi) % 1.)
+      
+      # All sines at once, starting from the previous solution
+      resultSINES = minimize(BRITE_decor.fitfunctions.ff_lmfit.lmfit_multisinpoly_vs_data, paramSINES, args=(timeRELATIVE, flux), Dfun=BRITE_decor.fitfunctions.ff_lmfit.lmfit_multisinpoly_jacobian)
+      paramSINES = resultSINES.params
+      residuals = BRITE_decor.fitfunctions.ff_lmfit.lmfit_multisinpoly_vs_data(paramSINES, timeRELATIVE, flux)
+      if show_ME:
+        report_fit(paramSINES, show_correl=False)
+    
+    polynomial, amplitudes, frequencies, phases = BRITE_decor.fitfunctions.ff_lmfit.multisinpoly_params(paramSINES)
+    phases = phases % 1.
+    
+    return frequencies, amplitudes, phases, polynomial, np.array(SNRs), residuals  
\ No newline at end of file
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Routines to fit an additive spline model of the flux, i.e. the sum of one spline per parameter (e.g. orbital phase, temperature, xPOS, yPOS, PSF coefficients), with all splines fitted at once.
+
+The detrending routines (detrendORBITflux, detrendTEMPflux, detrendPOSITIONflux, detrendTEMPpsfFULL and BRITE_decor.analysis.extra.auto_detrend) correct one parameter at a time, so the result depends on the order of the corrections. Here, the B-spline bases of all parameters are stacked into one sparse design matrix, and the coefficients follow from a single sparse least-squares solve.
+
+NOTE The knotpoint spacing of each parameter is fixed here, there is no grid search over the spacings and phase shifts. Use the grid search (BRITE_decor.fitting.splinegrid) of the single-parameter routines to choose them.
+
+Last update 19 October 2026
+
+@author: Bram Buysschaert
+"""
+
+#===============================================================================
+# 				Packages
+#===============================================================================
+import numpy as np
+
+import scipy.sparse as scSparse
+import scipy.sparse.linalg as scSparseLinalg
+
+from BRITE_decor.fitting.splinefit import splineBASIS
+#===============================================================================#
+# 			Class for colored console printing			#
+#===============================================================================#
+"""
+Copied from http://stackoverflow.com/questions/22886353/printing-colors-in-python-terminal
+"""
+class bcolors:
+    HEADER = '\033[95m'
+    OKBLUE = '\033[94m'
+    OKGREEN = '\033[92m'
+    WARNING = '\033[93m'
+    FAIL = '\033[91m'
+    ENDC = '\033[0m'
+    BOLD = '\033[1m'
+    UNDERLINE = '\033[4m'
+#===============================================================================
+# 				Code
+#===============================================================================
+def additiveKNOTPOINTS(param, spacing, orderSPLINE, **kwargs):
+    """
+    Determine the full knot vector of one component of the additive model, and the (folded) param values at which its basis is evaluated.
+
+    A non-periodic component has equidistant interior knotpoints, and the (order + 1) boundary knotpoints at the minimum and maximum of param, as for splrep. A periodic component has equidistant knotpoints over one period (the spacing is adapted to fit an integer number of times in the period), continued over order knotpoints at both sides, such that the B-splines wrap around.
+
+    Returns: The full knot vector, the param values to evaluate the basis at, and the number of independent coefficients.
+
+    @param param: param measurements [???]
+    @type param: numpy array of length N
+    @param spacing: spacing between consecutive knotpoints [param]
+    @type spacing: numpy.float
+    @param orderSPLINE: order of the spline
+    @type orderSPLINE: integer
+
+    @return knotpointsFULL: full knot vector (the t of the tck)
+    @rtype: numpy array
+    @return paramBASIS: param, folded into one period for a periodic component
+    @rtype: numpy array of length N
+    @return NUMBERcoefficients: number of independent coefficients
+    @rtype: integer
+
+    @kwargs: ADDITIVEperiodic: the component is periodic - Default is False [Boolean]
+    @kwargs: ADDITIVEperiod: period of a periodic component - Default is 1.0 [param]
+    """
+    periodicSPLINE = kwargs.get('ADDITIVEperiodic', False) #[Boolean]
+    periodSPLINE = kwargs.get('ADDITIVEperiod', 1.0) #[param]
+
+    if not(periodicSPLINE):
+      paramMIN, paramMAX = np.min(param), np.max(param)
+      knotpointsINTERIOR = np.arange(paramMIN + spacing, paramMAX, spacing)
+      knotpointsFULL = np.concatenate((np.ones(orderSPLINE + 1) * paramMIN, knotpointsINTERIOR, np.ones(orderSPLINE + 1) * paramMAX))
+      return knotpointsFULL, param, len(knotpointsFULL) - orderSPLINE - 1
+
+    NUMBERknotpoints = max(int(round(periodSPLINE / spacing)), orderSPLINE + 1)
+    spacingPERIODIC = periodSPLINE / NUMBERknotpoints
+    paramSTART = np.min(param)
+    knotpointsFULL = paramSTART + spacingPERIODIC * np.arange(-orderSPLINE, NUMBERknotpoints + orderSPLINE + 1)
+    paramBASIS = paramSTART + np.mod(param - paramSTART, periodSPLINE)
+    return knotpointsFULL, paramBASIS, NUMBERknotpoints
+
+def additiveSPLINEfit(flux, params, **kwargs):
+    """
+    Fit the flux with the sum of one spline per parameter, all at once: flux = offset + f_1(param_1) + f_2(param_2) + ...
+
+    The design matrix consists of the B-spline bases of all parameters next to each other. Each datapoint has only (order + 1) non-zero basis functions per parameter, so the matrix is stored as a sparse matrix, and the normal equations are solved with one sparse solve. The splines of the different parameters share a constant (the B-splines of each parameter sum to one), so we add a small ridge term (ADDITIVEridge, relative to the mean diagonal of the normal equations), and shift every component to a zero mean afterwards. The mean of all components is returned as offset.
+
+    Returns: The correction for each parameter (with zero mean), the offset, and the tck of each component.
+
+    NOTE The tck of a periodic component is only valid within one period, starting at the minimum of its param. Fold your param values first, e.g. np.mod(param - np.min(param), period) + np.min(param).
+
+    @param flux: flux measurements [adu]
+    @type flux: numpy array of length N
+    @param params: the parameters of the additive model
+    @type params: list of P numpy arrays of length N
+
+    @return correctionsMATRIX: correction of each parameter
+    @rtype: numpy array of size PxN
+    @return offset: constant of the model [adu]
+    @rtype: numpy.float
+    @return TCKlist: tck of each component (with zero mean)
+    @rtype: list of P tuples
+
+    @kwargs: ADDITIVEknotpointsSPACING: knotpoint spacing for each parameter - Default is 1/5 of the range of each parameter [param]
+    @kwargs: ADDITIVEorder: order of the spline for each parameter, or one order for all - Default is 3 [integer]
+    @kwargs: ADDITIVEperiodic: each parameter is periodic (e.g. the orbital phase) - Default is False for all [list of Booleans]
+    @kwargs: ADDITIVEperiod: period of each periodic parameter - Default is 1.0 for all [param]
+    @kwargs: ADDITIVEridge: relative ridge term for the normal equations - Default is 1.e-8 [float]
+    @kwargs: doSILENT: silent the printing option of the function - Default is True [Boolean]
+    """
+    NUMBERparams = len(params)
+    flux = np.asarray(flux, dtype=float)
+    params = [np.asarray(param, dtype=float) for param in params]
+
+    # Reading in the kwargs, for each parameter
+    ADDITIVEknotpointsSPACING = kwargs.get('ADDITIVEknotpointsSPACING', [(np.max(param) - np.min(param)) / 5. for param in params]) #[param]
+    ADDITIVEorder = np.broadcast_to(np.atleast_1d(kwargs.get('ADDITIVEorder', 3)), (NUMBERparams,)).astype(int) #[integer]
+    ADDITIVEperiodic = np.broadcast_to(np.atleast_1d(kwargs.get('ADDITIVEperiodic', False)), (NUMBERparams,)) #[Boolean]
+    ADDITIVEperiod = np.broadcast_to(np.atleast_1d(kwargs.get('ADDITIVEperiod', 1.0)), (NUMBERparams,)).astype(float) #[param]
+    ADDITIVEridge = kwargs.get('ADDITIVEridge', 1.e-8) #[float]
+    doSILENT = kwargs.get('doSILENT', True) #[Boolean]
+
+    # Stacking the sparse B-spline bases of all parameters
+    NUMBERpoints = len(flux)
+    rowsDESIGN, columnsDESIGN, valuesDESIGN = [], [], []
+    componentsBASIS, offsetCOLUMNS = [], 0
+    for pp in range(NUMBERparams):
+      knotpointsFULL, paramBASIS, NUMBERcoefficients = additiveKNOTPOINTS(params[pp], ADDITIVEknotpointsSPACING[pp], ADDITIVEorder[pp], ADDITIVEperiodic=ADDITIVEperiodic[pp], ADDITIVEperiod=ADDITIVEperiod[pp])
+      IDXfirst, basisVALUES = splineBASIS(paramBASIS, knotpointsFULL, ADDITIVEorder[pp], SORTED=False)
+      for aa in range(ADDITIVEorder[pp] + 1):
+        rowsDESIGN.append(np.arange(NUMBERpoints))
+        columnsDESIGN.append(offsetCOLUMNS + np.mod(IDXfirst + aa, NUMBERcoefficients)) # The modulo wraps the B-splines of a periodic component, and does nothing otherwise
+        valuesDESIGN.append(basisVALUES[aa])
+      componentsBASIS.append((knotpointsFULL, offsetCOLUMNS, NUMBERcoefficients))
+      offsetCOLUMNS += NUMBERcoefficients
+    matrixDESIGN = scSparse.csr_matrix((np.concatenate(valuesDESIGN), (np.concatenate(rowsDESIGN), np.concatenate(columnsDESIGN))), shape=(NUMBERpoints, offsetCOLUMNS))
+
+    # Solving the normal equations, with the ridge term for the shared constant (and knot intervals without datapoints)
+    normalMATRIX = matrixDESIGN.T.dot(matrixDESIGN).tocsc()
+    normalRHS = matrixDESIGN.T.dot(flux)
+    ridgeTERM = ADDITIVEridge * normalMATRIX.diagonal().mean()
+    coefficients = scSparseLinalg.spsolve(normalMATRIX + ridgeTERM * scSparse.identity(offsetCOLUMNS, format='csc'), normalRHS)
+
+    # Splitting the model in its components, each with zero mean
+    correctionsMATRIX, TCKlist = np.zeros((NUMBERparams, NUMBERpoints)), []
+    for pp in range(NUMBERparams):
+      knotpointsFULL, offsetCOMPONENT, NUMBERcoefficients = componentsBASIS[pp]
+      matrixCOMPONENT = matrixDESIGN[:, offsetCOMPONENT:offsetCOMPONENT + NUMBERcoefficients]
+      coefficientsCOMPONENT = coefficients[offsetCOMPONENT:offsetCOMPONENT + NUMBERcoefficients]
+      correctionsMATRIX[pp] = matrixCOMPONENT.dot(coefficientsCOMPONENT)
+      meanCOMPONENT = np.mean(correctionsMATRIX[pp])
+      correctionsMATRIX[pp] -= meanCOMPONENT
+      # The B-splines sum to one, so shifting all coefficients shifts the spline. A periodic component repeats its first order coefficients at the end.
+      coefficientsTCK = (coefficientsCOMPONENT - meanCOMPONENT)[np.mod(np.arange(len(knotpointsFULL) - ADDITIVEorder[pp] - 1), NUMBERcoefficients)]
+      TCKlist.append((knotpointsFULL, np.concatenate((coefficientsTCK, np.zeros(ADDITIVEorder[pp] + 1))), ADDITIVEorder[pp]))
+    offset = np.mean(flux - np.sum(correctionsMATRIX, axis=0))
+
+    if not(doSILENT):
+      residualsSTD = np.std(flux - offset - np.sum(correctionsMATRIX, axis=0))
+      print(bcolors.OKBLUE + '\tadditiveSPLINEfit: {:d} parameters, {:d} coefficients, std of the residuals = {:.5e}'.format(NUMBERparams, offsetCOLUMNS, residualsSTD) + bcolors.ENDC)
+
+    return correctionsMATRIX, offset, TCKlist
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Routines to cache the output of the spline grid search (see BRITE_decor.fitting.splinegrid) on disk, so rerunning detrendORBITflux, detrendTEMPflux, detrendPOSITIONflux or detrendTEMPpsfFULL on identical input skips the grid search entirely.
+
+The cache is keyed by a hash of the input arrays and of all kwargs that change the output of the grid search. Each entry is one compressed .npz file with the AIC, BIC, likelihood, TCK and status matrices. The cache directory is kept below a maximum size by removing the least recently used entries.
+
+NOTE The cache is opt-in. Give GRIDcache (a directory) to splineGRIDsearch, or to any routine calling it, to use it.
+
+Last update 19 October 2026
+
+@author: Bram Buysschaert
+"""
+
+#===============================================================================
+# 				Packages
+#===============================================================================
+import numpy as np
+
+import os
+import hashlib
+import tempfile
+#===============================================================================#
+# 			Class for colored console printing			#
+#===============================================================================#
+"""
+Copied from http://stackoverflow.com/questions/22886353/printing-colors-in-python-terminal
+"""
+class bcolors:
+    HEADER = '\033[95m'
+    OKBLUE = '\033[94m'
+    OKGREEN = '\033[92m'
+    WARNING = '\033[93m'
+    FAIL = '\033[91m'
+    ENDC = '\033[0m'
+    BOLD = '\033[1m'
+    UNDERLINE = '\033[4m'
+#===============================================================================
+# 				Code
+#===============================================================================
+# The kwargs of splineGRIDsearch which change its output, with their defaults. GRIDworkers and GRIDpool do not change the output, so they are not part of the key.
+CACHEkwargs = [('SPLINEknotpointsSPACING', [1./3., 0.5, 1.0]), ('SPLINEphaseSHIFT', 0.01), ('SPLINEorder', [3]), ('SPLINEperiodic', False), ('SPLINEstringLENGTH', 2000), ('GRIDsolver', 'banded'), ('GRIDsearch', 'exhaustive'), ('GRIDcoarseNUMBER', 5), ('GRIDrefineTOP', 3), ('GRIDroughness', 4.), ('GRIDbudget', None), ('GRIDminPOINTS', 0), ('GRIDpruneBIC', None), ('GRIDrebin', None), ('GRIDrebinCRITERIA', 'binned')]
+
+def cacheKEY(param, flux, **kwargs):
+    """
+    Determine the key of a grid search in the cache, i.e. a hash of the input arrays and the kwargs that change the output (see CACHEkwargs).
+
+    Returns: The key of the cache entry.
+
+    @param param: param measurements [???]
+    @type param: numpy array of length N
+    @param flux: flux measurements [adu]
+    @type flux: numpy array of length N
+
+    @return keyCACHE: hexadecimal sha1 hash
+    @rtype: string
+    """
+    hashKEY = hashlib.sha1()
+    for array in (param, flux):
+      array = np.ascontiguousarray(array, dtype='float64')
+      hashKEY.update(str(array.shape).encode('ascii'))
+      hashKEY.update(array.tobytes())
+    for keyword, default in CACHEkwargs:
+      value = kwargs.get(keyword, default)
+      if value is not None and (isinstance(default, list) or not np.isscalar(value)):
+        value = [float(vv) for vv in np.atleast_1d(value)]
+      elif isinstance(value, (float, np.floating)):
+        value = float(value)
+      elif isinstance(value, (bool, np.bool_)):
+        value = bool(value)
+      elif isinstance(value, (int, np.integer)):
+        value = int(value)
+      hashKEY.update('{}={!r};'.format(keyword, value).encode('ascii'))
+    return hashKEY.hexdigest()
+
+def loadCACHE(pathCACHE, keyCACHE, **kwargs):
+    """
+    Load the output of a grid search from the cache. A successful load marks the entry as recently used.
+
+    Returns: The AIC, BIC, likelihood, TCK and status matrices, or None if the entry is not in the cache (or unreadable).
+
+    @param pathCACHE: directory of the cache
+    @type pathCACHE: string
+    @param keyCACHE: key of the entry, see cacheKEY
+    @type keyCACHE: string
+
+    @return: matrixAIC, matrixBIC, likelihoodMATRIX, matrixTCK, statusMATRIX (or None)
+    @rtype: tuple of numpy 3D arrays
+    """
+    fileCACHE = os.path.join(pathCACHE, keyCACHE + '.npz')
+    if not os.path.isfile(fileCACHE):
+      return None
+    try:
+      entryCACHE = np.load(fileCACHE)
+      output = entryCACHE['matrixAIC'], entryCACHE['matrixBIC'], entryCACHE['likelihoodMATRIX'], entryCACHE['matrixTCK'], entryCACHE['statusMATRIX']
+      entryCACHE.close()
+    except Exception: # Broken entry (e.g. an interrupted write, or an entry of an older version without statusMATRIX), so we act as if it is not there
+      return None
+    # The modification time is used for the least recently used eviction
+    os.utime(fileCACHE, None)
+    return output
+
+def saveCACHE(pathCACHE, keyCACHE, matrixAIC, matrixBIC, likelihoodMATRIX, matrixTCK, statusMATRIX, **kwargs):
+    """
+    Save the output of a grid search to the cache, and remove the least recently used entries when the cache grows larger than CACHEsize.
+
+    The entry is first written to a temporary file and then renamed, so an interrupted run never leaves a broken entry behind.
+
+    @param pathCACHE: directory of the cache (created when needed)
+    @type pathCACHE: string
+    @param keyCACHE: key of the entry, see cacheKEY
+    @type keyCACHE: string
+    @param matrixAIC, matrixBIC, likelihoodMATRIX, matrixTCK, statusMATRIX: output of the grid search
+    @type matrixAIC, matrixBIC, likelihoodMATRIX, matrixTCK, statusMATRIX: numpy 3D arrays
+
+    @kwargs: CACHEsize: maximum size of the cache directory - Default is 100 [MB]
+    """
+    sizeCACHE = kwargs.get('CACHEsize', 100.) * 1024.**2 #[bytes]
+
+    if not os.path.isdir(pathCACHE):
+      os.makedirs(pathCACHE)
+
+    fileTEMPORARY, nameTEMPORARY = tempfile.mkstemp(suffix='.tmp', dir=pathCACHE)
+    try:
+      with os.fdopen(fileTEMPORARY, 'wb') as fileOUT:
+        np.savez_compressed(fileOUT, matrixAIC=matrixAIC, matrixBIC=matrixBIC, likelihoodMATRIX=likelihoodMATRIX, matrixTCK=matrixTCK, statusMATRIX=statusMATRIX)
+      os.rename(nameTEMPORARY, os.path.join(pathCACHE, keyCACHE + '.npz'))
+    except Exception:
+      if os.path.isfile(nameTEMPORARY):
+        os.remove(nameTEMPORARY)
+      raise
+
+    evictCACHE(pathCACHE, sizeCACHE)
+
+def evictCACHE(pathCACHE, sizeCACHE, **kwargs):
+    """
+    Remove the least recently used entries from the cache, until its total size is below sizeCACHE. The most recent entry is always kept.
+
+    @param pathCACHE: directory of the cache
+    @type pathCACHE: string
+    @param sizeCACHE: maximum size of the cache [bytes]
+    @type sizeCACHE: numpy.float
+    """
+    entriesCACHE = []
+    for fileNAME in os.listdir(pathCACHE):
+      if fileNAME.endswith('.npz'):
+        statENTRY = os.stat(os.path.join(pathCACHE, fileNAME))
+        entriesCACHE.append((statENTRY.st_mtime, statENTRY.st_size, fileNAME))
+    entriesCACHE.sort()
+
+    sizeTOTAL = sum(entry[1] for entry in entriesCACHE)
+    for mtimeENTRY, sizeENTRY, fileNAME in entriesCACHE[:-1]:
+      if sizeTOTAL <= sizeCACHE:
+        break
+      try:
+        os.remove(os.path.join(pathCACHE, fileNAME))
+      except OSError: # Already removed by another run
+        pass
+      sizeTOTAL -= sizeENTRY
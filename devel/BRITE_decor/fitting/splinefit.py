@@ -13,6 +13,7 @@ Last update 16 March 2016
 import numpy as np
 
 import scipy.interpolate as scInterp
+import scipy.linalg as scLinalg
 #===============================================================================#
 # 			Class for colored console printing			#
 #===============================================================================#
@@ -104,12 +105,14 @@ def splineFIT(param1, param2, **kwargs):
     @kwargs: SPLINEknotpoints: the user specified knotpoints for the spline representation; should be used with SPLINEgiveKNOTPOINTS - Default is None (e.g. pop) [param1 units]
     @kwargs: SPLINEperiodic: state if the spline representation should be a periodic function or not - Default is False [Boolean]
     @kwargs: SPLINEorder: state which order the spline representation should be; preferibly odd order - default is 3 [integer]
+    @kwargs: SPLINEweights: weights of the datapoints, see the w of scipy.interpolate.splrep - Default is None (equal weights) [numpy array of length N]
     @kwargs: doSILENT: silent the printing option of the function - Default is True [Boolean]
     """
     
     manualKNOTPOINT = kwargs.get('SPLINEgiveKNOTPOINTS', False) #[Boolean]
     orderSPLINE = np.int(kwargs.get('SPLINEorder', 3)) #[integer]
     periodicSPLINE = kwargs.get('SPLINEperiodic', False) #[Boolean]
+    weightsSPLINE = kwargs.get('SPLINEweights', None) #[numpy array]
     doSILENT = kwargs.get('doSILENT', True) #[Boolean]
     
     if not(manualKNOTPOINT):
@@ -120,9 +123,9 @@ def splineFIT(param1, param2, **kwargs):
     
     # WARNING your first element and last element of the knotpointSPLINE should be larger than the minimum and smaller than the maximum of param2, respectively. If not, splrep WILL complain.
     if not(periodicSPLINE):
-      tckSPLINE, fpSPLINE, ierSPLINE, msgSPLINE  = scInterp.splrep(param1, param2, t=knotpointSPLINE[:], k=orderSPLINE, full_output=1)
+      tckSPLINE, fpSPLINE, ierSPLINE, msgSPLINE  = scInterp.splrep(param1, param2, w=weightsSPLINE, t=knotpointSPLINE[:], k=orderSPLINE, full_output=1)
     elif periodicSPLINE:
-      tckSPLINE, fpSPLINE, ierSPLINE, msgSPLINE = scInterp.splrep(param1, param2, t=knotpointSPLINE[:], k=orderSPLINE, per=1, full_output=1)    
+      tckSPLINE, fpSPLINE, ierSPLINE, msgSPLINE = scInterp.splrep(param1, param2, w=weightsSPLINE, t=knotpointSPLINE[:], k=orderSPLINE, per=1, full_output=1)    
     
     if (ierSPLINE != 0) and not(doSILENT):
       print bcolors.FAIL + 'The spline fitting routine produced an error, which is the following:' + bcolors.ENDC
@@ -132,6 +135,119 @@ def splineFIT(param1, param2, **kwargs):
     
     return tckSPLINE, ierSPLINE
 
+def splineBASIS(param1SORTED, knotpointsFULL, orderSPLINE, **kwargs):
+    """
+    Evaluate the B-spline basis functions for all values of param1 at once, using the Cox-de Boor recursion vectorised over the datapoints. Only the (order + 1) non-zero basis functions per datapoint are stored, so the design matrix is kept in a banded form.
+    
+    NOTE param1SORTED does not have to be sorted for this routine (use SORTED=False), but it is for all our applications.
+    
+    Returns: The index of the first non-zero basis function for each datapoint, and a matrix with the values of the non-zero basis functions.
+    
+    @param param1SORTED: parameter 1 values 
+    @type param1SORTED: numpy array of length N
+    @param knotpointsFULL: full knot vector, including the (order + 1) boundary knotpoints at each side (t of the tck)
+    @type knotpointsFULL: numpy array of length M
+    @param orderSPLINE: order of the spline
+    @type orderSPLINE: integer
+    
+    @return IDXfirst: index of the first non-zero basis function
+    @rtype: numpy array of length N (dtype='int')
+    @return basisVALUES: values of the non-zero basis functions, with basisVALUES[aa] the (aa+1)-th non-zero basis function of each datapoint
+    @rtype: numpy array of size (order+1)xN
+    
+    @kwargs: SORTED: param1SORTED is sorted ascending - Default is True [Boolean]
+    """
+    NUMBERcoefficients = len(knotpointsFULL) - orderSPLINE - 1
+    
+    # Determine the knot interval of each datapoint, such that knotpointsFULL[ll] <= param1 < knotpointsFULL[ll+1]. The last datapoint is put in the last interval.
+    if kwargs.get('SORTED', True):
+      # For sorted data, locating the knotpoints in param1 is much cheaper than locating every datapoint in the knotpoints
+      IDXboundaries = np.searchsorted(param1SORTED, knotpointsFULL[orderSPLINE+1:NUMBERcoefficients], side='left')
+      IDXinterval = np.repeat(np.arange(orderSPLINE, NUMBERcoefficients), np.diff(np.concatenate(([0], IDXboundaries, [len(param1SORTED)]))))
+    else:
+      IDXinterval = np.searchsorted(knotpointsFULL, param1SORTED, side='right') - 1
+      IDXinterval = np.clip(IDXinterval, orderSPLINE, NUMBERcoefficients - 1)
+    
+    # Cox-de Boor recursion (de Boor's BSPLVB), for all datapoints at once. We keep the columns as separate (contiguous) arrays, which is much faster than slicing a 2D array.
+    basisCOLUMNS = [np.ones(len(param1SORTED))]
+    left, right = [None], [None]
+    for jj in range(1, orderSPLINE + 1):
+      left.append(param1SORTED - knotpointsFULL[IDXinterval + 1 - jj])
+      right.append(knotpointsFULL[IDXinterval + jj] - param1SORTED)
+      saved = 0.
+      for rr in range(jj):
+        temp = basisCOLUMNS[rr] / (right[rr+1] + left[jj-rr])
+        basisCOLUMNS[rr] = saved + right[rr+1] * temp
+        saved = left[jj-rr] * temp
+      basisCOLUMNS.append(saved)
+    
+    return IDXinterval - orderSPLINE, np.array(basisCOLUMNS)
+  
+def splineFITbanded(param1SORTED, param2SORTED, knotpoints, orderSPLINE, **kwargs):
+    """
+    Least-squares spline representation of param2 as a function of param1, for given (interior) knotpoints. This gives the same result as splineFIT (i.e. scipy.interpolate.splrep with task=-1), but solves the normal equations with a banded Cholesky solver on a banded design matrix, which is several times faster for long arrays.
+    
+    The normal equations are assembled per knot interval with np.add.reduceat, so there is no loop over the datapoints. Only the knot vector and the spline order change the design matrix, so everything else (sorting, minimum and maximum of param1) should be done once by the caller.
+    
+    WARNING This is a non-periodic fit only. In case the normal equations are singular (e.g. no datapoints between two knotpoints), ierSPLINE = 10 is returned, similar to splrep, and you should fall back to splineFIT.
+    
+    Returns: The tck tuple of the spline fit (in the same format as scipy.interpolate.splrep), an error flag, and the spline evaluated at param1SORTED
+    
+    @param param1SORTED: parameter 1 values, sorted ascending
+    @type param1SORTED: numpy array of length N
+    @param param2SORTED: parameter 2 values, sorted according to param1
+    @type param2SORTED: numpy array of length N
+    @param knotpoints: interior knotpoints of the spline [units of param1]
+    @type knotpoints: numpy array
+    @param orderSPLINE: order of the spline
+    @type orderSPLINE: integer
+    
+    @return: tckSPLINE
+    @rtype: tuple
+    @return: ierSPLINE: 0 on success, 10 if the problem is singular
+    @rtype: integer
+    @return: param2MODEL: the spline fit evaluated at param1SORTED
+    @rtype: numpy array of length N
+    
+    @kwargs: SPLINEweights: weights of the datapoints, which multiply the residuals (as the w of scipy.interpolate.splrep) - Default is None (equal weights) [numpy array of length N]
+    """
+    weightsSPLINE = kwargs.get('SPLINEweights', None) #[numpy array]
+    orderSPLINE = int(orderSPLINE)
+    knotpointsFULL = np.concatenate((np.ones(orderSPLINE + 1) * param1SORTED[0], knotpoints, np.ones(orderSPLINE + 1) * param1SORTED[-1]))
+    NUMBERcoefficients = len(knotpointsFULL) - orderSPLINE - 1
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+      IDXfirst, basisVALUES = splineBASIS(param1SORTED, knotpointsFULL, orderSPLINE)
+    if not np.all(np.isfinite(basisVALUES)): # Coinciding knotpoints
+      return (knotpointsFULL, np.ones(len(knotpointsFULL))*np.nan, orderSPLINE), 10, np.ones_like(param2SORTED)*np.nan
+    
+    # Assemble the normal equations (B^T B) c = B^T y, with B^T B stored in the upper banded form of scipy.linalg.solveh_banded.
+    # The data is sorted, so all datapoints of one knot interval are consecutive. We sum the products per interval with np.add.reduceat, and only scatter the (small) interval sums into the band.
+    # With weights, the squared weights go into one of both factors of each product (B^T W^2 B and B^T W^2 y).
+    IDXsegments = np.concatenate(([0], np.flatnonzero(np.diff(IDXfirst)) + 1))
+    firstSEGMENTS = IDXfirst[IDXsegments]
+    normalBANDED = np.zeros((orderSPLINE + 1, NUMBERcoefficients))
+    normalRHS = np.zeros(NUMBERcoefficients)
+    for aa in range(orderSPLINE + 1):
+      basisWEIGHTED = basisVALUES[aa] if weightsSPLINE is None else basisVALUES[aa] * weightsSPLINE**2
+      normalRHS[firstSEGMENTS + aa] += np.add.reduceat(basisWEIGHTED * param2SORTED, IDXsegments)
+      for dd in range(orderSPLINE + 1 - aa):
+        normalBANDED[orderSPLINE - dd, firstSEGMENTS + aa + dd] += np.add.reduceat(basisWEIGHTED * basisVALUES[aa+dd], IDXsegments)
+    
+    try:
+      coefficients = scLinalg.solveh_banded(normalBANDED, normalRHS, lower=False)
+    except (np.linalg.LinAlgError, ValueError):
+      return (knotpointsFULL, np.ones(len(knotpointsFULL))*np.nan, orderSPLINE), 10, np.ones_like(param2SORTED)*np.nan
+    
+    # Evaluating the fit on the same banded design matrix, so no call to splev is needed
+    param2MODEL = np.zeros_like(param2SORTED)
+    for aa in range(orderSPLINE + 1):
+      param2MODEL += basisVALUES[aa] * coefficients[IDXfirst + aa]
+    
+    # splrep pads the coefficients with zeros to the length of the knot vector
+    tckSPLINE = (knotpointsFULL, np.concatenate((coefficients, np.zeros(orderSPLINE + 1))), orderSPLINE)
+    return tckSPLINE, 0, param2MODEL
+
 def splineGOODNESSofFITandINFORMATIONCRITERION(param1, param2, tck, **kwargs): #Used  (09/03/16)
     """
     For a given spline fit which captures the behaviour of param2 with varying param1 do:
@@ -174,33 +290,135 @@ def splineGOODNESSofFITandINFORMATIONCRITERION(param1, param2, tck, **kwargs): #
     @kwargs: fullOUTPUT: print all determined diagnostic values for the goodness of fit - Default is False [Boolean]
     @kwargs: PARAMSdetermine: use the tck to determine the number of estimated parameters in the fit - Default is True [Boolean]
     @kwargs: PARAMSestimated: provide the number of estimated parameters during the fit - is popped; so no default [float]
+    @kwargs: MODELvalues: the spline already evaluated at param1, so no splev is needed - Default is None [numpy array of length N]
     """
     doSILENT = kwargs.get('doSILENT', True) #[Boolean]
     
-    residuals = param2 - scInterp.splev(param1, tck)
-    RSS = np.sum(residuals**2.)
-    residualsSTD = np.std(residuals)
-    # This is actually a log-likelihood.  So, normally, you should not take any log's of this when calculating the AIC/BIC
-    loglikelihood = np.sum(np.log(np.abs(scInterp.splev(param1, tck))) + np.abs(param2 / scInterp.splev(param1, tck))) #NOTE absolute values of the fit, since param2 (and its representation) can be lower than 0, which is *not* ideal for a logarithm.
+    # The spline is evaluated only once, see splineINFORMATIONCRITERIA
+    AIC, BIC, loglikelihood, RSS, residualsSTD = splineINFORMATIONCRITERIA(param1, param2, tck, **kwargs)
+    
+    if kwargs.get('fullOUTPUT', False):
+      print '\tRSS\t= {:.5e}\n\tBIC\t= {:.5e}\n\tAIC\t= {:.5e}\n\tstd\t= {:.5e}\n\tlikelihood\t= {:.5e}\n'.format(RSS, BIC, AIC, residualsSTD, loglikelihood)
+    
+    if ((np.isnan(AIC)) or (np.isnan(BIC))) and not(doSILENT):
+      print bcolors.WARNING + '\tWARNING WARNING\n\tYou have NaN values for either AIC or BIC. Printing out all diagnostic values below...\n\tRSS\t= {:.5e}\n\tBIC\t= {:.5e}\n\tAIC\t= {:.5e}\n\tstd\t= {:.5e}\n\tlikelihood\t= {:.5e}\n'.format(RSS, BIC, AIC, residualsSTD, loglikelihood) + bcolors.ENDC
+      
+    return AIC, BIC, loglikelihood
+
+def _criteriaFROMmodel(param2, param2MODEL, estimatedPARAMS):
+    """
+    Determine the RSS, standard deviation of the residuals, the loglikelihood, AIC and BIC from an evaluated model, along the last axis. Works for a single model (length N) or a stack of models (size MxN), and only allocates two work arrays of the size of param2MODEL.
+    """
+    NUMBERpoints = param2MODEL.shape[-1]
+    
+    # Loglikelihood, see splineGOODNESSofFITandINFORMATIONCRITERION. NOTE absolute values of the fit, since param2 (and its representation) can be lower than 0, which is *not* ideal for a logarithm.
+    absMODEL = np.abs(param2MODEL)
+    workARRAY = np.divide(np.abs(param2), absMODEL)
+    loglikelihood = np.sum(workARRAY, axis=-1)
+    loglikelihood += np.sum(np.log(absMODEL, out=absMODEL), axis=-1)
     
+    # Residuals, reusing the work array
+    residuals = np.subtract(param2, param2MODEL, out=workARRAY)
+    RSS = np.einsum('...i,...i->...', residuals, residuals)
+    residualsMEAN = np.sum(residuals, axis=-1) / NUMBERpoints
+    residualsSTD = np.sqrt(np.maximum(RSS / NUMBERpoints - residualsMEAN**2., 0.))
+    
+    AIC = 2 * estimatedPARAMS - 2. * loglikelihood
+    BIC = -2. * loglikelihood + estimatedPARAMS * np.log(NUMBERpoints)
+    return AIC, BIC, loglikelihood, RSS, residualsSTD
+
+def splineINFORMATIONCRITERIA(param1, param2, tck, **kwargs):
+    """
+    Determine all goodness of fit diagnostics of a spline fit at once, evaluating the spline only once (or not at all, when MODELvalues is given). See splineGOODNESSofFITandINFORMATIONCRITERION for the definitions.
+    
+    NOTE The AIC, BIC and loglikelihood do not depend on the order of the datapoints. So, you can (and should) give the sorted param1 and param2, which lets splev use its fast sequential path.
+    
+    Returns: The AIC, BIC, the loglikelihood, the RSS and the standard deviation of the residuals of the model characterised by tck
+    
+    @param param1: parameter 1 values 
+    @type param1: numpy array of length N
+    @param param2: parameter 2 values 
+    @type param2: numpy array of length N
+    @param tck: tck of the scipy.interpolate.splrep function
+    @type tck: tuple
+    
+    @return: AIC, BIC, loglikelihood, RSS, residualsSTD
+    @rtype: tuple of numpy.float
+    
+    @kwargs: PARAMSdetermine: use the tck to determine the number of estimated parameters in the fit - Default is True [Boolean]
+    @kwargs: PARAMSestimated: provide the number of estimated parameters during the fit - no default [float]
+    @kwargs: MODELvalues: the spline already evaluated at param1 (e.g. from splineFITbanded), so no splev is needed - Default is None [numpy array of length N]
+    """
+    param2MODEL = kwargs.get('MODELvalues', None)
+    if param2MODEL is None:
+      param2MODEL = scInterp.splev(param1, tck)
     
     if kwargs.get('PARAMSdetermine', True):
-      estimatedPARAMS = (len(tck[0])/2 - 1) * (tck[-1] + 1) # (number of knotpoint REGIONS) * (order of the spline + 1) #NOTE -1 here, since the knotpoints include beginning and ending.
+      estimatedPARAMS = (len(tck[0])//2 - 1) * (tck[-1] + 1) # (number of knotpoint REGIONS) * (order of the spline + 1) #NOTE -1 here, since the knotpoints include beginning and ending.
     else:
-      estimatedPARAMS = kwargs.pop('PARAMSestimated')
+      estimatedPARAMS = kwargs['PARAMSestimated']
     
-    # OLD and possibly wrong implementation
-    ##AIC = estimatedPARAMS * np.log(len(param1)) + len(param1) * np.log(likelihood)
-    ##BIC = 2. * estimatedPARAMS + len(param1) * np.log(likelihood)
+    return _criteriaFROMmodel(np.asarray(param2, dtype=float), np.asarray(param2MODEL, dtype=float), estimatedPARAMS)
+
+def splineINFORMATIONCRITERIAbatch(param1, param2, TCKs, **kwargs):
+    """
+    Determine all goodness of fit diagnostics (see splineINFORMATIONCRITERIA) for many spline fits against the same param1 and param2, e.g. the cells of a grid search.
     
-    # NEW one
-    AIC = 2 * estimatedPARAMS - 2. * loglikelihood
-    BIC = -2. * loglikelihood + estimatedPARAMS * np.log(len(param1))
+    The TCKs are grouped by their knot vector and order. For each group, the banded B-spline basis is evaluated only once (see splineBASIS), since the spline is linear in its coefficients. The models are then scored in batches, as one vectorised operation on a stack of models (see _criteriaFROMmodel).
     
-    if kwargs.get('fullOUTPUT', False):
-      print '\tRSS\t= {:.5e}\n\tBIC\t= {:.5e}\n\tAIC\t= {:.5e}\n\tstd\t= {:.5e}\n\tlikelihood\t= {:.5e}\n'.format(RSS, BIC, AIC, residualsSTD, loglikelihood)
+    Returns: Arrays with the AIC, BIC, the loglikelihood, the RSS and the standard deviation of the residuals of each tck
     
-    if ((np.isnan(AIC)) or (np.isnan(BIC))) and not(doSILENT):
-      print bcolors.WARNING + '\tWARNING WARNING\n\tYou have NaN values for either AIC or BIC. Printing out all diagnostic values below...\n\tRSS\t= {:.5e}\n\tBIC\t= {:.5e}\n\tAIC\t= {:.5e}\n\tstd\t= {:.5e}\n\tlikelihood\t= {:.5e}\n'.format(RSS, BIC, AIC, residualsSTD, loglikelihood) + bcolors.ENDC
+    @param param1: parameter 1 values 
+    @type param1: numpy array of length N
+    @param param2: parameter 2 values 
+    @type param2: numpy array of length N
+    @param TCKs: list of tcks of the scipy.interpolate.splrep function
+    @type TCKs: list of tuples of length M
+    
+    @return: AIC, BIC, loglikelihood, RSS, residualsSTD
+    @rtype: tuple of numpy arrays of length M
+    
+    @kwargs: PARAMSestimated: the number of estimated parameters of each fit; if not given, it is determined from each tck - Default is None [numpy array of length M]
+    @kwargs: MODELvalues: the splines already evaluated at param1 (e.g. from splineFITbanded), with None for the tcks that still have to be evaluated - Default is None [list of length M]
+    @kwargs: SORTED: param1 is sorted ascending, which makes the evaluation of the basis cheaper - Default is False [Boolean]
+    @kwargs: BATCHsize: maximum number of models that are scored at once, to limit the memory usage - Default is 64 [integer]
+    """
+    param1, param2 = np.asarray(param1, dtype=float), np.asarray(param2, dtype=float)
+    sortedPARAM1 = kwargs.get('SORTED', False) #[Boolean]
+    sizeBATCH = int(kwargs.get('BATCHsize', 64)) #[integer]
+    valuesMODEL = kwargs.get('MODELvalues', None)
+    if valuesMODEL is None:
+      valuesMODEL = [None] * len(TCKs)
+    estimatedPARAMS = kwargs.get('PARAMSestimated', None)
+    if estimatedPARAMS is None:
+      estimatedPARAMS = np.array([(len(tck[0])//2 - 1) * (tck[-1] + 1) for tck in TCKs])
+    estimatedPARAMS = np.asarray(estimatedPARAMS, dtype=float)
+    
+    AIC, BIC, loglikelihood, RSS, residualsSTD = (np.zeros(len(TCKs)) for ii in range(5))
+    
+    # Group the TCKs with the same knot vector and order. The models which are already evaluated form one group (None).
+    groupsTCK = {}
+    for tt, tck in enumerate(TCKs):
+      keyGROUP = None if valuesMODEL[tt] is not None else (int(tck[2]), np.asarray(tck[0], dtype=float).tobytes())
+      groupsTCK.setdefault(keyGROUP, []).append(tt)
+    
+    for keyGROUP, IDXgroup in groupsTCK.items():
+      if keyGROUP is not None:
+        orderSPLINE = keyGROUP[0]
+        knotpointsFULL = np.asarray(TCKs[IDXgroup[0]][0], dtype=float)
+        NUMBERcoefficients = len(knotpointsFULL) - orderSPLINE - 1
+        with np.errstate(divide='ignore', invalid='ignore'):
+          IDXfirst, basisVALUES = splineBASIS(param1, knotpointsFULL, orderSPLINE, SORTED=sortedPARAM1)
+        coefficients = np.array([np.asarray(TCKs[tt][1], dtype=float)[:NUMBERcoefficients] for tt in IDXgroup])
       
-    return AIC, BIC, loglikelihood
\ No newline at end of file
+      for bb in range(0, len(IDXgroup), sizeBATCH):
+        IDXbatch = np.array(IDXgroup[bb:bb+sizeBATCH])
+        if keyGROUP is None:
+          param2MODEL = np.array([valuesMODEL[tt] for tt in IDXbatch], dtype=float)
+        else:
+          param2MODEL = np.zeros((len(IDXbatch), len(param1)))
+          for aa in range(orderSPLINE + 1):
+            param2MODEL += basisVALUES[aa] * coefficients[bb:bb+sizeBATCH][:,IDXfirst + aa]
+        AIC[IDXbatch], BIC[IDXbatch], loglikelihood[IDXbatch], RSS[IDXbatch], residualsSTD[IDXbatch] = _criteriaFROMmodel(param2, param2MODEL, estimatedPARAMS[IDXbatch])
+    
+    return AIC, BIC, loglikelihood, RSS, residualsSTD
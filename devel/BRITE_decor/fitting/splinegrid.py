@@ -0,0 +1,618 @@
+# -*- coding: utf-8 -*-
+"""
+Grid search engine for the spline fitting, used by the majority of the detrending scripts (detrendPARAMflux, and thus detrendORBITflux, detrendTEMPflux, detrendPOSITIONflux, and detrendTEMPpsfCOORD).
+
+Each cell of the grid (knotpoint spacing x phase shift x spline order) is an independent spline fit. Hence, we can distribute the cells over a pool of worker processes (or threads). The results are always gathered in the order of the grid, so the output does not depend on the number of workers.
+
+NOTE: use processes for large grids. The spline fitting of scipy.interpolate.splrep holds on to the GIL, so threads only help for small datasets.
+
+Last update 19 October 2026
+
+@author: Bram Buysschaert
+"""
+
+#===============================================================================
+# 				Packages
+#===============================================================================
+import numpy as np
+
+import time
+import multiprocessing
+import multiprocessing.pool
+
+from BRITE_decor.fitting.splinefit import splineFIT, splineFITbanded, splineINFORMATIONCRITERIAbatch
+from BRITE_decor.fitting.splinecache import cacheKEY, loadCACHE, saveCACHE
+from BRITE_decor.clipping.rebin import rebinGRID
+#===============================================================================#
+# 			Class for colored console printing			#
+#===============================================================================#
+"""
+Copied from http://stackoverflow.com/questions/22886353/printing-colors-in-python-terminal
+"""
+class bcolors:
+    HEADER = '\033[95m'
+    OKBLUE = '\033[94m'
+    OKGREEN = '\033[92m'
+    WARNING = '\033[93m'
+    FAIL = '\033[91m'
+    ENDC = '\033[0m'
+    BOLD = '\033[1m'
+    UNDERLINE = '\033[4m'
+#===============================================================================
+# 				Code
+#===============================================================================
+# Data shared with the worker processes, set once per process by _initGRIDworker, so the arrays are not copied for every cell.
+_GRIDdata = {}
+
+# Status codes of the cells of the grid, see the statusMATRIX of splineGRIDsearch
+GRIDstatusOK = 0		# fitted, with finite AIC and BIC
+GRIDstatusUNUSED = 1		# not fitted, i.e. a phase shift outside the grid of this spacing, or skipped by the adaptive search
+GRIDstatusNOknotpoints = 2	# the knotpoint spacing is larger than the range of param
+GRIDstatusKNOTrange = 3		# the knotpoints are not strictly increasing and inside the range of param
+GRIDstatusMINpoints = 4		# a knotpoint interval has less than GRIDminPOINTS datapoints
+GRIDstatusSCHOENBERG = 5	# the knotpoints violate the Schoenberg-Whitney conditions, so the fit is not unique
+GRIDstatusFAILED = 6		# fitted, but the AIC or BIC is NaN
+GRIDstatusPRUNED = 7		# not fitted, since the knotpoint spacing is dominated by the BIC of another spacing (see GRIDpruneBIC)
+GRIDstatusNAMES = {GRIDstatusOK: 'fitted', GRIDstatusUNUSED: 'unused', GRIDstatusNOknotpoints: 'no knotpoints', GRIDstatusKNOTrange: 'knotpoints outside range', GRIDstatusMINpoints: 'too few points per interval', GRIDstatusSCHOENBERG: 'Schoenberg-Whitney violated', GRIDstatusFAILED: 'failed fit', GRIDstatusPRUNED: 'pruned'}
+
+def _initGRIDworker(GRIDdata):
+    """
+    Initialiser of the worker processes, storing the (sorted) data in the process.
+    """
+    _GRIDdata.clear()
+    _GRIDdata.update(GRIDdata)
+
+def _fitGRIDcellsSHARED(cells):
+    """
+    Fit a batch of cells of the grid, using the data of the worker process.
+    """
+    return fitGRIDcells(_GRIDdata, cells)
+
+def knotpointsGRID(paramMIN, paramMAX, spacing, phaseSHIFT, shiftINDEX):
+    """
+    Determine the (interior) knotpoints for a given knotpoint spacing and phase shift, such that the knotpoints cover the range of param.
+
+    Returns: The knotpoints.
+
+    @param paramMIN: minimum of param [param]
+    @type paramMIN: numpy.float
+    @param paramMAX: maximum of param [param]
+    @type paramMAX: numpy.float
+    @param spacing: spacing between consecutive knotpoints [param]
+    @type spacing: numpy.float
+    @param phaseSHIFT: value of one phase shift [param]
+    @type phaseSHIFT: numpy.float
+    @param shiftINDEX: number of phase shifts applied to the knotpoints []
+    @type shiftINDEX: integer
+
+    @return paramKNOTPOINTS: knotpoints
+    @rtype: numpy array
+    """
+    paramKNOTPOINTS = np.arange(paramMIN + spacing, paramMAX, spacing) + shiftINDEX*phaseSHIFT
+    # The spacing is larger than the range of param, so there are no knotpoints at all. validateGRIDcell skips these cells.
+    if len(paramKNOTPOINTS) == 0:
+      return paramKNOTPOINTS
+    # Check whether the last element is too far away or over the maximum value of that position. This happens roughly in ~50% of the calculations
+    if paramMAX - paramKNOTPOINTS[-1] > spacing:
+      paramKNOTPOINTS = np.append(paramKNOTPOINTS, paramKNOTPOINTS[-1] + spacing)
+    elif (paramMAX - paramKNOTPOINTS[-1] <= 0) and (len(paramKNOTPOINTS) != 1):
+      paramKNOTPOINTS = np.delete(paramKNOTPOINTS, -1)
+    #  Check whether the first element is too far away from the minimum. This happens roughly in ~50% of the calculations
+    if abs(paramMIN - paramKNOTPOINTS[0]) > spacing + phaseSHIFT:
+      paramKNOTPOINTS = np.append(paramKNOTPOINTS[0] - spacing, paramKNOTPOINTS)
+    return paramKNOTPOINTS
+
+def cellsGRID(param, **kwargs):
+    """
+    Set up all cells of the grid search, in the order of the output matrices.
+
+    Returns: A list of cells, with each cell a tuple (kk, pp, oo, knotpoints, order), and the shape of the output matrices.
+
+    @param param: param measurements [???]
+    @type param: numpy array of length N
+
+    @return cells: cells of the grid
+    @rtype: list of tuples
+    @return shapeGRID: shape of the output matrices (KxPxO)
+    @rtype: tuple
+
+    @kwargs: SPLINEknotpointsSPACING: set of spacing for the different knotpoints - Default is np.array([1./3., 0.5, 1.0]) [param]
+    @kwargs: SPLINEphaseSHIFT: value to consider for the phase shift for the same sets of knotpoints - Default is 0.01 [param]
+    @kwargs: SPLINEorder: order for the spline fits; does accept numpy arrays! - Default is np.array([3],dtype='int32')
+    """
+    SPLINEknotpointsSPACING = kwargs.get('SPLINEknotpointsSPACING', np.array([1./3., 0.5, 1.0])) #[param]
+    SPLINEphaseSHIFT = kwargs.get('SPLINEphaseSHIFT', 0.01) #[param]
+    SPLINEorder = np.atleast_1d(kwargs.get('SPLINEorder', np.array([3],dtype='int32'))).astype('int32') #[integer]
+    maxNUMBERphaseSHIFTS = int(np.max(SPLINEknotpointsSPACING)/SPLINEphaseSHIFT)
+
+    paramMIN, paramMAX = np.min(param), np.max(param)
+
+    cells = []
+    for kk in range(len(SPLINEknotpointsSPACING)):	# Loop over the different sets of knotpoints
+      NUMBERphaseSHIFTS = int(SPLINEknotpointsSPACING[kk]/SPLINEphaseSHIFT)
+      for pp in range(NUMBERphaseSHIFTS): 		# Loop over the different phaseshifts for a given set of knotpoints
+        paramKNOTPOINTS = knotpointsGRID(paramMIN, paramMAX, SPLINEknotpointsSPACING[kk], SPLINEphaseSHIFT, pp)
+        for oo in range(len(SPLINEorder)): 		# Loop over the different orders of spline
+          cells.append((kk, pp, oo, paramKNOTPOINTS, SPLINEorder[oo]))
+
+    return cells, (len(SPLINEknotpointsSPACING), maxNUMBERphaseSHIFTS, len(SPLINEorder))
+
+def validateGRIDcell(paramSORTED, paramKNOTPOINTS, orderSPLINE, **kwargs):
+    """
+    Check whether the spline fit of a cell is possible, before doing the (much more expensive) fit itself. These are the checks of FITPACK (fpchec), which otherwise only show up as an error of splrep and NaNs in the AIC and BIC.
+
+    The Schoenberg-Whitney conditions require a subset of the datapoints x_j with t_j < x_j < t_j+k+1 for each B-spline coefficient. FITPACK checks this by greedily assigning the first free datapoint to each coefficient. The assigned index is a running maximum, so we determine it for all coefficients at once with np.maximum.accumulate.
+
+    NOTE The Schoenberg-Whitney conditions are only checked for non-periodic fits, as the periodic splines wrap around the boundaries.
+
+    Returns: The status code of the cell, GRIDstatusOK if the fit can be done.
+
+    @param paramSORTED: sorted param measurements [???]
+    @type paramSORTED: numpy array of length N
+    @param paramKNOTPOINTS: (interior) knotpoints of the cell [???]
+    @type paramKNOTPOINTS: numpy array
+    @param orderSPLINE: order of the spline
+    @type orderSPLINE: integer
+
+    @return statusCELL: status code of the cell
+    @rtype: integer
+
+    @kwargs: GRIDminPOINTS: minimum number of datapoints in each knotpoint interval - Default is 0 [integer]
+    @kwargs: SPLINEperiodic: perform a periodic spline fit - Default is False [Boolean]
+    """
+    GRIDminPOINTS = int(kwargs.get('GRIDminPOINTS', 0)) #[integer]
+    periodicSPLINE = kwargs.get('SPLINEperiodic', False) #[Boolean]
+
+    NUMBERpoints = len(paramSORTED)
+    if len(paramKNOTPOINTS) == 0:
+      return GRIDstatusNOknotpoints
+    if (paramKNOTPOINTS[0] <= paramSORTED[0]) or (paramKNOTPOINTS[-1] >= paramSORTED[-1]) or np.any(np.diff(paramKNOTPOINTS) <= 0):
+      return GRIDstatusKNOTrange
+
+    # Number of datapoints in each knotpoint interval
+    IDXknotpoints = np.searchsorted(paramSORTED, paramKNOTPOINTS)
+    if np.min(np.diff(np.concatenate(([0], IDXknotpoints, [NUMBERpoints])))) < GRIDminPOINTS:
+      return GRIDstatusMINpoints
+
+    if not(periodicSPLINE):
+      # Full knot vector, as used by splrep
+      knotpointsFULL = np.concatenate((np.repeat(paramSORTED[0], orderSPLINE + 1), paramKNOTPOINTS, np.repeat(paramSORTED[-1], orderSPLINE + 1)))
+      NUMBERcoefficients = len(knotpointsFULL) - orderSPLINE - 1
+      if NUMBERcoefficients > NUMBERpoints:
+        return GRIDstatusSCHOENBERG
+      # The first and last datapoint always go to the first and last coefficient, the others are assigned greedily
+      IDXcoefficients = np.arange(1, NUMBERcoefficients - 1)
+      if len(IDXcoefficients) != 0:
+        IDXfirst = np.searchsorted(paramSORTED, knotpointsFULL[IDXcoefficients], side='right')
+        IDXassigned = IDXcoefficients + np.maximum.accumulate(np.maximum(IDXfirst - IDXcoefficients, 0))
+        if (IDXassigned[-1] >= NUMBERpoints - 1) or np.any(paramSORTED[IDXassigned] >= knotpointsFULL[IDXcoefficients + orderSPLINE + 1]):
+          return GRIDstatusSCHOENBERG
+
+    return GRIDstatusOK
+
+def fitGRIDcell(GRIDdata, cell):
+    """
+    Perform the spline fit of a single cell of the grid and determine its information criteria, see fitGRIDcells.
+
+    @param GRIDdata: the data of the grid search, see fitGRIDcells
+    @type GRIDdata: dictionary
+    @param cell: cell of the grid (kk, pp, oo, knotpoints, order), see cellsGRID
+    @type cell: tuple
+
+    @return: AIC, BIC, loglikelihood, TCKstring
+    @rtype: tuple
+    """
+    return fitGRIDcells(GRIDdata, [cell])[0]
+
+def fitGRIDcells(GRIDdata, cells):
+    """
+    Perform the spline fits of a batch of cells of the grid and determine their information criteria.
+
+    Returns: For each cell, the AIC, BIC, the loglikelihood and the TCK (converted to a string) of the fit.
+
+    NOTE The non-periodic fits are done with splineFITbanded, which reuses the sorted data of GRIDdata and only builds the banded design matrix for the knotpoints of this cell. We fall back to splineFIT (i.e. splrep) for periodic fits, or when the banded solver fails.
+
+    NOTE The information criteria of all cells are determined at once with splineINFORMATIONCRITERIAbatch, which scores a stack of models in one vectorised operation. The models of the banded fits are reused, the others are evaluated on the banded B-spline basis instead of with splev. So, give the cells of one knotpoint spacing and spline order together (see _mapGRIDcells).
+
+    NOTE For a binned grid search (see GRIDrebin of splineGRIDsearch), paramSORTED and fluxSORTED are the bins, which are fitted with their 'weights'. When GRIDdata also has 'paramFULL' and 'fluxFULL', the information criteria are determined on those (full resolution) data instead of the bins.
+
+    @param GRIDdata: the data of the grid search, with keys 'paramSORTED', 'fluxSORTED', 'periodic', 'solver' and 'silence' (and optionally 'weights', 'paramFULL', 'fluxFULL' and 'batch', the BATCHsize of splineINFORMATIONCRITERIAbatch)
+    @type GRIDdata: dictionary
+    @param cells: cells of the grid (kk, pp, oo, knotpoints, order), see cellsGRID
+    @type cells: list of tuples
+
+    @return: (AIC, BIC, loglikelihood, TCKstring) of each cell
+    @rtype: list of tuples
+    """
+    weightsSORTED = GRIDdata.get('weights', None)
+    TCKs, valuesMODEL, NUMBERestimatedPARAMS = [], [], []
+    for kk, pp, oo, paramKNOTPOINTS, orderSPLINE in cells:
+      NUMBERestimatedPARAMS.append((len(paramKNOTPOINTS) + 1) * (orderSPLINE + 1))		# Preferred usage #NOTE +1 here, since the knotpoints DO NOT include beginning and ending
+      TCKerror, fluxMODELsorted = -1, None
+      if (GRIDdata['solver'] == 'banded') and not(GRIDdata['periodic']):
+        TCKparam, TCKerror, fluxMODELsorted = splineFITbanded(GRIDdata['paramSORTED'], GRIDdata['fluxSORTED'], paramKNOTPOINTS, orderSPLINE, SPLINEweights = weightsSORTED)
+      if TCKerror != 0:
+        TCKparam, TCKerror = splineFIT(GRIDdata['paramSORTED'], GRIDdata['fluxSORTED'], SPLINEgiveKNOTPOINTS = True, SPLINEknotpoints = paramKNOTPOINTS, SPLINEorder = orderSPLINE, SPLINEperiodic = GRIDdata['periodic'], SPLINEweights = weightsSORTED, doSILENT = GRIDdata['silence'])
+        fluxMODELsorted = None
+      TCKs.append(TCKparam)
+      # The model of the banded fit is only valid for the data it was fitted on
+      valuesMODEL.append(None if 'paramFULL' in GRIDdata else fluxMODELsorted)
+
+    # The sorted arrays give the same information criteria. We provide the number of estimated parameters.
+    if 'paramFULL' in GRIDdata:
+      AICparam, BICparam, likelihoodPARAM, RSSparam, STDparam = splineINFORMATIONCRITERIAbatch(GRIDdata['paramFULL'], GRIDdata['fluxFULL'], TCKs, PARAMSestimated=NUMBERestimatedPARAMS, SORTED=True, BATCHsize=GRIDdata.get('batch', 64))
+    else:
+      AICparam, BICparam, likelihoodPARAM, RSSparam, STDparam = splineINFORMATIONCRITERIAbatch(GRIDdata['paramSORTED'], GRIDdata['fluxSORTED'], TCKs, PARAMSestimated=NUMBERestimatedPARAMS, MODELvalues=valuesMODEL, SORTED=True, BATCHsize=GRIDdata.get('batch', 64))
+
+    results = []
+    for cc in range(len(cells)):
+      if ((np.isnan(AICparam[cc])) or (np.isnan(BICparam[cc]))) and not(GRIDdata['silence']):
+        print(bcolors.WARNING + '\tWARNING WARNING\n\tYou have NaN values for either AIC or BIC. Printing out all diagnostic values below...\n\tRSS\t= {:.5e}\n\tBIC\t= {:.5e}\n\tAIC\t= {:.5e}\n\tstd\t= {:.5e}\n\tlikelihood\t= {:.5e}\n'.format(RSSparam[cc], BICparam[cc], AICparam[cc], STDparam[cc], likelihoodPARAM[cc]) + bcolors.ENDC)
+      results.append((AICparam[cc], BICparam[cc], likelihoodPARAM[cc], str(TCKs[cc])))
+    return results
+
+def splineGRIDsearch(param, flux, **kwargs):
+    """
+    Routine to perform the spline fitting for a full grid of knotpoint spacings, phase shifts and spline orders. The independent cells can be distributed over a pool of workers.
+
+    NOTE The flux is not altered here, so subtract its mean before calling this routine (see detrendPARAMflux).
+
+    NOTE The adaptive search (GRIDsearch='adaptive') is EXPERIMENTAL. It fits all phase shifts of a spacing whose AIC or BIC is not smooth (see _adaptiveGRIDsearch), which is often the case for the likelihood of splineINFORMATIONCRITERIA on mean-subtracted flux. So, it mostly saves fits on smooth criteria, and it is not guaranteed to find the same optimal cells as the exhaustive search. Use benchmarkGRIDsearch to check if both agree on your data. The cells that were not fitted keep their 1.e50 (AIC, BIC) and 0 (likelihood), just like the phase shifts which do not exist for the smaller spacings. So, the output can be treated exactly like the output of the exhaustive search.
+
+    NOTE Every cell is first checked with validateGRIDcell, so the cells where splrep would fail (e.g. a spacing larger than the range of param, or knotpoints violating the Schoenberg-Whitney conditions) are skipped and keep their 1.e50 and 0. The reason is stored in the statusMATRIX (see the GRIDstatus codes), which is returned when GRIDreturnSTATUS is True. A ValueError is raised when none of the cells gives a usable fit.
+
+    NOTE With GRIDrebin, the data are first binned along param (see BRITE_decor.clipping.rebin.rebinGRID), and every cell is a weighted fit to the bins. So, the cost per cell scales with the number of bins instead of the number of datapoints. The TCKs can be applied to the full param array as usual (within half a bin of the edges, the spline is extrapolated). The information criteria are determined on the bins (GRIDrebinCRITERIA = 'binned'), which only compares the cells among each other, or on the full data (GRIDrebinCRITERIA = 'full'), which still avoids the fitting of the full data but costs one evaluation of the spline per cell.
+
+    NOTE With GRIDpruneBIC, we first fit the smallest valid phase shift of every spacing. A spacing whose best BIC is more than GRIDpruneBIC above the best BIC of all spacings is not fitted any further. The likelihood of splineINFORMATIONCRITERIA has no analytical lower bound, so this margin is the bound on how much the phase shifts can still improve the BIC of a spacing.
+
+    Returns: A matrix with the AIC, a matrix with the BIC, a matrix with the likelihood, and a matrix containing the TCKs of each performed fit (and the status of each cell, with GRIDreturnSTATUS).
+
+    @param param: param measurements [???]
+    @type param: numpy array of length N
+    @param flux: flux measurements [adu]
+    @type flux: numpy array of length N
+
+    @return matrixAIClocal: matrix of the AIC of each fit
+    @rtype: numpy 3D array of size KxPXO
+    @return matrixBIClocal: matrix of the BIC of each fit
+    @rtype: numpy 3D array of size KxPXO
+    @return likelihoodMATRIXlocal: matrix of the likelihood of each fit
+    @rtype: numpy 3D array of size KxPXO
+    @return matrixTCKlocal: matrix of the likelihood of each fit
+    @rtype: numpy 3D array of size KxPXO containing the TCK tuple converted to a string
+    @return statusMATRIX: status code of each cell, only with GRIDreturnSTATUS
+    @rtype: numpy 3D array of size KxPXO (dtype='int8')
+
+    @kwargs: SPLINEknotpointsSPACING: set of spacing for the different knotpoints - Default is np.array([1./3., 0.5, 1.0]) [param]
+    @kwargs: SPLINEphaseSHIFT: value to consider for the phase shift for the same sets of knotpoints - Default is 0.01 [param]
+    @kwargs: SPLINEorder: order for the spline fits; does accept numpy arrays! - Default is np.array([3],dtype='int32')
+    @kwargs: SPLINEtckLENGTH: number of bytes allocated for the to-string-converted TCK - Default is 2000 [integer]
+    @kwargs: SPLINEperiodic: perform a periodic spline fit (i.e. fit at last point == fit at first point) - Default is False [Boolean]
+    @kwargs: doSILENT: silent the printing option of the function - Default is True [Boolean]
+
+    @kwargs: GRIDworkers: number of workers to distribute the cells over; 1 is serial, None uses all CPUs - Default is 1 [integer]
+    @kwargs: GRIDpool: type of the pool of workers, either 'process' or 'thread' - Default is 'process' [string]
+    @kwargs: GRIDsolver: solver for the spline fits, either 'banded' (see splineFITbanded) or 'splrep' (see splineFIT) - Default is 'banded' [string]
+    @kwargs: GRIDbatch: maximum number of cells of the same knotpoint spacing and spline order that are scored at once, see fitGRIDcells - Default is 64 [integer]
+    @kwargs: GRIDsearch: fit all cells ('exhaustive'), or do an (experimental) coarse-to-fine search over the phase shifts ('adaptive', see _adaptiveGRIDsearch) - Default is 'exhaustive' [string]
+    @kwargs: GRIDcoarseNUMBER: number of phase shifts per knotpoint spacing in the coarse grid of the adaptive search - Default is 5 [integer]
+    @kwargs: GRIDrefineTOP: number of best cells of each spacing and order (for both AIC and BIC) that are refined in each round of the adaptive search - Default is 3 [integer]
+    @kwargs: GRIDroughness: the adaptive search fits all phase shifts of a spacing and order when its criteria change this many times faster between neighbouring phase shifts than over the coarse grid - Default is 4 [float]
+    @kwargs: GRIDbudget: maximum number of fits of the adaptive search; the coarse grid is always fitted - Default is None (no limit) [integer]
+    @kwargs: GRIDcache: directory of the on-disk cache of grid searches, see BRITE_decor.fitting.splinecache; None does not use the cache - Default is None [string]
+    @kwargs: CACHEsize: maximum size of the cache directory - Default is 100 [MB]
+    @kwargs: GRIDminPOINTS: minimum number of datapoints in each knotpoint interval, see validateGRIDcell - Default is 0 [integer]
+    @kwargs: GRIDpruneBIC: margin on the BIC for pruning the knotpoint spacings; None does not prune - Default is None [float]
+    @kwargs: GRIDreturnSTATUS: also return the statusMATRIX - Default is False [Boolean]
+    @kwargs: GRIDrebin: number of bins along param for a binned grid search; None fits the full data - Default is None [integer]
+    @kwargs: GRIDrebinCRITERIA: determine the information criteria on the 'binned' or the 'full' data - Default is 'binned' [string]
+    """
+    # Reading in the kwargs
+    SPLINEtckLENGTH = 'S' + str(int(kwargs.get('SPLINEstringLENGTH', 2000))) # [string]
+    periodicSPLINE = kwargs.get('SPLINEperiodic', False) #[Boolean]
+    silence = kwargs.get('doSILENT', True) #[Boolean]
+    GRIDworkers = kwargs.get('GRIDworkers', 1) #[integer]
+    GRIDpool = kwargs.get('GRIDpool', 'process') #[string]
+    if not GRIDpool in ['process', 'thread']:
+      raise ValueError('Please specify the "GRIDpool" properly as either "process" or "thread".')
+    GRIDsolver = kwargs.get('GRIDsolver', 'banded') #[string]
+    if not GRIDsolver in ['banded', 'splrep']:
+      raise ValueError('Please specify the "GRIDsolver" properly as either "banded" or "splrep".')
+    GRIDsearch = kwargs.get('GRIDsearch', 'exhaustive') #[string]
+    if not GRIDsearch in ['exhaustive', 'adaptive']:
+      raise ValueError('Please specify the "GRIDsearch" properly as either "exhaustive" or "adaptive".')
+    if GRIDsearch == 'adaptive':
+      print(bcolors.WARNING + '\tWARNING: splineGRIDsearch: the adaptive search is experimental, and its optimal cells may differ from the exhaustive search. Use benchmarkGRIDsearch to check it on your data.' + bcolors.ENDC)
+
+    pathCACHE = kwargs.get('GRIDcache', None) #[string]
+    GRIDpruneBIC = kwargs.get('GRIDpruneBIC', None) #[float]
+    returnSTATUS = kwargs.get('GRIDreturnSTATUS', False) #[Boolean]
+    GRIDrebin = kwargs.get('GRIDrebin', None) #[integer]
+    GRIDrebinCRITERIA = kwargs.get('GRIDrebinCRITERIA', 'binned') #[string]
+    if not GRIDrebinCRITERIA in ['binned', 'full']:
+      raise ValueError('Please specify the "GRIDrebinCRITERIA" properly as either "binned" or "full".')
+
+    param, flux = np.asarray(param, dtype=float), np.asarray(flux, dtype=float)
+
+    # Looking up the grid search in the cache, so we can skip it entirely
+    if pathCACHE is not None:
+      keyCACHE = cacheKEY(param, flux, **kwargs)
+      outputCACHE = loadCACHE(pathCACHE, keyCACHE)
+      if outputCACHE is not None:
+        if not(silence):
+          print(bcolors.OKBLUE + '\tsplineGRIDsearch: using the cached grid search ' + keyCACHE + bcolors.ENDC)
+        return outputCACHE if returnSTATUS else outputCACHE[:4]
+
+    # Setting up the cells of the grid, in the order of the output matrices
+    cells, shapeGRID = cellsGRID(param, **kwargs)
+
+    # Setting up the local matrices, for which we store the output. We multiply everthing with 1.e50 since we want the minimum BIC / AIC, and in case nothing is calculated, we want to avoid it and being able to trace it. -- If 1.e50 is too small for your usage, you are doing something horribly wrong. -- NOTE that the likelihood should be maximised, thus np.zeros
+    matrixAIClocal, matrixBIClocal, likelihoodMATRIXlocal, matrixTCKlocal = np.ones(shapeGRID)*1.e50, np.ones(shapeGRID)*1.e50, np.zeros(shapeGRID), np.ones(shapeGRID, dtype=SPLINEtckLENGTH)
+    statusMATRIX = np.ones(shapeGRID, dtype='int8')*GRIDstatusUNUSED
+
+    # Sorting the param and flux once, for all cells
+    IDXsort = np.argsort(param, kind='mergesort')
+    GRIDdata = {'paramSORTED': param[IDXsort], 'fluxSORTED': flux[IDXsort], 'periodic': periodicSPLINE, 'solver': GRIDsolver, 'silence': silence, 'batch': int(kwargs.get('GRIDbatch', 64))}
+
+    # Replacing the data by its bins, which are sorted by construction
+    if GRIDrebin is not None:
+      if GRIDrebinCRITERIA == 'full':
+        GRIDdata['paramFULL'], GRIDdata['fluxFULL'] = GRIDdata['paramSORTED'], GRIDdata['fluxSORTED']
+      GRIDdata['paramSORTED'], GRIDdata['fluxSORTED'], GRIDdata['weights'], countsBIN = rebinGRID(GRIDdata['paramSORTED'], GRIDdata['fluxSORTED'], REBINnumber=GRIDrebin)
+
+    # Skipping the cells that cannot be fitted
+    cellsVALID = []
+    for cell in cells:
+      statusCELL = validateGRIDcell(GRIDdata['paramSORTED'], cell[3], cell[4], **kwargs)
+      if statusCELL == GRIDstatusOK:
+        cellsVALID.append(cell)
+      else:
+        statusMATRIX[cell[:3]] = statusCELL
+    cells = cellsVALID
+
+    # Setting up the pool of workers once, so it can be reused by all rounds of the adaptive search.
+    poolGRID, NUMBERworkers = None, 1
+    if GRIDworkers != 1 and len(cells) > 1:
+      NUMBERworkers = GRIDworkers if GRIDworkers is not None else multiprocessing.cpu_count()
+      if GRIDpool == 'process':
+        poolGRID = multiprocessing.Pool(NUMBERworkers, initializer=_initGRIDworker, initargs=(GRIDdata,))
+      elif GRIDpool == 'thread':
+        poolGRID = multiprocessing.pool.ThreadPool(NUMBERworkers)
+    
+    searchCOMPLETE = True
+    try:
+      cellsPROBE, resultsPROBE = [], []
+      if GRIDpruneBIC is not None:
+        cellsPROBE, resultsPROBE, cells = _pruneGRIDspacings(poolGRID, GRIDpool, NUMBERworkers, GRIDdata, cells, GRIDpruneBIC)
+        keysPRUNED = set(cell[:3] for cell in cellsVALID) - set(cell[:3] for cell in cellsPROBE + cells)
+        for key in keysPRUNED:
+          statusMATRIX[key] = GRIDstatusPRUNED
+      if GRIDsearch == 'exhaustive':
+        cellsDONE = cellsPROBE + cells
+        results = resultsPROBE + _mapGRIDcells(poolGRID, GRIDpool, NUMBERworkers, GRIDdata, cells)
+      elif GRIDsearch == 'adaptive':
+        cellsDONE, results, searchCOMPLETE = _adaptiveGRIDsearch(poolGRID, GRIDpool, NUMBERworkers, GRIDdata, cellsPROBE + cells, cellsKNOWN=cellsPROBE, resultsKNOWN=resultsPROBE, **kwargs)
+    finally:
+      if poolGRID is not None:
+        poolGRID.close(); poolGRID.join()
+
+    # The budget stopped the adaptive search before it could check its optimum, so it can differ from the exhaustive search
+    if not(searchCOMPLETE):
+      print(bcolors.WARNING + '\tWARNING: splineGRIDsearch: the adaptive search reached GRIDbudget ({:d} fits) before it was completed, so its optimal cells may differ from the exhaustive search.'.format(len(cellsDONE)) + bcolors.ENDC)
+
+    for cell, result in zip(cellsDONE, results):
+      kk, pp, oo = cell[:3]
+      matrixAIClocal[kk,pp,oo], matrixBIClocal[kk,pp,oo], likelihoodMATRIXlocal[kk,pp,oo], matrixTCKlocal[kk,pp,oo] = result
+      statusMATRIX[kk,pp,oo] = GRIDstatusOK if np.isfinite(result[0]) and np.isfinite(result[1]) else GRIDstatusFAILED
+
+    if not(silence) or not np.any(statusMATRIX == GRIDstatusOK):
+      summarySTATUS = ', '.join('{:d} {}'.format(np.sum(statusMATRIX == code), GRIDstatusNAMES[code]) for code in sorted(GRIDstatusNAMES) if np.any(statusMATRIX == code))
+      if not np.any(statusMATRIX == GRIDstatusOK):
+        raise ValueError('splineGRIDsearch: none of the cells of the grid gives a usable fit ({}). Use a smaller SPLINEknotpointsSPACING when there are no knotpoints, or a larger one otherwise.'.format(summarySTATUS))
+      print(bcolors.OKBLUE + '\tsplineGRIDsearch: ' + summarySTATUS + bcolors.ENDC)
+
+    if pathCACHE is not None:
+      saveCACHE(pathCACHE, keyCACHE, matrixAIClocal, matrixBIClocal, likelihoodMATRIXlocal, matrixTCKlocal, statusMATRIX, **kwargs)
+
+    if returnSTATUS:
+      return matrixAIClocal, matrixBIClocal, likelihoodMATRIXlocal, matrixTCKlocal, statusMATRIX
+    return matrixAIClocal, matrixBIClocal, likelihoodMATRIXlocal, matrixTCKlocal
+
+def _mapGRIDcells(poolGRID, poolTYPE, NUMBERworkers, GRIDdata, cells):
+    """
+    Fit a list of cells, either serially or with the pool of workers. The cells are split in batches of the same knotpoint spacing and spline order (at most GRIDdata['batch'] cells), which are scored together by fitGRIDcells. The results are put back in the order of the cells, so the result is deterministic.
+    """
+    sizeBATCH = GRIDdata.get('batch', 64)
+    if poolGRID is not None:
+      # Keeping enough batches to balance the load over the workers
+      sizeBATCH = max(1, min(sizeBATCH, len(cells) // (4 * NUMBERworkers)))
+    IDXpairs = {}
+    for cc, cell in enumerate(cells):
+      IDXpairs.setdefault((cell[0], cell[2]), []).append(cc)
+    IDXbatches = [IDXpair[bb:bb+sizeBATCH] for pair, IDXpair in sorted(IDXpairs.items()) for bb in range(0, len(IDXpair), sizeBATCH)]
+    batches = [[cells[cc] for cc in IDXbatch] for IDXbatch in IDXbatches]
+
+    if poolGRID is None or len(batches) <= 1:
+      resultsBATCHES = [fitGRIDcells(GRIDdata, batch) for batch in batches]
+    elif poolTYPE == 'process':
+      resultsBATCHES = poolGRID.map(_fitGRIDcellsSHARED, batches)
+    elif poolTYPE == 'thread':
+      resultsBATCHES = poolGRID.map(lambda batch: fitGRIDcells(GRIDdata, batch), batches)
+
+    results = [None] * len(cells)
+    for IDXbatch, resultsBATCH in zip(IDXbatches, resultsBATCHES):
+      for cc, result in zip(IDXbatch, resultsBATCH):
+        results[cc] = result
+    return results
+
+def _pruneGRIDspacings(poolGRID, poolTYPE, NUMBERworkers, GRIDdata, cells, GRIDpruneBIC):
+    """
+    Fit the smallest phase shift of each knotpoint spacing and spline order, and drop the spacings whose best BIC is more than GRIDpruneBIC above the best BIC of all spacings.
+    
+    Returns: The fitted cells, their results, and the remaining cells of the spacings that are kept.
+    """
+    cellsPROBE, keysPROBE = [], set()
+    for cell in cells:
+      if not (cell[0], cell[2]) in keysPROBE:
+        keysPROBE.add((cell[0], cell[2]))
+        cellsPROBE.append(cell)
+    resultsPROBE = _mapGRIDcells(poolGRID, poolTYPE, NUMBERworkers, GRIDdata, cellsPROBE)
+    
+    # Best BIC of each spacing. A spacing without any finite BIC is kept, since its other phase shifts might still work.
+    BICspacings = {}
+    for cell, result in zip(cellsPROBE, resultsPROBE):
+      if np.isfinite(result[1]):
+        BICspacings[cell[0]] = min(BICspacings.get(cell[0], np.inf), result[1])
+    spacingsPRUNED = set()
+    if len(BICspacings) != 0:
+      BICbest = min(BICspacings.values())
+      spacingsPRUNED = set(kk for kk in BICspacings if BICspacings[kk] - GRIDpruneBIC > BICbest)
+    
+    cellsREMAINING = [cell for cell in cells if not (cell[0] in spacingsPRUNED) and not (cell[0], cell[1], cell[2]) in keysPROBE]
+    return cellsPROBE, resultsPROBE, cellsREMAINING
+
+def _adaptiveGRIDsearch(poolGRID, poolTYPE, NUMBERworkers, GRIDdata, cells, cellsKNOWN=(), resultsKNOWN=(), **kwargs):
+    """
+    Coarse-to-fine search over the phase shifts of the grid. See splineGRIDsearch for the kwargs.
+    
+    For each knotpoint spacing and spline order (a pair), we first fit every S-th phase shift (the coarse grid), together with the phase shift next to each of them (the probes). Next, we take the best cells of each pair according to both the AIC and the BIC, and fit their neighbours at S/2, S/4, ..., 1 phase shifts away, each time around the best cells found so far. This is a bisection towards the local minimum around each of the best cells. Finally, we keep fitting the unfitted neighbours of the best cell, until the optimum of each pair is bracketed by fitted cells. The cellsKNOWN (with their resultsKNOWN) are already fitted, and are not fitted again.
+    
+    The bisection only finds the optimum when the AIC and BIC change smoothly with the phase shift. So, all phase shifts of a pair are fitted (as in the exhaustive search) when:
+    - a probe changes the AIC or BIC more than GRIDroughness times the change expected from the coarse grid, i.e. the criteria vary on scales smaller than the coarse stride.
+    - the optimum of the pair ends up more than one coarse stride away from the best cell of the coarse grid.
+    
+    Returns: The fitted cells and their results, in the order they were fitted, and whether the search was completed (False when GRIDbudget stopped it).
+    """
+    GRIDcoarseNUMBER = int(kwargs.get('GRIDcoarseNUMBER', 5)) #[integer]
+    GRIDrefineTOP = int(kwargs.get('GRIDrefineTOP', 3)) #[integer]
+    GRIDroughness = float(kwargs.get('GRIDroughness', 4.)) #[float]
+    GRIDbudget = kwargs.get('GRIDbudget', None) #[integer]
+    
+    cellsGRIDdict = dict(((cell[0], cell[1], cell[2]), cell) for cell in cells)
+    shiftsPAIR = {}
+    for kk, pp, oo in sorted(cellsGRIDdict):
+      shiftsPAIR.setdefault((kk, oo), []).append(pp)
+    NUMBERphaseSHIFTS = {}
+    for kk, pp, oo in cellsGRIDdict:
+      NUMBERphaseSHIFTS[kk] = max(NUMBERphaseSHIFTS.get(kk, 0), pp + 1)
+    strideCOARSE = dict((kk, max(1, int(np.ceil(NUMBERphaseSHIFTS[kk] / float(GRIDcoarseNUMBER))))) for kk in NUMBERphaseSHIFTS)
+    
+    cellsDONE, results = list(cellsKNOWN), list(resultsKNOWN)
+    scores = dict(((cell[0], cell[1], cell[2]), result[:2]) for cell, result in zip(cellsDONE, results))
+    searchCOMPLETE = [True]
+    
+    def fitKEYS(keysNEW, budgetFREE=False):
+      # Fitting the cells that are not fitted yet (once), within GRIDbudget unless budgetFREE
+      keysUNIQUE = []
+      for key in keysNEW:
+        if key in cellsGRIDdict and not key in scores and not key in keysUNIQUE:
+          keysUNIQUE.append(key)
+      if GRIDbudget is not None and not(budgetFREE) and len(keysUNIQUE) > int(GRIDbudget) - len(cellsDONE):
+        keysUNIQUE = keysUNIQUE[:max(0, int(GRIDbudget) - len(cellsDONE))]
+        searchCOMPLETE[0] = False
+      if len(keysUNIQUE) == 0:
+        return
+      cellsNEW = [cellsGRIDdict[key] for key in keysUNIQUE]
+      resultsNEW = _mapGRIDcells(poolGRID, poolTYPE, NUMBERworkers, GRIDdata, cellsNEW)
+      for key, result in zip(keysUNIQUE, resultsNEW):
+        scores[key] = result[:2]
+      cellsDONE.extend(cellsNEW); results.extend(resultsNEW)
+    
+    def bestSHIFTS(kk, oo, NUMBERbest):
+      # Phase shifts of the best cells of a pair, according to the AIC and the BIC. NaNs are never the best cells.
+      shiftsSCORED = [pp for pp in shiftsPAIR[(kk, oo)] if (kk, pp, oo) in scores and np.all(np.isfinite(scores[(kk, pp, oo)]))]
+      return [sorted(shiftsSCORED, key=lambda pp: scores[(kk, pp, oo)][ii])[:NUMBERbest] for ii in (0, 1)]
+    
+    # The coarse grid and the probes, which are always fitted completely (even when they exceed GRIDbudget)
+    fitKEYS([(kk, pp, oo) for kk, oo in sorted(shiftsPAIR) for pp in shiftsPAIR[(kk, oo)] if pp % strideCOARSE[kk] == 0 or (pp % strideCOARSE[kk] == 1 and (kk, pp - 1, oo) in cellsGRIDdict)], budgetFREE=True)
+    
+    # The pairs whose criteria vary on scales smaller than the coarse stride
+    pairsROUGH = []
+    for kk, oo in sorted(shiftsPAIR):
+      stride = strideCOARSE[kk]
+      for ii in (0, 1):
+        scoresPAIR = dict((pp, scores[(kk, pp, oo)][ii]) for pp in shiftsPAIR[(kk, oo)] if (kk, pp, oo) in scores and np.isfinite(scores[(kk, pp, oo)][ii]))
+        changePROBE = [abs(scoresPAIR[pp + 1] - scoresPAIR[pp]) for pp in scoresPAIR if pp % stride == 0 and pp + 1 in scoresPAIR]
+        changeCOARSE = [abs(scoresPAIR[pp + stride] - scoresPAIR[pp]) for pp in scoresPAIR if pp % stride == 0 and pp + stride in scoresPAIR]
+        if stride > 1 and len(changePROBE) != 0 and max(changePROBE) * stride > GRIDroughness * max(changeCOARSE + [0.]):
+          pairsROUGH.append((kk, oo))
+          break
+    pairsSMOOTH = [pair for pair in sorted(shiftsPAIR) if not pair in pairsROUGH]
+    bestCOARSE = dict((pair, bestSHIFTS(pair[0], pair[1], 1)) for pair in pairsSMOOTH)
+    
+    # The refinement of the smooth pairs, halving the stride each round
+    strideSHIFTS = dict(strideCOARSE)
+    while len(pairsSMOOTH) != 0 and max(strideSHIFTS[kk] for kk, oo in pairsSMOOTH) > 1:
+      strideSHIFTS = dict((kk, max(1, strideSHIFTS[kk] // 2)) for kk in strideSHIFTS)
+      keysNEW = []
+      for kk, oo in pairsSMOOTH:
+        for shiftsBEST in bestSHIFTS(kk, oo, GRIDrefineTOP):
+          keysNEW += [(kk, ppNEW, oo) for pp in shiftsBEST for ppNEW in (pp - strideSHIFTS[kk], pp + strideSHIFTS[kk])]
+      fitKEYS(keysNEW)
+    
+    # Bracketing the optimum of the smooth pairs by its fitted neighbours
+    for kk, oo in pairsSMOOTH:
+      NUMBERdone = -1
+      while searchCOMPLETE[0] and NUMBERdone != len(cellsDONE):
+        NUMBERdone = len(cellsDONE)
+        fitKEYS([(kk, ppNEW, oo) for shiftsBEST in bestSHIFTS(kk, oo, 1) for pp in shiftsBEST for ppNEW in (pp - 1, pp + 1)])
+      for shiftsFINAL, shiftsCOARSE in zip(bestSHIFTS(kk, oo, 1), bestCOARSE[(kk, oo)]):
+        if len(shiftsFINAL) != 0 and len(shiftsCOARSE) != 0 and abs(shiftsFINAL[0] - shiftsCOARSE[0]) > strideCOARSE[kk]:
+          pairsROUGH.append((kk, oo))
+          break
+    
+    # Fitting all phase shifts of the rough pairs
+    fitKEYS([(kk, pp, oo) for kk, oo in pairsROUGH for pp in shiftsPAIR[(kk, oo)]])
+    
+    return cellsDONE, results, searchCOMPLETE[0]
+
+def benchmarkGRIDsearch(param, flux, **kwargs):
+    """
+    Routine to compare the adaptive search (GRIDsearch='adaptive') against the exhaustive search of splineGRIDsearch, for the same data and kwargs.
+    
+    Returns: Whether both searches find the same optimal cell for the AIC and for the BIC, the relative difference between the optimal AIC and BIC values, the number of fits of both searches, and their runtime.
+    
+    @param param: param measurements [???]
+    @type param: numpy array of length N
+    @param flux: flux measurements [adu]
+    @type flux: numpy array of length N
+    
+    @return agreeAIC: both searches have the same optimal cell for the AIC
+    @rtype: Boolean
+    @return agreeBIC: both searches have the same optimal cell for the BIC
+    @rtype: Boolean
+    @return differenceAIC: (AICadaptive - AICexhaustive) / |AICexhaustive| for the optimal cells
+    @rtype: numpy.float
+    @return differenceBIC: (BICadaptive - BICexhaustive) / |BICexhaustive| for the optimal cells
+    @rtype: numpy.float
+    @return NUMBERfits: number of fits of the exhaustive and adaptive search
+    @rtype: tuple of integers
+    @return runtime: runtime of the exhaustive and adaptive search [s]
+    @rtype: tuple of floats
+    
+    @kwargs: see splineGRIDsearch
+    """
+    kwargs['GRIDsearch'] = 'exhaustive'
+    timeSTART = time.time()
+    matrixAICfull, matrixBICfull, likelihoodMATRIXfull, matrixTCKfull = splineGRIDsearch(param, flux, **kwargs)
+    runtimeFULL = time.time() - timeSTART
+    
+    kwargs['GRIDsearch'] = 'adaptive'
+    timeSTART = time.time()
+    matrixAICadaptive, matrixBICadaptive, likelihoodMATRIXadaptive, matrixTCKadaptive = splineGRIDsearch(param, flux, **kwargs)
+    runtimeADAPTIVE = time.time() - timeSTART
+    
+    # Unfitted cells are kept at 1.e50 (and the phase shifts outside the grid of a spacing never have a TCK)
+    NUMBERfitsFULL = int(np.sum(matrixAICfull != 1.e50))
+    NUMBERfitsADAPTIVE = int(np.sum(matrixAICadaptive != 1.e50))
+    
+    AICminFULL, AICminADAPTIVE = np.nanargmin(matrixAICfull), np.nanargmin(matrixAICadaptive)
+    BICminFULL, BICminADAPTIVE = np.nanargmin(matrixBICfull), np.nanargmin(matrixBICadaptive)
+    differenceAIC = (matrixAICadaptive.flat[AICminADAPTIVE] - matrixAICfull.flat[AICminFULL]) / np.abs(matrixAICfull.flat[AICminFULL])
+    differenceBIC = (matrixBICadaptive.flat[BICminADAPTIVE] - matrixBICfull.flat[BICminFULL]) / np.abs(matrixBICfull.flat[BICminFULL])
+    
+    if not(kwargs.get('doSILENT', True)):
+      print(bcolors.OKBLUE + '\tbenchmarkGRIDsearch: {:d} fits in {:.3f} s (exhaustive) versus {:d} fits in {:.3f} s (adaptive)'.format(NUMBERfitsFULL, runtimeFULL, NUMBERfitsADAPTIVE, runtimeADAPTIVE) + bcolors.ENDC)
+      print(bcolors.OKBLUE + '\tbenchmarkGRIDsearch: same optimal AIC cell = {}, same optimal BIC cell = {}'.format(AICminFULL == AICminADAPTIVE, BICminFULL == BICminADAPTIVE) + bcolors.ENDC)
+    
+    return AICminFULL == AICminADAPTIVE, BICminFULL == BICminADAPTIVE, differenceAIC, differenceBIC, (NUMBERfitsFULL, NUMBERfitsADAPTIVE), (runtimeFULL, runtimeADAPTIVE)
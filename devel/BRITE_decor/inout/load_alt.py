@@ -10,6 +10,8 @@ Last update: 23 June 2016
 
 import numpy as np
 
+from BRITE_decor.timing.orbit import SATELLITEperiods
+
 def load_header(filename, comment='c'):
 
 #    f=open(filename)
@@ -79,7 +81,7 @@ def load_dataset(filename, pathIN=None):
 
 
     # define period for making phase column
-    per = {'UBr':100.3708/1440., 'BAb':100.3617/1440., 'BTr':98.2428/1440., 'BLb':99.6651/1440., 'BHr':97.0972/1440.}
+    per = dict((sat, period/1440.) for sat, period in SATELLITEperiods.items())
 
 #    oper = per[tel]
     
@@ -2,7 +2,7 @@
 """
 Routines to study the data of BRITE observations per orbit
     
-Last update 18 March 2016
+Last update 19 October 2026
 
 @author: Bram Buysschaert
 """
@@ -14,6 +14,9 @@ import numpy as np
 #===============================================================================
 # 				Code
 #===============================================================================
+# Orbital periods of the BRITE satellites [min]
+SATELLITEperiods = {'UBr':100.3708, 'BAb':100.3617, 'BTr':98.2428, 'BLb':99.6651, 'BHr':97.0972}
+
 def averageORBIT(time, flux, **kwargs):
     """
     Rebinning of the photometric measurements to bins of 1 orbit passage. The photometric data points are taken with almost a second cadence, which is too high.
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+Regression checks of BRITE_decor.analysis.periodogram on evenly and periodically sampled data, where the Lomb-Scargle sine term becomes undetermined (e.g. at the Nyquist frequency).
+
+Run from the devel directory with: python -m pytest tests
+
+Last update 19 October 2026
+
+@author: Bram Buysschaert
+"""
+
+import numpy as np
+
+from BRITE_decor.analysis.periodogram import frequencyGRID, periodogram, periodogramPEAKS
+
+def test_evenly_sampled_sine():
+    time = np.arange(0, 10, 0.01)
+    flux = 2. * np.sin(2. * np.pi * 3. * time)
+    # The default grid stays strictly below the Nyquist frequency (and the cap of 50 c/d)
+    assert frequencyGRID(time)[-1] < 50.
+    for method in ['fast', 'exact']:
+        for normalization, height in [('amplitude', 2.), ('power', 1.)]:
+            frequencies, spectrum = periodogram(time, flux, PERIODOGRAMmethod=method, PERIODOGRAMnormalization=normalization)
+            assert np.all(np.isfinite(spectrum))
+            assert np.argmax(spectrum) == periodogramPEAKS(frequencies, spectrum)[0]
+            assert abs(frequencies[np.argmax(spectrum)] - 3.) < 0.01
+            assert abs(np.max(spectrum) - height) < 0.01 * height
+
+def test_orbit_sampled_noise():
+    # 15 minutes of 20 s cadence every orbit: white noise must not give a peak at half the orbital frequency
+    np.random.seed(1)
+    periodORBIT = 100.3617 / 1440.
+    time = np.concatenate([kk * periodORBIT + np.arange(0, 15. / 1440., 20. / 86400.) for kk in range(300)])
+    frequencies, spectrum = periodogram(time, np.random.randn(len(time)), PERIODOGRAMfmax=20.)
+    assert np.max(spectrum) < 5. * np.median(spectrum)
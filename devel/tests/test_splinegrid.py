@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+Regression checks of the adaptive search of BRITE_decor.fitting.splinegrid against the exhaustive search, on criteria that vary smoothly and roughly with the phase shift.
+
+Run from the devel directory with: python -m pytest tests
+
+Last update 19 October 2026
+
+@author: Bram Buysschaert
+"""
+
+import numpy as np
+
+from BRITE_decor.fitting.splinegrid import benchmarkGRIDsearch
+
+def test_adaptive_rough_surface():
+    # The likelihood on mean-subtracted flux gives isolated spikes in the AIC and BIC, which the bisection alone misses
+    rng = np.random.RandomState(0)
+    param = np.sort(rng.uniform(0., 10., 1000))
+    flux = 5. * np.sin(param) + rng.normal(0., 1., len(param))
+    agreeAIC, agreeBIC, differenceAIC, differenceBIC, NUMBERfits, runtime = benchmarkGRIDsearch(param, flux - np.mean(flux), SPLINEknotpointsSPACING=np.array([1., 2.]), SPLINEphaseSHIFT=0.02)
+    assert agreeAIC and agreeBIC
+    assert differenceAIC == 0. and differenceBIC == 0.
+
+def test_adaptive_smooth_surface():
+    rng = np.random.RandomState(3)
+    param = np.sort(rng.uniform(0., 10., 3000))
+    flux = 1000. + 5. * np.sin(param) + 0.3 * param + rng.normal(0., 1., len(param))
+    agreeAIC, agreeBIC, differenceAIC, differenceBIC, NUMBERfits, runtime = benchmarkGRIDsearch(param, flux, SPLINEknotpointsSPACING=np.array([1., 2., 3.]), SPLINEphaseSHIFT=0.02)
+    assert agreeAIC and agreeBIC
+    assert NUMBERfits[1] < NUMBERfits[0]
@@ -93,22 +93,9 @@ if __name__ == '__main__':
     pl.show()
     
     
-    # Perform the detrending (and showing it, since show_ME=True)
-    fluxPSFcorrected, correction, tckFIRSTstring_list, tckSECONDstring_list, diagnostic_list = np.array([]), np.array([]), [], [], []
-    for ii in range(len(binENDindexes)):
-      if ii == 0: # The first index
-        HJD_bin, fluxRAW_bin, xCCD_bin, yCCD_bin = HJD[:binENDindexes[ii]+1], fluxRAW[:binENDindexes[ii]+1], xCCD[:binENDindexes[ii]+1], yCCD[:binENDindexes[ii]+1]
-        
-      elif ii == len(binENDindexes) -1: # The last index
-        HJD_bin, fluxRAW_bin, xCCD_bin, yCCD_bin = HJD[binENDindexes[ii-1]+1:], fluxRAW[binENDindexes[ii-1]+1:], xCCD[binENDindexes[ii-1]+1:], yCCD[binENDindexes[ii-1]+1:]
-        
-      else: # The other indexes
-	HJD_bin, fluxRAW_bin, xCCD_bin, yCCD_bin = HJD[binENDindexes[ii-1]+1:binENDindexes[ii]+1], fluxRAW[binENDindexes[ii-1]+1:binENDindexes[ii]+1], xCCD[binENDindexes[ii-1]+1:binENDindexes[ii]+1], yCCD[binENDindexes[ii-1]+1:binENDindexes[ii]+1]
-      
-      correction_bin, tckFIRSTstring_bin, tckSECONDstring_bin, diagnostic_bin = PSFdetrendBRITE.detrendTEMPpsfFULL(HJD_bin, fluxRAW_bin, xCCD_bin, yCCD_bin, show_ME=True, SPLINEknotpointsSPACING = np.array([0.1, 0.2,0.25,1./3.]), SPLINEorder = np.array([3,5], dtype='int32'))
-      
-      fluxPSFcorrected, correction = np.append(fluxPSFcorrected, fluxRAW_bin - correction_bin), np.append(correction, correction_bin)
-      tckFIRSTstring_list.append(tckFIRSTstring_bin); tckSECONDstring_list.append(tckSECONDstring_bin);  diagnostic_list.append(diagnostic_bin)
+    # Perform the detrending (and showing it, since show_ME=True). Use BINworkers to distribute the bins over several processes (which turns the plotting off).
+    correction, tckFIRSTstring_list, tckSECONDstring_list, diagnostic_list, retries_list = PSFdetrendBRITE.detrendTEMPpsfBINS(HJD, fluxRAW, xCCD, yCCD, binENDindexes, show_ME=True, SPLINEknotpointsSPACING = np.array([0.1, 0.2,0.25,1./3.]), SPLINEorder = np.array([3,5], dtype='int32'), BINworkers=1)
+    fluxPSFcorrected = fluxRAW - correction
     print 'I have corrected the flux'
    
     # Save the output
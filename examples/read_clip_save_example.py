@@ -44,6 +44,7 @@ import BRITE_decor.timing.orbit as orbitBRITE
 
 import BRITE_decor.clipping.medianclipping as medianclipBRITE
 import BRITE_decor.clipping.percentageclipping as percentageclipBRITE
+import BRITE_decor.clipping.flagclipping as flagclipBRITE
 
 import BRITE_decor.gui.outlierrejection as outlierguiBRITE
 #===============================================================================
@@ -93,9 +94,17 @@ def clip_qualityFLAG(qFLAG, **kwargs):
     Clip on the quality flag provided in DR2 data and return the indexes of the 'outliers'.
     
     NOTE: You can also use the formula from Andrzej's cookbook, and calculate the qFLAG yourself. Both calculations actually differ slightly.
+    
+    NOTE: For DR4 data, you can give the PSFC1, PSFC2 and RTSC columns through FLAGcolumns and add rules for them, e.g. FLAGrules = [('RTSC', '>', 0.1), ('PSFC1', 'outside', (1., 1.))]. See BRITE_decor.clipping.flagclipping.flagFILTER.
+    
+    @kwargs: FLAGrules: rules for the flag clipping - Default is [('qFLAG', '==', 0)] [list of tuples]
+    @kwargs: FLAGcolumns: additional columns on which the rules can work - Default is {} [dictionary]
     """
+    flagRULES = kwargs.get('FLAGrules', [('qFLAG', '==', 0)])
+    flagCOLUMNS = dict(kwargs.get('FLAGcolumns', {}))
+    flagCOLUMNS['qFLAG'] = qFLAG
     
-    IDXoutliers_qFLAG = np.where(qFLAG == 0)[0]
+    IDXoutliers_qFLAG = np.where(flagclipBRITE.flagFILTER(flagCOLUMNS, flagRULES))[0]
     
     return IDXoutliers_qFLAG
     
@@ -112,6 +121,8 @@ def perform_clipping(time, flux, xPOS, yPOS, temperature, qFLAG, exposureTIME, n
     6. Remove full satellite orbits for those who have a very different mean value in that passage.
     
     @kwargs: SATELLITEname: name of the satellite that took the data you are trying to detrend - Default is BHr [string] NOTE: should actually be more of an arg instead of kwarg
+    @kwargs: FLAGrules: rules for the flag clipping of step 1, see clip_qualityFLAG - Default is [('qFLAG', '==', 0)] [list of tuples]
+    @kwargs: FLAGcolumns: additional columns for the flag clipping of step 1, see clip_qualityFLAG - Default is {} [dictionary]
     """
     # Reading in the kwars
     satelliteNAME = kwargs.get('SATELLITEname', 'BHr')
@@ -129,8 +140,8 @@ def perform_clipping(time, flux, xPOS, yPOS, temperature, qFLAG, exposureTIME, n
     # Deep copy of the original arrays, in case you want to plot them at the end for comparison reasons.
     timeORIG, fluxORIG, xPOSORIG, yPOSORIG, temperatureORIG, qFLAGORIG, exposureTIMEORIG, numberSTACKSORIG = np.copy(time), np.copy(flux), np.copy(xPOS), np.copy(yPOS), np.copy(temperature), np.copy(qFLAG), np.copy(exposureTIME), np.copy(numberSTACKS)
     
-    # Step 1: Remove qFLAG outliers.
-    IDXoutliers = clip_qualityFLAG(qFLAG)
+    # Step 1: Remove qFLAG outliers (and any other flag outliers given by FLAGrules). This is the cheapest step, so do it first.
+    IDXoutliers = clip_qualityFLAG(qFLAG, **kwargs)
     time, flux, xPOS, yPOS, temperature, qFLAG, exposureTIME, numberSTACKS = np.delete(time,IDXoutliers), np.delete(flux,IDXoutliers), np.delete(xPOS,IDXoutliers), np.delete(yPOS,IDXoutliers), np.delete(temperature,IDXoutliers), np.delete(qFLAG,IDXoutliers), np.delete(exposureTIME,IDXoutliers), np.delete(numberSTACKS,IDXoutliers)
     
     # Step 2: Remove position outliers.
@@ -176,7 +187,7 @@ def perform_clipping(time, flux, xPOS, yPOS, temperature, qFLAG, exposureTIME, n
     time, flux, xPOS, yPOS, temperature, qFLAG, exposureTIME, numberSTACKS = np.delete(time,IDXoutliers), np.delete(flux,IDXoutliers), np.delete(xPOS,IDXoutliers), np.delete(yPOS,IDXoutliers), np.delete(temperature,IDXoutliers), np.delete(qFLAG,IDXoutliers), np.delete(exposureTIME,IDXoutliers), np.delete(numberSTACKS,IDXoutliers)
     
     # Step 4. Remove flux outliers.
-    # This is not implemented here, since it requires you to subtract any instrumental and physical signal from the lightcurve. As such, you need an iterative prewhitening code and / or a model for the lightcurve.
+    # This is not implemented here, since it requires you to subtract any instrumental and physical signal from the lightcurve. As such, you need an iterative prewhitening code (see BRITE_decor.fitting.routines_lmfit.prewhitenSINES) and / or a model for the lightcurve.
     
     
     # Step 5. Remove full satellite orbits not having a significant amount of measurements.